@@ -18,6 +18,7 @@ __all__ = [
     'S3Client',
     'SecretsManagerClient',
     'SesClient',
+    'SqsClient',
 ]
 from .amplitude import AmplitudeClient
 from .apple import AppleClient
@@ -38,3 +39,4 @@ from .redeem_promotion import RedeemPromotionClient
 from .s3 import S3Client
 from .secretsmanager import SecretsManagerClient
 from .ses import SesClient
+from .sqs import SqsClient
@@ -1,15 +1,49 @@
+import collections
+import contextlib
+import functools
+import json
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
-import gql.transport.requests
-import requests_aws4auth
+from graphql.language.printer import print_ast
+
+from .transport import AWSRequestSigner, get_session
 
 APPSYNC_GRAPHQL_URL = os.environ.get('APPSYNC_GRAPHQL_URL')
 
 logger = logging.getLogger()
 
 
+class GqlMutation(collections.namedtuple('GqlMutation', ['field_name', 'input_type', 'selection'])):
+    """
+    A mutation of a single field that takes a single `input` argument, such as the trigger*Notification
+    mutations. Unlike a parsed gql document, many of these can be aliased together into one request.
+    """
+
+    def __new__(cls, field_name, input_type, selection):
+        return super().__new__(cls, field_name, input_type, ' '.join(selection.split()))
+
+    def __str__(self):
+        return build_document((self,))
+
+
+@functools.lru_cache(maxsize=256)
+def build_document(mutations):
+    "Build the text of one mutation operation that executes each of the `mutations` in order, aliased by index"
+    variable_defs = ', '.join(f'$input{idx}: {m.input_type}!' for idx, m in enumerate(mutations))
+    fields = ' '.join(
+        f'm{idx}: {m.field_name} (input: $input{idx}) {{ {m.selection} }}' for idx, m in enumerate(mutations)
+    )
+    return f'mutation Trigger ({variable_defs}) {{ {fields} }}'
+
+
+@functools.lru_cache(maxsize=64)
+def notification_mutation(extra_keys):
+    return GqlMutation('triggerNotification', 'NotificationInput', ' '.join(('userId', 'type') + extra_keys))
+
+
 class AppSyncClient:
 
     service_name = 'appsync'
@@ -17,22 +51,19 @@ class AppSyncClient:
         'Accept': 'application/json',
         'Content-Type': 'application/json',
     }
+    # max number of aliased mutations sent in one request, and the number of requests sent concurrently
+    mutation_batch_size = 20
+    mutation_max_workers = 8
 
     def __init__(self, appsync_graphql_url=APPSYNC_GRAPHQL_URL):
         self.appsync_graphql_url = appsync_graphql_url
+        self.session = get_session()
+        self.auth = AWSRequestSigner(self.service_name)
+        self.mutation_buffer = None
+        self.mutation_buffer_lock = threading.Lock()
 
     def fire_notification(self, user_id, notification_type, **extra):
-        mutation = gql.gql(
-            f'''
-            mutation TriggerNotification ($input: NotificationInput!) {{
-                triggerNotification (input: $input) {{
-                    userId
-                    type
-                    {' '.join(extra.keys())}
-                }}
-            }}
-        '''
-        )
+        mutation = notification_mutation(tuple(extra.keys()))
         input_obj = {
             'userId': user_id,
             'type': notification_type,
@@ -41,21 +72,88 @@ class AppSyncClient:
         self.send(mutation, {'input': input_obj})
 
     def send(self, query, variables):
-        aws_session = boto3.session.Session()
-        creds = aws_session.get_credentials().get_frozen_credentials()
-        auth = requests_aws4auth.AWS4Auth(
-            creds.access_key,
-            creds.secret_key,
-            aws_session.region_name,
-            self.service_name,
-            session_token=creds.token,
-        )
-        transport = gql.transport.requests.RequestsHTTPTransport(
-            url=self.appsync_graphql_url,
-            use_json=True,
-            headers=self.headers,
-            auth=auth,
-        )
-        resp = transport.execute(query, variables)
-        if resp.errors:
-            raise Exception(f'Appsync resp error: `{resp.errors}` from query `{query}`, variables `{variables}`')
+        """
+        Execute the `query`, either a GqlMutation or a parsed gql document.
+        If mutations are being buffered, a GqlMutation is added to the buffer rather than sent.
+        """
+        if isinstance(query, GqlMutation):
+            if self.buffer_mutation(query, variables['input']):
+                return
+            return self.send_mutations([(query, variables['input'])])
+        return self.execute(print_ast(query), variables)
+
+    @contextlib.contextmanager
+    def buffer_mutations(self):
+        """
+        Within this context, GqlMutations passed to `send()` are accumulated rather than sent. Duplicates are
+        dropped, keeping the last occurrence. Upon exit, they are aliased together into as few requests as
+        possible, which are sent concurrently. Mutations with the same `userId` are kept in order in the same
+        request.
+
+        As the mutations are no longer sent by the code that requested them, failures are logged, not raised.
+        """
+        with self.mutation_buffer_lock:
+            assert self.mutation_buffer is None, 'Already buffering mutations'
+            self.mutation_buffer = {}
+        try:
+            yield
+        finally:
+            with self.mutation_buffer_lock:
+                mutation_buffer, self.mutation_buffer = self.mutation_buffer, None
+            self.flush_mutations(list(mutation_buffer.values()))
+
+    def buffer_mutation(self, mutation, input_obj):
+        "If mutations are being buffered, add one to the buffer and return True. Otherwise return False."
+        with self.mutation_buffer_lock:
+            if self.mutation_buffer is None:
+                return False
+            buffer_key = (mutation, json.dumps(input_obj, sort_keys=True, default=str))
+            # re-inserted so that mutations are sent in the order of their last occurrence
+            self.mutation_buffer.pop(buffer_key, None)
+            self.mutation_buffer[buffer_key] = (mutation, input_obj)
+            return True
+
+    def flush_mutations(self, mutations):
+        by_user_id = collections.defaultdict(list)
+        for mutation, input_obj in mutations:
+            by_user_id[input_obj.get('userId')].append((mutation, input_obj))
+        batches = [[]]
+        for user_mutations in by_user_id.values():
+            if batches[-1] and len(batches[-1]) + len(user_mutations) > self.mutation_batch_size:
+                batches.append([])
+            batches[-1].extend(user_mutations)
+        batches = [batch for batch in batches if batch]
+        if not batches:
+            return
+
+        def send_batch(batch):
+            try:
+                self.send_mutations(batch)
+            except Exception as err:
+                logger.warning(f'Failed to send batch of {len(batch)} mutations: {err}')
+
+        with ThreadPoolExecutor(max_workers=min(self.mutation_max_workers, len(batches))) as executor:
+            list(executor.map(send_batch, batches))
+
+    def send_mutations(self, mutations):
+        "Send a list of (GqlMutation, input) pairs in one request"
+        query = build_document(tuple(mutation for mutation, _ in mutations))
+        variables = {f'input{idx}': input_obj for idx, (_, input_obj) in enumerate(mutations)}
+        return self.execute(query, variables)
+
+    def execute(self, query, variables):
+        "Execute the `query` text, reusing connections & the request signer across calls"
+        payload = {'query': query, 'variables': variables}
+        resp = self.session.post(self.appsync_graphql_url, json=payload, headers=self.headers, auth=self.auth)
+        try:
+            result = resp.json()
+        except ValueError:
+            result = {}
+        if not isinstance(result, dict) or ('data' not in result and 'errors' not in result):
+            resp.raise_for_status()
+            raise Exception(f'Appsync did not return a GraphQL result: `{resp.text}` from query `{query}`')
+        if result.get('errors'):
+            raise Exception(
+                f'Appsync resp error: `{result["errors"]}` from query `{query}`, variables `{variables}`'
+            )
+        return result['data']
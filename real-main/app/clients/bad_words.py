@@ -1,6 +1,12 @@
+import collections
 import json
 import logging
 import os
+import string
+import threading
+import time
+
+import botocore
 
 from .s3 import S3Client
 
@@ -8,24 +14,113 @@ S3_BAD_WORDS_BUCKET = os.environ.get('S3_BAD_WORDS_BUCKET')
 logger = logging.getLogger()
 
 
+class BadWordsMatcher:
+    """
+    Aho-Corasick automaton that detects any of a set of bad words or phrases in a text, in one pass.
+
+    Matching is case insensitive and only whole words match. Whitespace and punctuation separate words,
+    except for punctuation that appears in one of the bad words themselves (ex: 'a$$').
+    """
+
+    def __init__(self, phrases, etag=None):
+        self.etag = etag
+        phrases = {' '.join(phrase.lower().split()) for phrase in phrases} - {''}
+        symbols = {char for phrase in phrases for char in phrase if char in string.punctuation}
+        self.separators = str.maketrans({char: ' ' for char in string.punctuation if char not in symbols})
+
+        # the trie, with each phrase padded by spaces so matches can only start and end at word boundaries
+        self.transitions = [{}]
+        self.is_match = [False]
+        for phrase in phrases:
+            state = 0
+            for char in f' {phrase} ':
+                if char not in self.transitions[state]:
+                    self.transitions[state][char] = len(self.transitions)
+                    self.transitions.append({})
+                    self.is_match.append(False)
+                state = self.transitions[state][char]
+            self.is_match[state] = True
+
+        # failure links, breadth first so shallower states are always linked first
+        self.failures = [0] * len(self.transitions)
+        queue = collections.deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                failure = self.failures[state]
+                while failure and char not in self.transitions[failure]:
+                    failure = self.failures[failure]
+                self.failures[next_state] = self.transitions[failure].get(char, 0)
+                self.is_match[next_state] = self.is_match[next_state] or self.is_match[self.failures[next_state]]
+
+    def normalize(self, text):
+        return ' ' + ' '.join(text.lower().translate(self.separators).split()) + ' '
+
+    def search(self, text):
+        "Return True if the text contains any of the bad words"
+        state = 0
+        for char in self.normalize(text):
+            while state and char not in self.transitions[state]:
+                state = self.failures[state]
+            state = self.transitions[state].get(char, 0)
+            if self.is_match[state]:
+                return True
+        return False
+
+
 class BadWordsClient:
+
+    # compiled matchers are shared by all clients in the process, keyed by (bucket_name, file_name)
+    matchers = {}
+    matchers_lock = threading.Lock()
+    # how often to check s3 for a new version of the bad words file
+    matcher_ttl_seconds = 5 * 60
+
     def __init__(self, bucket_name=S3_BAD_WORDS_BUCKET):
-        self.s3_bad_words = S3Client(bucket_name)
+        self.bucket_name = bucket_name
         self.file_name = 'bad_words.json'
+        self._s3_bad_words = None
 
-    def validate_bad_words_detection(self, text):
-        try:
-            fh = self.s3_bad_words.get_object_data_stream(self.file_name)
-        except Exception as err:
-            logger.warning(str(err))
-            raise err
+    @property
+    def s3_bad_words(self):
+        if self._s3_bad_words is None:
+            self._s3_bad_words = S3Client(self.bucket_name)
+        return self._s3_bad_words
 
-        data = json.loads(fh.read().decode())
-        bad_words = {word.lower(): '' for word in data.keys()}
-        words = text.split(' ')
+    def validate_bad_words_detection(self, text):
+        return self.get_matcher().search(text)
 
-        for word in words:
-            if bad_words.get(word.lower(), None) == '':
-                return True
+    def get_matcher(self, revalidate=False):
+        """
+        Return the compiled matcher for the bad words file. The file is downloaded and compiled once per
+        process, then revalidated against its ETag once the ttl passes, or immediately if `revalidate` is set.
+        """
+        key = (self.bucket_name, self.file_name)
+        with self.matchers_lock:
+            matcher, checked_at = self.matchers.get(key, (None, None))
+            if matcher and not revalidate and time.monotonic() - checked_at < self.matcher_ttl_seconds:
+                return matcher
+            try:
+                matcher = self.load_matcher(matcher)
+            except Exception as err:
+                logger.warning(str(err))
+                if not matcher:
+                    raise err
+                # keep using the stale matcher rather than letting detection fail
+            self.matchers[key] = (matcher, time.monotonic())
+            return matcher
 
-        return False
+    def load_matcher(self, matcher=None):
+        "If `matcher` was compiled from the current version of the file, it is returned as-is"
+        kwargs = {'IfNoneMatch': matcher.etag} if matcher and matcher.etag else {}
+        try:
+            resp = self.s3_bad_words.bucket.Object(self.file_name).get(**kwargs)
+        except botocore.exceptions.ClientError as err:
+            if err.response['Error']['Code'] in ('304', 'NotModified'):
+                return matcher
+            raise err
+        if matcher and matcher.etag and resp.get('ETag') == matcher.etag:
+            return matcher
+        data = json.loads(resp['Body'].read().decode())
+        return BadWordsMatcher(data.keys(), etag=resp.get('ETag'))
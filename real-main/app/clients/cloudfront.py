@@ -1,6 +1,9 @@
 import base64
+import collections
 import json
+import math
 import os
+import threading
 import urllib
 
 import botocore
@@ -17,10 +20,16 @@ class CloudFrontClient:
 
     lifetime = pendulum.duration(hours=48)
 
+    # default expiries are rounded up to the end of a window, so signatures can be reused within it
+    expiry_window = pendulum.duration(hours=1)
+    signature_cache_size = 4096
+
     def __init__(self, key_pair_getter, domain=CLOUDFRONT_UPLOADS_DOMAIN):
         assert domain, "CloudFront domain is required"
         self.domain = domain
         self.key_pair_getter = key_pair_getter
+        self.signature_cache = collections.OrderedDict()
+        self.signature_cache_lock = threading.Lock()
 
     def get_key_pair(self):
         if not hasattr(self, '_key_pair'):
@@ -54,12 +63,38 @@ class CloudFrontClient:
     def generate_unsigned_url(self, path):
         return f'https://{self.domain}/{path}'
 
+    def get_default_expires_at(self):
+        "Now plus our lifetime, rounded up to the end of the current expiry window"
+        window = self.expiry_window.in_seconds()
+        expires_at = (pendulum.now('utc') + self.lifetime).int_timestamp
+        return pendulum.from_timestamp(math.ceil(expires_at / window) * window)
+
     def generate_presigned_url(self, path, methods, expires_at=None):
         # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/cloudfront.html#examples
-        expires_at = expires_at or pendulum.now('utc') + self.lifetime
-        qs = urllib.parse.urlencode([('Method', m) for m in methods])
-        url = f'https://{self.domain}/{path}?{qs}'
-        return self.get_cloudfront_signer().generate_presigned_url(url, date_less_than=expires_at)
+        # Each url gets a canned policy signature that covers its `Method` params. A wildcard custom policy
+        # could be shared across paths, but it does not cover the query string, so the methods could be changed.
+        expires_at = expires_at or self.get_default_expires_at()
+        cache_key = (path, tuple(methods), expires_at.int_timestamp)
+        signed_url = self.get_cached_signature(cache_key)
+        if not signed_url:
+            qs = urllib.parse.urlencode([('Method', m) for m in methods])
+            url = f'https://{self.domain}/{path}?{qs}'
+            signed_url = self.get_cloudfront_signer().generate_presigned_url(url, date_less_than=expires_at)
+            self.cache_signature(cache_key, signed_url)
+        return signed_url
+
+    def get_cached_signature(self, cache_key):
+        with self.signature_cache_lock:
+            value = self.signature_cache.get(cache_key)
+            if value:
+                self.signature_cache.move_to_end(cache_key)
+            return value
+
+    def cache_signature(self, cache_key, value):
+        with self.signature_cache_lock:
+            self.signature_cache[cache_key] = value
+            while len(self.signature_cache) > self.signature_cache_size:
+                self.signature_cache.popitem(last=False)
 
     def generate_presigned_cookies(self, path, expires_at=None):
         # https://gist.github.com/mjohnsullivan/31064b04707923f82484c54981e4749e
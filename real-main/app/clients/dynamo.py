@@ -1,26 +1,94 @@
 import base64
+import collections
+import concurrent.futures
+import contextlib
+import copy
+import functools
 import json
 import logging
 import os
+import queue
+import random
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
+import pendulum
+from boto3.dynamodb.types import TypeDeserializer
 
+DYNAMO_COUNT_SHARDS = int(os.environ.get('DYNAMO_COUNT_SHARDS') or 0)
 DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
 logger = logging.getLogger()
 
+deserialize = TypeDeserializer().deserialize
+
+
+class ScanRateLimiter:
+    "Spaces out requests so the capacity they consume averages no more than `capacity_per_second`"
+
+    def __init__(self, capacity_per_second):
+        self.capacity_per_second = capacity_per_second
+        self.available_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            delay = self.available_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def consume(self, capacity_units):
+        with self.lock:
+            self.available_at = (
+                max(self.available_at, time.monotonic()) + capacity_units / self.capacity_per_second
+            )
+
+
+class CountBuffer:
+    "Changes to counters accumulated by `DynamoClient.buffer_counts()`, keyed by counter"
+
+    def __init__(self):
+        self.changes = collections.defaultdict(list)
+        self.discarded_sources = set()
+        self.failed_sources = set()
+
+    def discard_sources(self, sources):
+        "Drop the changes made from these sources, see `DynamoClient.count_changes_source()`"
+        self.discarded_sources.update(sources)
+
 
 class DynamoClient:
-    def __init__(self, table_name=DYNAMO_TABLE, create_table_schema=None):
+
+    # max number of pages (each up to 1MB) held between scan workers and the consumer of a parallel scan
+    scan_queue_size = 16
+    # segments of parallel scans are scanned by a pool of up to this many threads, kept for the client's life
+    scan_max_workers = 8
+    # unprocessed keys of a batch get are retried after a jittered, exponentially increasing delay
+    batch_retry_base_delay = 0.05  # seconds
+    batch_retry_max_delay = 2  # seconds
+    # changes pending in a counter shard are folded into the counted item once they are this old
+    count_shard_compact_after = pendulum.duration(seconds=10)
+
+    def __init__(self, table_name=DYNAMO_TABLE, create_table_schema=None, count_shards=DYNAMO_COUNT_SHARDS):
         """
         If create_table_schema is not None, then the table will be created
         on-the-fly. Useful when testing with a mocked dynamodb backend.
+
+        If count_shards is non-zero, changes to sharded counters are spread across that many shard items,
+        see `add_to_sharded_count()`. Otherwise sharded counters are written like any other counter.
         """
         assert table_name, "Table name is required"
         self.table_name = table_name
+        self.count_shards = count_shards
 
+        # boto3 resources are not thread safe, so each thread gets its own table, see `table`
+        self.table_local = threading.local()
+        self.thread_session = None
+        self.thread_session_lock = threading.Lock()
         boto3_resource = boto3.resource('dynamodb')
-        self.table = (
+        self.table_local.table = (
             boto3_resource.create_table(TableName=table_name, **create_table_schema)
             if create_table_schema
             else boto3_resource.Table(table_name)
@@ -29,6 +97,33 @@ class DynamoClient:
         self.boto3_client = boto3.client('dynamodb')
         self.exceptions = self.boto3_client.exceptions
 
+        self.count_buffer = None
+        self.count_buffer_lock = threading.Lock()
+        self.count_changes_local = threading.local()
+
+        self.item_cache = None
+        self.item_cache_stats = None
+
+    @property
+    def table(self):
+        "The boto3 table resource for use by the calling thread"
+        if not hasattr(self.table_local, 'table'):
+            self.table_local.table = self.init_table()
+        return self.table_local.table
+
+    def init_table(self):
+        # Sessions aren't thread safe, so the default session is left to the constructing thread and other
+        # threads take turns creating their resources from a second session. That session is kept, so
+        # credentials are resolved once rather than once per thread.
+        with self.thread_session_lock:
+            if self.thread_session is None:
+                self.thread_session = boto3.session.Session()
+            return self.thread_session.resource('dynamodb').Table(self.table_name)
+
+    @functools.cached_property
+    def scan_executor(self):
+        return ThreadPoolExecutor(max_workers=self.scan_max_workers)
+
     def add_item(self, query_kwargs):
         "Put an item and return what was putted"
         # ensure query fails if the item already exists
@@ -37,11 +132,53 @@ class DynamoClient:
             cond_exp += ' and (' + query_kwargs['ConditionExpression'] + ')'
         query_kwargs['ConditionExpression'] = cond_exp
         self.table.put_item(**query_kwargs)
-        return query_kwargs.get('Item')
+        item = query_kwargs.get('Item')
+        self.refresh_cached_item(item, item)
+        return item
+
+    def get_item(self, pk, cached=False, **kwargs):
+        """
+        Get an item by its primary key.
+        Set `cached` to allow the item to be read from and stored in the item cache, see `cache_items()`.
+        """
+        if not cached or self.item_cache is None or 'ProjectionExpression' in kwargs:
+            return self.table.get_item(Key=pk, **kwargs).get('Item')
+        cache_key = self.item_cache_key(pk)
+        if cache_key in self.item_cache and not kwargs.get('ConsistentRead'):
+            self.item_cache_stats['hits'] += 1
+            return copy.deepcopy(self.item_cache[cache_key])
+        self.item_cache_stats['misses'] += 1
+        item = self.table.get_item(Key=pk, **kwargs).get('Item')
+        self.item_cache[cache_key] = copy.deepcopy(item)
+        return item
 
-    def get_item(self, pk, **kwargs):
-        "Get an item by its primary key"
-        return self.table.get_item(Key=pk, **kwargs).get('Item')
+    @contextlib.contextmanager
+    def cache_items(self):
+        """
+        Within this context, items read with `get_item(..., cached=True)` are remembered, including
+        items that do not exist, and later cached reads of the same key are served from memory.
+        Writes through this client refresh or invalidate the affected entries.
+
+        Yields a Counter of cache hits & misses. Intended to be scoped to a single request.
+        """
+        assert self.item_cache is None, 'Already caching items'
+        self.item_cache, self.item_cache_stats = {}, collections.Counter(hits=0, misses=0)
+        try:
+            yield self.item_cache_stats
+        finally:
+            self.item_cache, self.item_cache_stats = None, None
+
+    def item_cache_key(self, key):
+        return (key['partitionKey'], key['sortKey'])
+
+    def refresh_cached_item(self, key, item):
+        "Replace the cached item, if caching is active. Pass None as `item` if it no longer exists."
+        if self.item_cache is not None and key:
+            self.item_cache[self.item_cache_key(key)] = copy.deepcopy(item)
+
+    def invalidate_cached_item(self, key):
+        if self.item_cache is not None:
+            self.item_cache.pop(self.item_cache_key(key), None)
 
     def get_typed_item(self, typed_pk, **kwargs):
         "Get an typed version of the item by its typed primary key"
@@ -62,6 +199,70 @@ class DynamoClient:
             kwargs['RequestItems'][self.table_name]['ProjectionExpression'] = projection_expression
         return self.boto3_client.batch_get_item(**kwargs)['Responses'][self.table_name]
 
+    def transact_get_untyped_items(self, keys):
+        """
+        Get a bunch of items by their primary keys, all as of the same point in time.
+        Both the input `keys` and the return value are in the plain format, without types.
+        Order maintained, with None in place of items that do not exist.
+        """
+        assert len(keys) <= 100, "Max 100 items per transact get request"
+        if len(keys) == 0:
+            return []
+        transact_items = [
+            {'Get': {'Key': {k: {'S': v} for k, v in key.items()}, 'TableName': self.table_name}} for key in keys
+        ]
+        resp = self.boto3_client.transact_get_items(TransactItems=transact_items)
+        return [
+            {k: deserialize(v) for k, v in resp_item['Item'].items()} if 'Item' in resp_item else None
+            for resp_item in resp['Responses']
+        ]
+
+    def batch_get_untyped_items(self, keys, cached=False, projection_expression=None):
+        """
+        Get a bunch of items by their primary keys, using as few batch requests as possible.
+        Both the input `keys` and the return value are in the plain format, without types.
+        Order *not* maintained, items that do not exist are omitted.
+        Set `cached` to allow the items to be read from and stored in the item cache, see `cache_items()`.
+        A `projection_expression` must include the primary key attributes, and can't be used with `cached`.
+        """
+        assert not (cached and projection_expression), 'Partial items cannot be cached'
+        # dynamo can't handle duplicates
+        keys_to_fetch = {self.item_cache_key(key): key for key in keys}
+        items = []
+        if cached and self.item_cache is not None:
+            for cache_key in [ck for ck in keys_to_fetch if ck in self.item_cache]:
+                del keys_to_fetch[cache_key]
+                self.item_cache_stats['hits'] += 1
+                if self.item_cache[cache_key] is not None:
+                    items.append(copy.deepcopy(self.item_cache[cache_key]))
+            self.item_cache_stats['misses'] += len(keys_to_fetch)
+
+        typed_keys = [{k: {'S': v} for k, v in key.items()} for key in keys_to_fetch.values()]
+        for idx in range(0, len(typed_keys), 100):
+            request_items = {self.table_name: {'Keys': typed_keys[idx : idx + 100]}}
+            if projection_expression:
+                request_items[self.table_name]['ProjectionExpression'] = projection_expression
+            retry_count = 0
+            while request_items:
+                if retry_count:
+                    # keys go unprocessed when reads are throttled, so give capacity a chance to recover
+                    delay = min(self.batch_retry_max_delay, self.batch_retry_base_delay * 2 ** retry_count)
+                    time.sleep(random.uniform(0, delay))
+                retry_count += 1
+                resp = self.boto3_client.batch_get_item(RequestItems=request_items)
+                for typed_item in resp['Responses'].get(self.table_name, []):
+                    item = {k: deserialize(v) for k, v in typed_item.items()}
+                    key = keys_to_fetch.pop(self.item_cache_key(item))
+                    if cached:
+                        self.refresh_cached_item(key, item)
+                    items.append(item)
+                request_items = resp.get('UnprocessedKeys')
+
+        if cached:
+            for key in keys_to_fetch.values():
+                self.refresh_cached_item(key, None)
+        return items
+
     def update_item(self, query_kwargs, failure_warning=None):
         """
         Update an item and return the new item.
@@ -74,11 +275,14 @@ class DynamoClient:
         query_kwargs['ConditionExpression'] = cond_exp
         query_kwargs['ReturnValues'] = 'ALL_NEW'
         try:
-            return self.table.update_item(**query_kwargs).get('Attributes')
+            item = self.table.update_item(**query_kwargs).get('Attributes')
         except self.exceptions.ConditionalCheckFailedException:
             if failure_warning is None:
                 raise
             logger.warning(failure_warning)
+        else:
+            self.refresh_cached_item(query_kwargs['Key'], item)
+            return item
 
     def set_attributes(self, key, **attributes):
         """
@@ -92,10 +296,20 @@ class DynamoClient:
             'ExpressionAttributeValues': {f':{k}': v for k, v in attributes.items()},
             'ReturnValues': 'ALL_NEW',
         }
-        return self.table.update_item(**kwargs).get('Attributes')
+        item = self.table.update_item(**kwargs).get('Attributes')
+        self.refresh_cached_item(key, item)
+        return item
 
-    def increment_count(self, key, attribute_name):
-        "Best-effort attempt to increment a counter. Logs a WARNING upon failure."
+    def increment_count(self, key, attribute_name, buffered=False, sharded=False):
+        """
+        Best-effort attempt to increment a counter. Logs a WARNING upon failure.
+        Set `buffered` to allow the write to be deferred and coalesced, see `buffer_counts()`.
+        Set `sharded` to allow the write to go to a shard of the counter, see `add_to_sharded_count()`.
+        """
+        if sharded and self.count_shards:
+            return self.add_to_sharded_count(key, attribute_name, 1, buffered=buffered)
+        if buffered and self.buffer_count(key, attribute_name, 1):
+            return None
         query_kwargs = {
             'Key': key,
             'UpdateExpression': 'ADD #attrName :one',
@@ -106,8 +320,16 @@ class DynamoClient:
         failure_warning = f'Failed to increment {attribute_name} for key `{key}`'
         return self.update_item(query_kwargs, failure_warning=failure_warning)
 
-    def decrement_count(self, key, attribute_name):
-        "Best-effort attempt to decrement a counter. Logs a WARNING upon failure."
+    def decrement_count(self, key, attribute_name, buffered=False, sharded=False):
+        """
+        Best-effort attempt to decrement a counter. Logs a WARNING upon failure.
+        Set `buffered` to allow the write to be deferred and coalesced, see `buffer_counts()`.
+        Set `sharded` to allow the write to go to a shard of the counter, see `add_to_sharded_count()`.
+        """
+        if sharded and self.count_shards:
+            return self.add_to_sharded_count(key, attribute_name, -1, buffered=buffered)
+        if buffered and self.buffer_count(key, attribute_name, -1):
+            return None
         query_kwargs = {
             'Key': key,
             'UpdateExpression': 'ADD #attrName :neg_one',
@@ -118,12 +340,328 @@ class DynamoClient:
         failure_warning = f'Failed to decrement {attribute_name} for key `{key}`'
         return self.update_item(query_kwargs, failure_warning=failure_warning)
 
+    @contextlib.contextmanager
+    def buffer_counts(self):
+        """
+        Within this context, counter changes passed to `buffer_count()` are accumulated rather
+        than written. Upon exit, one write is issued per counter to apply its net change.
+
+        Decrements keep their semantics of never taking a counter below zero. If the counter's
+        value will not allow the net change to be applied as a whole, the individual changes
+        are applied one at a time, exactly as they would have been without buffering.
+
+        Yields a CountBuffer. Changes made from a source passed to its `discard_sources()` are not
+        written. After exit, its `failed_sources` are those sources with changes that failed to write.
+        """
+        with self.count_buffer_lock:
+            assert self.count_buffer is None, 'Already buffering counts'
+            self.count_buffer = CountBuffer()
+        try:
+            yield self.count_buffer
+        finally:
+            with self.count_buffer_lock:
+                count_buffer, self.count_buffer = self.count_buffer, None
+            self.flush_counts(count_buffer)
+
+    @contextlib.contextmanager
+    def count_changes_source(self, source):
+        "Within this context, changes buffered by the current thread are attributed to `source`"
+        self.count_changes_local.source = source
+        try:
+            yield
+        finally:
+            self.count_changes_local.source = None
+
+    def buffer_count(self, key, attribute_name, delta, sharded=False, **attributes_to_set):
+        """
+        If counts are being buffered, add a change to a counter to the buffer and return True.
+        Otherwise return False. Any `attributes_to_set` will be SET in the same write as the counter.
+        Set `sharded` to have the net change written to a shard of the counter, if sharding is enabled.
+        """
+        sharded = sharded and bool(self.count_shards)
+        assert not (sharded and attributes_to_set), 'Sharded counters cannot set attributes'
+        source = getattr(self.count_changes_local, 'source', None)
+        with self.count_buffer_lock:
+            if self.count_buffer is None:
+                return False
+            buffer_key = (tuple(sorted(key.items())), attribute_name, sharded)
+            self.count_buffer.changes[buffer_key].append((delta, attributes_to_set, source))
+            return True
+
+    def flush_counts(self, count_buffer):
+        for (key_items, attribute_name, sharded), source_changes in count_buffer.changes.items():
+            key = dict(key_items)
+            source_changes = [sc for sc in source_changes if sc[2] not in count_buffer.discarded_sources]
+            changes = [(delta, attrs) for delta, attrs, _ in source_changes]
+            try:
+                if sharded:
+                    self.add_to_sharded_count(key, attribute_name, sum(delta for delta, _ in changes))
+                else:
+                    self.apply_count_changes(key, attribute_name, changes)
+            except Exception as err:
+                logger.exception(f'Failed to apply buffered changes to {attribute_name} for key `{key}`: {err}')
+                failed_sources = (source for _, _, source in source_changes if source is not None)
+                count_buffer.failed_sources.update(failed_sources)
+
+    def apply_count_changes(self, key, attribute_name, changes):
+        net_delta, min_running_delta = 0, 0
+        attributes_to_set = {}
+        for delta, attrs in changes:
+            net_delta += delta
+            min_running_delta = min(min_running_delta, net_delta)
+            attributes_to_set.update(attrs)
+        if net_delta == 0 and min_running_delta == 0 and not attributes_to_set:
+            return
+
+        # the counter must be large enough to never go negative while the changes are applied
+        try:
+            return self.add_to_count(key, attribute_name, net_delta, -min_running_delta, attributes_to_set)
+        except self.exceptions.ConditionalCheckFailedException:
+            pass
+        for delta, attrs in changes:
+            failure_warning = f'Failed to add {delta} to {attribute_name} for key `{key}`'
+            self.add_to_count(key, attribute_name, delta, max(-delta, 0), attrs, failure_warning=failure_warning)
+
+    def add_to_count(self, key, attribute_name, delta, min_value, attributes_to_set, failure_warning=None):
+        "Add `delta` to a counter, which must have a value of at least `min_value` beforehand"
+        query_kwargs = {
+            'Key': key,
+            'UpdateExpression': 'ADD #attrName :delta',
+            'ExpressionAttributeNames': {'#attrName': attribute_name},
+            'ExpressionAttributeValues': {':delta': delta},
+        }
+        if min_value > 0:
+            query_kwargs['ConditionExpression'] = '#attrName >= :minValue'
+            query_kwargs['ExpressionAttributeValues'][':minValue'] = min_value
+        if attributes_to_set:
+            set_exps = []
+            for idx, (name, value) in enumerate(attributes_to_set.items()):
+                set_exps.append(f'#set{idx} = :set{idx}')
+                query_kwargs['ExpressionAttributeNames'][f'#set{idx}'] = name
+                query_kwargs['ExpressionAttributeValues'][f':set{idx}'] = value
+            query_kwargs['UpdateExpression'] += ' SET ' + ', '.join(set_exps)
+        return self.update_item(query_kwargs, failure_warning=failure_warning)
+
+    # attributes of a counter shard that are not counters
+    count_shard_attributes = (
+        'partitionKey',
+        'sortKey',
+        'schemaVersion',
+        'shardVersion',
+        'gsiK1PartitionKey',
+        'gsiK1SortKey',
+    )
+
+    def count_shard_key(self, key, shard):
+        return {'partitionKey': f'{key["partitionKey"]}#{shard}', 'sortKey': f'counterShard/{key["sortKey"]}'}
+
+    def counted_key(self, shard_key):
+        "The key of the item counted by a counter shard"
+        return {
+            'partitionKey': shard_key['partitionKey'].rsplit('#', 1)[0],
+            'sortKey': shard_key['sortKey'].split('/', 1)[1],
+        }
+
+    def add_to_sharded_count(self, key, attribute_name, delta, buffered=False):
+        """
+        Add `delta` to a counter by way of a randomly chosen one of its shards, so that writes to a
+        hot counter are spread across `count_shards` items in as many partitions. Changes pending in
+        a shard are folded into the counted item once they are `count_shard_compact_after` old,
+        either by the next write to that shard or by `compact_stale_count_shards()`, so the counted
+        item is eventually correct. Use `get_sharded_count()` for an exact read.
+
+        Decrements may take the changes pending in shards below zero, but the counter is clamped at zero when
+        they are folded in.
+        Set `buffered` to allow the write to be deferred and coalesced, see `buffer_counts()`.
+        """
+        if buffered and self.buffer_count(key, attribute_name, delta, sharded=True):
+            return None
+        if delta == 0:
+            return None
+        shard = random.randrange(self.count_shards)
+        shard_key = self.count_shard_key(key, shard)
+        now = pendulum.now('utc')
+        query_kwargs = {
+            'Key': shard_key,
+            'UpdateExpression': (
+                'ADD #attrName :delta, shardVersion :one '
+                'SET schemaVersion = if_not_exists(schemaVersion, :zero), gsiK1PartitionKey = :gsik1pk, '
+                'gsiK1SortKey = if_not_exists(gsiK1SortKey, :now)'
+            ),
+            'ExpressionAttributeNames': {'#attrName': attribute_name},
+            'ExpressionAttributeValues': {
+                ':delta': delta,
+                ':one': 1,
+                ':zero': 0,
+                ':gsik1pk': f'counterShard/{shard}',
+                ':now': now.to_iso8601_string(),
+            },
+            'ReturnValues': 'ALL_NEW',
+        }
+        shard_item = self.table.update_item(**query_kwargs)['Attributes']
+        if pendulum.parse(shard_item['gsiK1SortKey']) <= now - self.count_shard_compact_after:
+            self.compact_count_shards(key)
+        return None
+
+    def compact_count_shards(self, key, now=None):
+        """
+        Fold the changes pending in the shards of a counted item into it. The shards are read as of one point
+        in time and folded in together, so changes to a counter that landed in different shards (a like and
+        an unlike, say) can't be folded in out of order and take the counter through a value it never had.
+        Shards with nothing pending, or whose counted item no longer exists, are deleted.
+
+        As decrements aren't checked against the counter when written to a shard, a counter that the net
+        change would take below zero (replayed decrements, say) is set to zero instead.
+        """
+        now = now or pendulum.now('utc')
+        shard_keys = [self.count_shard_key(key, shard) for shard in range(self.count_shards)]
+        counted_item, *shard_items = self.transact_get_untyped_items([key, *shard_keys])
+        pending, net_deltas = [], collections.Counter()
+        for shard_item in filter(None, shard_items):
+            deltas = self.count_shard_deltas(shard_item)
+            if not deltas:
+                self.delete_count_shard(shard_item)
+                continue
+            pending.append((shard_item, deltas))
+            net_deltas.update(deltas)
+        if not pending:
+            return
+        if counted_item is None:
+            for shard_item, _ in pending:
+                self.delete_count_shard(shard_item)
+            return
+
+        transacts = []
+        for shard_item, deltas in pending:
+            shard_key = {k: shard_item[k] for k in ('partitionKey', 'sortKey')}
+            # ADDing the negation rather than zeroing keeps any changes written concurrently, and
+            # the condition on the sweep marker ensures the same changes are only ever folded in once
+            update = self.count_add_update(shard_key, {name: -value for name, value in deltas.items()})
+            update['UpdateExpression'] += ' SET gsiK1SortKey = :now'
+            update['ConditionExpression'] = 'gsiK1SortKey = :pendingSince'
+            update['ExpressionAttributeValues'][':now'] = {'S': now.to_iso8601_string()}
+            update['ExpressionAttributeValues'][':pendingSince'] = {'S': shard_item['gsiK1SortKey']}
+            transacts.append({'Update': update})
+        net_deltas = {name: value for name, value in net_deltas.items() if value != 0}
+        if net_deltas:
+            transacts.append({'Update': self.count_compact_update(key, counted_item, net_deltas)})
+        try:
+            self.transact_write_items(transacts)
+        except self.exceptions.TransactionCanceledException:
+            if self.get_item(key) is None:
+                for shard_item, _ in pending:
+                    self.delete_count_shard(shard_item)
+            # otherwise another compaction of these shards beat us to it
+
+    def count_shard_deltas(self, shard_item):
+        "The non-zero changes pending in a counter shard, by attribute name"
+        return {
+            name: value
+            for name, value in shard_item.items()
+            if name not in self.count_shard_attributes and value != 0
+        }
+
+    def count_add_update(self, key, deltas):
+        "A transact write `Update` that ADDs `deltas` to the attributes of the item with `key`"
+        return {
+            'Key': {k: {'S': v} for k, v in key.items()},
+            'UpdateExpression': 'ADD ' + ', '.join(f'#a{idx} :v{idx}' for idx in range(len(deltas))),
+            'ExpressionAttributeNames': {f'#a{idx}': name for idx, name in enumerate(deltas)},
+            'ExpressionAttributeValues': {
+                f':v{idx}': {'N': str(value)} for idx, value in enumerate(deltas.values())
+            },
+        }
+
+    def count_compact_update(self, key, counted_item, net_deltas):
+        """
+        A transact write `Update` that applies `net_deltas` to the counters of `counted_item`, as read.
+        Counters the change would take below zero are set to zero, conditional on them not having changed.
+        """
+        adds, sets, conditions = [], [], ['attribute_exists(partitionKey)']
+        names, values = {}, {}
+        for idx, (name, delta) in enumerate(net_deltas.items()):
+            names[f'#a{idx}'] = name
+            current = counted_item.get(name)
+            if (current or 0) + delta >= 0:
+                adds.append(f'#a{idx} :v{idx}')
+                values[f':v{idx}'] = {'N': str(delta)}
+                continue
+            sets.append(f'#a{idx} = :zero')
+            values[':zero'] = {'N': '0'}
+            if current is None:
+                conditions.append(f'attribute_not_exists(#a{idx})')
+            else:
+                conditions.append(f'#a{idx} = :v{idx}')
+                values[f':v{idx}'] = {'N': str(current)}
+        clauses = [f'{action} ' + ', '.join(parts) for action, parts in (('ADD', adds), ('SET', sets)) if parts]
+        return {
+            'Key': {k: {'S': v} for k, v in key.items()},
+            'UpdateExpression': ' '.join(clauses),
+            'ConditionExpression': ' AND '.join(conditions),
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values,
+        }
+
+    def delete_count_shard(self, shard_item):
+        "Delete the counter shard, as long as it has not been written to since it was read"
+        shard_key = {k: shard_item[k] for k in ('partitionKey', 'sortKey')}
+        kwargs = {
+            'ConditionExpression': 'shardVersion = :shardVersion',
+            'ExpressionAttributeValues': {':shardVersion': shard_item['shardVersion']},
+        }
+        try:
+            self.delete_item(shard_key, **kwargs)
+        except self.exceptions.ConditionalCheckFailedException:
+            pass
+
+    def get_sharded_count(self, key, attribute_name):
+        """
+        Get the exact value of a sharded counter, including changes still pending in its shards.
+        Never negative, as the counter is clamped at zero when those changes are folded in.
+        """
+        item = self.get_item(key, ConsistentRead=True)
+        count = item.get(attribute_name, 0) if item else 0
+        if self.count_shards:
+            shard_keys = [self.count_shard_key(key, shard) for shard in range(self.count_shards)]
+            count += sum(shard.get(attribute_name, 0) for shard in self.batch_get_untyped_items(shard_keys))
+        return max(count, 0)
+
+    def generate_stale_count_shard_keys(self, pending_before):
+        "Generate the keys of counter shards with changes that have been pending since before `pending_before`"
+        for shard in range(self.count_shards):
+            query_kwargs = {
+                'KeyConditionExpression': 'gsiK1PartitionKey = :gsik1pk AND gsiK1SortKey < :before',
+                'ExpressionAttributeValues': {
+                    ':gsik1pk': f'counterShard/{shard}',
+                    ':before': pending_before.to_iso8601_string(),
+                },
+                'IndexName': 'GSI-K1',
+            }
+            for item in self.generate_all_query(query_kwargs):
+                yield {k: item[k] for k in ('partitionKey', 'sortKey')}
+
+    def compact_stale_count_shards(self, now=None):
+        """
+        Compact the shards of all counted items with changes that have been pending too long.
+        Returns count of counted items compacted.
+        """
+        now = now or pendulum.now('utc')
+        compacted = set()
+        for shard_key in self.generate_stale_count_shard_keys(now - self.count_shard_compact_after):
+            key = self.counted_key(shard_key)
+            if (key['partitionKey'], key['sortKey']) in compacted:
+                continue
+            self.compact_count_shards(key, now=now)
+            compacted.add((key['partitionKey'], key['sortKey']))
+        return len(compacted)
+
     def batch_put_items(self, generator):
         "Batch put the items yielded by `generator`. Returns count of how many puts requested."
         cnt = 0
         with self.table.batch_writer() as batch:
             for item in generator:
                 batch.put_item(Item=item)
+                self.invalidate_cached_item(item)
                 cnt += 1
         return cnt
 
@@ -131,7 +669,9 @@ class DynamoClient:
         "Delete an item and return what was deleted"
         return_values = kwargs.pop('ReturnValues', 'ALL_OLD')
         # return None if nothing was deleted, rather than an empty dict
-        return self.table.delete_item(Key=pk, ReturnValues=return_values, **kwargs).get('Attributes') or None
+        item = self.table.delete_item(Key=pk, ReturnValues=return_values, **kwargs).get('Attributes') or None
+        self.refresh_cached_item(pk, None)
+        return item
 
     def batch_delete_items(self, generator):
         "Batch delete the items or keys yielded by `generator`. Returns count of how many deletes requested."
@@ -144,6 +684,7 @@ class DynamoClient:
         with self.table.batch_writer() as batch:
             for key in key_generator:
                 batch.delete_item(Key=key)
+                self.invalidate_cached_item(key)
                 cnt += 1
         return cnt
 
@@ -188,16 +729,83 @@ class DynamoClient:
                 yield item
             last_key = resp.get('LastEvaluatedKey')
 
-    def generate_all_scan(self, scan_kwargs):
-        "Return a generator that iterates over all results of the scan"
+    def generate_all_scan(self, scan_kwargs, total_segments=None, max_capacity_per_second=None):
+        """
+        Return a generator that iterates over all results of the scan.
+
+        If `total_segments` is more than one, the table is scanned as that many segments in parallel and
+        items are yielded in no particular order. Set `max_capacity_per_second` to limit the read capacity
+        units consumed by the scan, across all segments.
+        """
+        rate_limiter = ScanRateLimiter(max_capacity_per_second) if max_capacity_per_second else None
+        if total_segments and total_segments > 1:
+            return self.generate_parallel_scan(scan_kwargs, total_segments, rate_limiter=rate_limiter)
+        pages = self.generate_scan_pages(scan_kwargs, rate_limiter=rate_limiter)
+        return (item for page in pages for item in page)
+
+    def generate_scan_pages(self, scan_kwargs, rate_limiter=None):
+        if rate_limiter:
+            scan_kwargs = {**scan_kwargs, 'ReturnConsumedCapacity': 'TOTAL'}
         last_key = False
         while last_key is not None:
             start_kwargs = {'ExclusiveStartKey': last_key} if last_key else {}
+            if rate_limiter:
+                rate_limiter.wait()
             resp = self.table.scan(**scan_kwargs, **start_kwargs)
-            for item in resp['Items']:
-                yield item
+            if rate_limiter:
+                rate_limiter.consume(resp.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+            yield resp['Items']
             last_key = resp.get('LastEvaluatedKey')
 
+    def generate_parallel_scan(self, scan_kwargs, total_segments, rate_limiter=None):
+        """
+        Each segment is scanned by a worker thread, which hands pages of items over through a bounded
+        queue. Workers block while the queue is full, so memory use is bounded by the consumer.
+
+        The worker threads are pooled across scans, so their table resources are reused. As workers of one
+        scan wait on its consumer, iterate parallel scans one at a time rather than interleaved.
+        """
+        pages = queue.Queue(maxsize=self.scan_queue_size)
+        stopped = threading.Event()
+        segment_done = object()
+
+        def put(page):
+            while not stopped.is_set():
+                try:
+                    pages.put(page, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def scan_segment(segment):
+            segment_kwargs = {**scan_kwargs, 'Segment': segment, 'TotalSegments': total_segments}
+            try:
+                for page in self.generate_scan_pages(segment_kwargs, rate_limiter=rate_limiter):
+                    if not put(page):
+                        return
+            except Exception as err:
+                put(err)
+            else:
+                put(segment_done)
+
+        futures = [self.scan_executor.submit(scan_segment, segment) for segment in range(total_segments)]
+        try:
+            remaining = total_segments
+            while remaining:
+                page = pages.get()
+                if page is segment_done:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield from page
+        finally:
+            stopped.set()
+            for future in futures:
+                future.cancel()
+            concurrent.futures.wait(futures)
+
     def transact_write_items(self, transact_items, transact_exceptions=None):
         """
         Apply the given write operations in a transaction.
@@ -215,7 +823,11 @@ class DynamoClient:
             assert len(transact_items) == len(transact_exceptions)
 
         for ti in transact_items:
-            list(ti.values()).pop()['TableName'] = self.table_name
+            operation = list(ti.values()).pop()
+            operation['TableName'] = self.table_name
+            if self.item_cache is not None:
+                typed_key = operation.get('Key') or operation['Item']
+                self.invalidate_cached_item({k: deserialize(typed_key[k]) for k in ('partitionKey', 'sortKey')})
 
         try:
             self.boto3_client.transact_write_items(TransactItems=transact_items)
@@ -1,43 +1,63 @@
+import collections
+import contextlib
 import json
 import logging
 import os
+import threading
+import time
 
-import boto3
 import requests
-import requests_aws4auth
+
+from .transport import AWSRequestSigner, get_session
 
 logger = logging.getLogger()
 
 ELASTICSEARCH_DOMAIN = os.environ.get('ELASTICSEARCH_DOMAIN')
 
 
+class ElasticSearchBulkException(Exception):
+    "Documents still failed transiently after all attempts to apply them in bulk"
+
+    def __init__(self, errors, permanent_errors):
+        self.errors = errors
+        self.permanent_errors = permanent_errors
+        super().__init__(f'Failed to bulk apply {len(errors)} documents after retrying')
+
+
+class ActionBuffer:
+    "Actions accumulated by `ElasticSearchClient.buffer_actions()`, keyed by (index, doc_id)"
+
+    def __init__(self):
+        self.actions = {}
+        self.sources = collections.defaultdict(set)
+        self.failed_sources = set()
+
+
 class ElasticSearchClient:
 
     service = 'es'
     headers = {'Content-Type': 'application/json'}
+    bulk_headers = {'Content-Type': 'application/x-ndjson'}
+    # max number of documents sent in one _bulk request
+    bulk_max_actions = 500
+    # documents that fail with one of these statuses, or a connection error, are retried
+    bulk_retryable_statuses = {429, 500, 502, 503, 504}
+    bulk_max_attempts = 5
+    bulk_retry_delay_seconds = 0.5
 
     def __init__(self, domain=ELASTICSEARCH_DOMAIN):
         assert domain, '`domain` is required'
         self.domain = domain
-
-    @property
-    def awsauth(self):
-        if not hasattr(self, '_awsauth'):
-            session = boto3.Session()
-            credentials = session.get_credentials().get_frozen_credentials()
-            self._awsauth = requests_aws4auth.AWS4Auth(
-                credentials.access_key,
-                credentials.secret_key,
-                session.region_name,
-                self.service,
-                session_token=credentials.token,
-            )
-        return self._awsauth
+        self.session = get_session()
+        self.awsauth = AWSRequestSigner(self.service)
+        self.action_buffer = None
+        self.action_buffer_lock = threading.Lock()
+        self.actions_local = threading.local()
 
     def query_users(self, query):
         "`query` should be dict-like structure that can be serialized to json"
         url = f'https://{self.domain}/users/_search'
-        resp = requests.get(url, auth=self.awsauth, json={'query': query}, headers=self.headers)
+        resp = self.session.get(url, auth=self.awsauth, json={'query': query}, headers=self.headers)
         if resp.status_code != 200:
             logging.warning(f'ElasticSearch: Recieved non-200 response of {resp.status_code} when querying users')
         return resp.json()
@@ -45,7 +65,7 @@ class ElasticSearchClient:
     def query_posts(self, query):
         "`query` should be dict-like structure that can be serialized to json"
         url = f'https://{self.domain}/posts/_search'
-        resp = requests.post(url, auth=self.awsauth, data=json.dumps(query), headers=self.headers)
+        resp = self.session.post(url, auth=self.awsauth, data=json.dumps(query), headers=self.headers)
         if resp.status_code != 200:
             logging.warning(f'ElasticSearch: Recieved non-200 response of {resp.status_code} when querying posts')
         return resp.json()
@@ -53,7 +73,7 @@ class ElasticSearchClient:
     def query_keywords(self, query):
         "`query` should be dict-like structure that can be serialized to json"
         url = f'https://{self.domain}/keywords/_search'
-        resp = requests.post(url, auth=self.awsauth, data=json.dumps(query), headers=self.headers)
+        resp = self.session.post(url, auth=self.awsauth, data=json.dumps(query), headers=self.headers)
         if resp.status_code != 200:
             logging.warning(
                 f'ElasticSearch: Recieved non-200 response of {resp.status_code} when querying keywords'
@@ -83,47 +103,152 @@ class ElasticSearchClient:
 
     def put_user(self, user_id, username, full_name):
         doc = self.build_user_doc(user_id, username, full_name)
-        url = self.build_user_url(user_id)
-        logging.info(f'ElasticSearch: Putting user to index at `{url}` ' + json.dumps(doc))
-        resp = requests.put(url, auth=self.awsauth, json=doc, headers=self.headers)
-        if resp.status_code // 100 != 2:
-            logging.warning(f'ElasticSearch: Recieved non-2XX response of {resp.status_code} when adding user')
+        self.put_doc('users', user_id, doc, self.build_user_url(user_id))
 
     def delete_user(self, user_id):
-        url = self.build_user_url(user_id)
-        logging.info(f'ElasticSearch: Deleting user from index at `{url}`')
-        resp = requests.delete(url, auth=self.awsauth)
-        if resp.status_code != 200:
-            logging.warning(f'ElasticSearch: Recieved non-200 response of {resp.status_code} when deleting user')
+        self.delete_doc('users', user_id, self.build_user_url(user_id))
 
     def put_post(self, post_id, keywords):
         doc = self.build_post_doc(post_id, keywords)
-        url = self.build_post_url(post_id)
-        logging.info(f'ElasticSearch: Putting post to index at `{url}` ' + json.dumps(doc))
-        resp = requests.put(url, auth=self.awsauth, json=doc, headers=self.headers)
-        if resp.status_code // 100 != 2:
-            logging.warning(f'ElasticSearch: Recieved non-2XX response of {resp.status_code} when adding post')
+        self.put_doc('posts', post_id, doc, self.build_post_url(post_id))
 
     def delete_post(self, post_id):
-        url = self.build_post_url(post_id)
-        logging.info(f'ElasticSearch: Deleting post from index at `{url}`')
-        resp = requests.delete(url, auth=self.awsauth)
-        if resp.status_code != 200:
-            logging.warning(f'ElasticSearch: Recieved non-200 response of {resp.status_code} when deleting post')
+        self.delete_doc('posts', post_id, self.build_post_url(post_id))
 
     def put_keyword(self, post_id, keyword):
         doc = self.build_keyword_doc(keyword)
-        url = self.build_keyword_url(post_id, keyword)
-        logging.info(f'ElasticSearch: Putting keyword to index at `{url}` ' + json.dumps(doc))
-        resp = requests.put(url, auth=self.awsauth, json=doc, headers=self.headers)
-        if resp.status_code // 100 != 2:
-            logging.warning(f'ElasticSearch: Recieved non-2XX response of {resp.status_code} when adding keyword')
+        self.put_doc('keywords', f'{post_id}-{keyword}', doc, self.build_keyword_url(post_id, keyword))
 
     def delete_keyword(self, post_id, keyword):
-        url = self.build_keyword_url(post_id, keyword)
-        logging.info(f'ElasticSearch: Deleting keyword from index at `{url}`')
-        resp = requests.delete(url, auth=self.awsauth)
+        self.delete_doc('keywords', f'{post_id}-{keyword}', self.build_keyword_url(post_id, keyword))
+
+    def put_doc(self, index, doc_id, doc, url):
+        if self.buffer_action(index, doc_id, doc):
+            return
+        logging.info(f'ElasticSearch: Putting doc to index at `{url}` ' + json.dumps(doc))
+        resp = self.session.put(url, auth=self.awsauth, json=doc, headers=self.headers)
+        if resp.status_code // 100 != 2:
+            logging.warning(
+                f'ElasticSearch: Recieved non-2XX response of {resp.status_code} when adding to {index}'
+            )
+
+    def delete_doc(self, index, doc_id, url):
+        if self.buffer_action(index, doc_id, None):
+            return
+        logging.info(f'ElasticSearch: Deleting doc from index at `{url}`')
+        resp = self.session.delete(url, auth=self.awsauth)
         if resp.status_code != 200:
             logging.warning(
-                f'ElasticSearch: Recieved non-200 response of {resp.status_code} when deleting keyword'
+                f'ElasticSearch: Recieved non-200 response of {resp.status_code} when deleting from {index}'
             )
+
+    @contextlib.contextmanager
+    def buffer_actions(self):
+        """
+        Within this context, documents put to or deleted from the indices are accumulated rather than sent.
+        Upon exit, they are sent using as few `_bulk` requests as possible. Only the last action for each
+        document is sent, so a delete followed by a put of the same document results in just the put.
+
+        Yields an ActionBuffer. After exit, its `failed_sources` are those sources with actions on documents
+        that could not be applied due to transient errors, see `actions_source()`.
+        """
+        with self.action_buffer_lock:
+            assert self.action_buffer is None, 'Already buffering actions'
+            self.action_buffer = ActionBuffer()
+        try:
+            yield self.action_buffer
+        finally:
+            with self.action_buffer_lock:
+                action_buffer, self.action_buffer = self.action_buffer, None
+            self.flush_actions(action_buffer)
+
+    @contextlib.contextmanager
+    def actions_source(self, source):
+        "Within this context, actions buffered by the current thread are attributed to `source`"
+        self.actions_local.source = source
+        try:
+            yield
+        finally:
+            self.actions_local.source = None
+
+    def buffer_action(self, index, doc_id, doc):
+        """
+        If actions are being buffered, add a put (or a delete, if `doc` is None) of a document to the buffer
+        and return True. Otherwise return False.
+        """
+        source = getattr(self.actions_local, 'source', None)
+        with self.action_buffer_lock:
+            if self.action_buffer is None:
+                return False
+            # re-inserted so that actions are sent in the order of their last occurrence
+            self.action_buffer.actions.pop((index, doc_id), None)
+            self.action_buffer.actions[(index, doc_id)] = (index, doc_id, doc)
+            if source is not None:
+                self.action_buffer.sources[(index, doc_id)].add(source)
+            return True
+
+    def flush_actions(self, action_buffer):
+        try:
+            errors = self.bulk(list(action_buffer.actions.values()))
+        except ElasticSearchBulkException as err:
+            errors = err.permanent_errors + err.errors
+            for error in err.errors:
+                action_buffer.failed_sources.update(action_buffer.sources[(error['index'], error['id'])])
+        for error in errors:
+            logging.warning(
+                f'ElasticSearch: Failed to bulk {error["action"]} `{error["index"]}/{error["id"]}`: {error}'
+            )
+
+    def bulk(self, actions):
+        """
+        Apply a list of (index, doc_id, doc) actions, where a `doc` of None deletes the document.
+        Documents that fail with a transient error are retried with backoff.
+        Returns a list of errors, one for each document that failed permanently. If any documents were still
+        failing transiently once out of attempts, ElasticSearchBulkException is raised after all are sent.
+        """
+        errors, retry_errors = [], []
+        for idx in range(0, len(actions), self.bulk_max_actions):
+            chunk_errors, chunk_retry_errors = self.send_bulk(actions[idx : idx + self.bulk_max_actions])
+            errors.extend(chunk_errors)
+            retry_errors.extend(chunk_retry_errors)
+        if retry_errors:
+            raise ElasticSearchBulkException(retry_errors, errors)
+        return errors
+
+    def send_bulk(self, actions):
+        "Returns a tuple of errors: those that failed permanently, and those still failing transiently"
+        url = f'https://{self.domain}/_bulk'
+        errors = []
+        for attempt in range(self.bulk_max_attempts):
+            if attempt > 0:
+                time.sleep(self.bulk_retry_delay_seconds * 2 ** (attempt - 1))
+            body = ''.join(self.build_bulk_lines(*action) for action in actions)
+            try:
+                resp = self.session.post(url, auth=self.awsauth, data=body.encode(), headers=self.bulk_headers)
+            except requests.RequestException as err:
+                results = [{'status': None, 'error': str(err)}] * len(actions)
+            else:
+                if resp.status_code == 200:
+                    results = [next(iter(item.values())) for item in resp.json()['items']]
+                else:
+                    results = [{'status': resp.status_code, 'error': resp.text}] * len(actions)
+
+            retry_actions = []
+            for action, result in zip(actions, results):
+                status, op = result['status'], 'index' if action[2] is not None else 'delete'
+                if status and (status // 100 == 2 or (op == 'delete' and status == 404)):
+                    continue
+                error = {'action': op, 'index': action[0], 'id': action[1], **result}
+                if status is None or status in self.bulk_retryable_statuses:
+                    retry_actions.append((action, error))
+                else:
+                    errors.append(error)
+            if not retry_actions:
+                return errors, []
+            actions = [action for action, _ in retry_actions]
+        return errors, [error for _, error in retry_actions]
+
+    def build_bulk_lines(self, index, doc_id, doc):
+        if doc is None:
+            return json.dumps({'delete': {'_index': index, '_id': doc_id}}) + '\n'
+        return json.dumps({'index': {'_index': index, '_id': doc_id}}) + '\n' + json.dumps(doc) + '\n'
@@ -1,6 +1,6 @@
 import logging
 
-import requests
+from .transport import get_session
 
 logger = logging.getLogger()
 
@@ -8,6 +8,7 @@ logger = logging.getLogger()
 class PostVerificationClient:
     def __init__(self, api_creds_getter):
         self.api_creds_getter = api_creds_getter
+        self.session = get_session()
 
     @property
     def api_creds(self):
@@ -35,7 +36,7 @@ class PostVerificationClient:
             data['metadata']['originalMetadata'] = original_metadata
 
         # synchronous for now. Note this generally runs in an async env already: an s3-object-created handler
-        resp = requests.post(api_url, headers=headers, json=data)
+        resp = self.session.post(api_url, headers=headers, json=data)
         if resp.status_code != 200:
             raise Exception(f'Post verification service error `{resp.status_code}` with body `{resp.text}`')
         try:
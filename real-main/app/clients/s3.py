@@ -51,7 +51,8 @@ class S3Client:
         new_obj.copy({'Bucket': self.bucket.name, 'Key': old_path})
 
     def put_object(self, path, body, content_type):
-        self.bucket.put_object(Key=path, Body=body, ContentType=content_type)
+        # uses the client rather than the resource as the former is thread safe
+        self.boto_client.put_object(Bucket=self.bucket_name, Key=path, Body=body, ContentType=content_type)
 
     def exists(self, path):
         # https://stackoverflow.com/a/33843019
@@ -0,0 +1,27 @@
+import json
+
+import boto3
+
+
+class SqsClient:
+    def __init__(self, queue_url, create_queue_name=None):
+        """
+        The create_queue_name kwarg is intended for use with moto in the test suite.
+        """
+        self.boto_client = boto3.client('sqs')
+        if create_queue_name:
+            queue_url = self.boto_client.create_queue(QueueName=create_queue_name)['QueueUrl']
+        assert queue_url, 'Queue url is required'
+        self.queue_url = queue_url
+
+    def send_message(self, body):
+        "Send one message with the json-serialized `body`"
+        self.boto_client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(body))
+
+    def receive_messages(self, max_number=10):
+        "Receive up to `max_number` messages, in the shape lambda delivers them as records of an sqs event"
+        resp = self.boto_client.receive_message(QueueUrl=self.queue_url, MaxNumberOfMessages=max_number)
+        return [
+            {'messageId': msg['MessageId'], 'receiptHandle': msg['ReceiptHandle'], 'body': msg['Body']}
+            for msg in resp.get('Messages', [])
+        ]
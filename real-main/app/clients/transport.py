@@ -0,0 +1,88 @@
+import logging
+import os
+import threading
+
+import boto3
+import requests
+import requests_aws4auth
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_TIMEOUT_SECONDS = float(os.environ.get('HTTP_TIMEOUT_SECONDS', 10))
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 2))
+# should be at least the number of threads that share the session, else connections are discarded after use
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 32))
+
+logger = logging.getLogger()
+
+shared_session = None
+shared_session_lock = threading.Lock()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    "Applies a default timeout to requests that do not specify one"
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def build_session(timeout=HTTP_TIMEOUT_SECONDS, max_retries=HTTP_MAX_RETRIES, pool_maxsize=HTTP_POOL_MAXSIZE):
+    """
+    Build a requests session that keeps connections alive between requests. Connection failures, and
+    gateway errors on idempotent requests, are retried with backoff up to `max_retries` times.
+    """
+    retry = Retry(total=max_retries, backoff_factor=0.1, status_forcelist=[502, 503, 504], raise_on_status=False)
+    adapter = TimeoutHTTPAdapter(timeout=timeout, max_retries=retry, pool_maxsize=pool_maxsize)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    "The session shared by all clients in the process, so connections to a host are pooled across them"
+    global shared_session
+    with shared_session_lock:
+        if shared_session is None:
+            shared_session = build_session()
+        return shared_session
+
+
+class AWSRequestSigner(requests.auth.AuthBase):
+    """
+    Signs requests with SigV4 using the default boto3 credentials. The signer is built once and reused
+    until the credentials change, as happens when temporary credentials near their expiry and are refreshed.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.lock = threading.Lock()
+        self.boto3_session = None
+        self.credentials = None
+        self.auth = None
+
+    def __call__(self, request):
+        return self.get_auth()(request)
+
+    def get_auth(self):
+        with self.lock:
+            if self.boto3_session is None:
+                self.boto3_session = boto3.Session()
+            # botocore refreshes temporary credentials itself, shortly before they expire
+            credentials = self.boto3_session.get_credentials().get_frozen_credentials()
+            if credentials != self.credentials:
+                self.auth = requests_aws4auth.AWS4Auth(
+                    credentials.access_key,
+                    credentials.secret_key,
+                    self.boto3_session.region_name,
+                    self.service,
+                    session_token=credentials.token,
+                )
+                self.credentials = credentials
+            return self.auth
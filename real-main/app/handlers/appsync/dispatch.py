@@ -1,4 +1,5 @@
 "AppSync GraphQL data source"
+import contextlib
 import logging
 import os
 
@@ -61,14 +62,17 @@ def dispatch(event, context):
         logger.info(f'Handling AppSync GQL resolution of `{field}`')
 
     try:
-        data = handler(
-            gql['callerUserId'],
-            gql['arguments'],
-            source=gql['source'],
-            context=context,
-            event=event,
-            client=client,
-        )
+        with contextlib.ExitStack() as stack:
+            for context_factory in routes.contexts:
+                stack.enter_context(context_factory())
+            data = handler(
+                gql['callerUserId'],
+                gql['arguments'],
+                source=gql['source'],
+                context=context,
+                event=event,
+                client=client,
+            )
     except ClientException as err:
         logger.warning(str(err))
         return {'error': err.serialize()}
@@ -1,11 +1,14 @@
+import contextlib
 import logging
 import os
 
 import pendulum
 
 from app import clients, models
+from app.logging import LogLevelContext
 from app.mixins.flag.enums import FlagStatus
 from app.mixins.flag.exceptions import FlagException
+from app.mixins.trending.exceptions import TrendingException
 from app.mixins.view.enums import ViewType
 from app.models.album.exceptions import AlbumException
 from app.models.appstore.exceptions import AppStoreException
@@ -16,6 +19,7 @@ from app.models.chat.exceptions import ChatException
 from app.models.chat_message.enums import ChatMessageNotificationType
 from app.models.chat_message.exceptions import ChatMessageException
 from app.models.comment.exceptions import CommentException
+from app.models.feed.exceptions import FeedException
 from app.models.follower.enums import FollowStatus
 from app.models.follower.exceptions import FollowerException
 from app.models.like.enums import LikeStatus
@@ -39,8 +43,11 @@ from .validation import (
     validate_match_location_radius,
 )
 
+DYNAMO_FEED_TABLE = os.environ.get('DYNAMO_FEED_TABLE')
 S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
 S3_PLACEHOLDER_PHOTOS_BUCKET = os.environ.get('S3_PLACEHOLDER_PHOTOS_BUCKET')
+SQS_VIEW_EVENTS_QUEUE_URL = os.environ.get('SQS_VIEW_EVENTS_QUEUE_URL')
+VIEW_EVENTS_BUFFERED = os.environ.get('VIEW_EVENTS_BUFFERED')
 
 logger = logging.getLogger()
 xray.patch_all()
@@ -53,6 +60,7 @@ clients = {
     'cloudfront': clients.CloudFrontClient(secrets_manager_client.get_cloudfront_key_pair),
     'cognito': clients.CognitoClient(real_key_pair_getter=secrets_manager_client.get_real_key_pair),
     'dynamo': clients.DynamoClient(),
+    'dynamo_feed': clients.DynamoClient(table_name=DYNAMO_FEED_TABLE),
     'elasticsearch': clients.ElasticSearchClient(),
     'facebook': clients.FacebookClient(),
     'google': clients.GoogleClient(secrets_manager_client.get_google_client_ids),
@@ -60,6 +68,8 @@ clients = {
     'post_verification': clients.PostVerificationClient(secrets_manager_client.get_post_verification_api_creds),
     's3_uploads': clients.S3Client(S3_UPLOADS_BUCKET),
     's3_placeholder_photos': clients.S3Client(S3_PLACEHOLDER_PHOTOS_BUCKET),
+    # when set, views reported by clients are enqueued & recorded asynchronously instead of inline
+    **({'view_events': clients.SqsClient(SQS_VIEW_EVENTS_QUEUE_URL)} if VIEW_EVENTS_BUFFERED else {}),
 }
 
 # shared hash table of all managers, enables inter-manager communication
@@ -71,6 +81,7 @@ card_manager = managers.get('card') or models.CardManager(clients, managers=mana
 chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
 chat_message_manager = managers.get('chat_message') or models.ChatMessageManager(clients, managers=managers)
 comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
+feed_manager = managers.get('feed') or models.FeedManager(clients, managers=managers)
 follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
 like_manager = managers.get('like') or models.LikeManager(clients, managers=managers)
 post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
@@ -78,6 +89,18 @@ screen_manager = managers.get('screen') or models.ScreenManager(clients, manager
 user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
 
+@routes.register_context
+@contextlib.contextmanager
+def item_cache():
+    "Share reads of users, posts, follows & blocks across a single request"
+    with clients['dynamo'].cache_items() as stats:
+        try:
+            yield
+        finally:
+            with LogLevelContext(logger, logging.INFO):
+                logger.info(f'Item cache hits: {stats["hits"]}, misses: {stats["misses"]}')
+
+
 def validate_caller(*args, allowed_statuses=None):
     """
     Decorator that inits a caller_user model and verifies the caller has the correct status.
@@ -535,7 +558,7 @@ def report_screen_views(caller_user, arguments, **kwargs):
         raise ClientException('A max of 100 screens may be reported at a time')
 
     viewed_at = pendulum.now('utc')
-    screen_manager.record_views(screens, caller_user.id, viewed_at=viewed_at)
+    screen_manager.report_views(screens, caller_user.id, viewed_at=viewed_at)
     return True
 
 
@@ -577,6 +600,21 @@ def add_app_store_receipt(caller_user, arguments, **kwargs):
     return True
 
 
+@routes.register('User.feed')
+def user_feed(caller_user_id, arguments, source=None, **kwargs):
+    # feed is private to the user themselves
+    if source['userId'] != caller_user_id:
+        return None
+    limit = arguments.get('limit')
+    limit = 20 if limit is None else limit
+    if limit < 1 or limit > 100:
+        raise ClientException('Limit cannot be less than 1 or greater than 100')
+    try:
+        return feed_manager.get_feed(caller_user_id, limit=limit, next_token=arguments.get('nextToken'))
+    except FeedException as err:
+        raise ClientException(str(err)) from err
+
+
 @routes.register('User.photo')
 def user_photo(caller_user_id, arguments, source=None, **kwargs):
     user = user_manager.init_user(source)
@@ -1122,7 +1160,7 @@ def report_post_views(caller_user, arguments, **kwargs):
         raise ClientException('A max of 100 post ids may be reported at a time')
 
     viewed_at = pendulum.now('utc')
-    post_manager.record_views(post_ids, caller_user.id, viewed_at=viewed_at, view_type=view_type)
+    post_manager.report_views(post_ids, caller_user.id, viewed_at=viewed_at, view_type=view_type)
     return True
 
 
@@ -1411,7 +1449,7 @@ def report_chat_views(caller_user, arguments, **kwargs):
         raise ClientException('A max of 100 chat ids may be reported at a time')
 
     viewed_at = pendulum.now('utc')
-    chat_manager.record_views(chat_ids, caller_user.id, viewed_at=viewed_at)
+    chat_manager.report_views(chat_ids, caller_user.id, viewed_at=viewed_at)
     return True
 
 
@@ -1627,3 +1665,26 @@ def swiped_right_users(caller_user, arguments, **kwargs):
             response.append(user.serialize(caller_user.id))
 
     return response
+
+
+# trending is open to any caller, as it was when served by direct dynamo resolvers: neither a user record
+# nor any particular user status is required
+def get_trending_page(manager, arguments):
+    limit = arguments.get('limit')
+    limit = 20 if limit is None else limit
+    if limit < 1 or limit > 100:
+        raise ClientException('Limit cannot be less than 1 or greater than 100')
+    try:
+        return manager.get_trending_page(limit, next_token=arguments.get('nextToken'))
+    except TrendingException as err:
+        raise ClientException(str(err)) from err
+
+
+@routes.register('Query.trendingPosts')
+def trending_posts(caller_user_id, arguments, **kwargs):
+    return get_trending_page(post_manager, arguments)
+
+
+@routes.register('Query.trendingUsers')
+def trending_users(caller_user_id, arguments, **kwargs):
+    return get_trending_page(user_manager, arguments)
@@ -4,9 +4,13 @@ import importlib
 # graphql field -> python handler
 cache = {}
 
+# context manager factories, entered around every handler call
+contexts = []
+
 
 def clear():
     cache.clear()
+    contexts.clear()
 
 
 def register(field):
@@ -19,12 +23,18 @@ def register(field):
     return inner
 
 
+def register_context(func):
+    "Decorator to register a context manager factory that scopes state to a single handler call"
+    contexts.append(func)
+    return func
+
+
 def get_handler(field):
     return cache.get(field)
 
 
 def discover(path):
-    cache.clear()
+    clear()
     # registers handlers in the routing table as a side effect of importing
     # add more imports here as handlers are spread across files
     importlib.import_module(path)
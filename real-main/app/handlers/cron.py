@@ -8,6 +8,7 @@ from app.logging import LogLevelContext, handler_logging
 
 from . import xray
 
+DYNAMO_FEED_TABLE = os.environ.get('DYNAMO_FEED_TABLE')
 S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
 USER_NOTIFICATIONS_ENABLED = os.environ.get('USER_NOTIFICATIONS_ENABLED')
 USER_NOTIFICATIONS_ONLY_USERNAMES = os.environ.get('USER_NOTIFICATIONS_ONLY_USERNAMES')
@@ -18,7 +19,9 @@ xray.patch_all()
 secrets_manager_client = clients.SecretsManagerClient()
 clients = {
     'appstore': clients.AppStoreClient(secrets_manager_client.get_apple_appstore_params),
+    'appsync': clients.AppSyncClient(),
     'dynamo': clients.DynamoClient(),
+    'dynamo_feed': clients.DynamoClient(table_name=DYNAMO_FEED_TABLE),
     'cognito': clients.CognitoClient(),
     'pinpoint': clients.PinpointClient(),
     'real_dating': clients.RealDatingClient(),
@@ -29,6 +32,7 @@ managers = {}
 appstore_manager = managers.get('appstore') or models.AppStoreManager(clients, managers=managers)
 album_manager = managers.get('album') or models.AlbumManager(clients, managers=managers)
 card_manager = managers.get('card') or models.CardManager(clients, managers=managers)
+fan_out_manager = managers.get('fan_out') or models.FanOutManager(clients, managers=managers)
 post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
 user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
@@ -88,6 +92,20 @@ def delete_older_expired_posts(event, context):
     post_manager.delete_older_expired_posts(now=now)
 
 
+@handler_logging
+def resume_fan_out_jobs(event, context):
+    cnt = fan_out_manager.resume_jobs()
+    with LogLevelContext(logger, logging.INFO):
+        logger.info(f'Fan-out jobs resumed: {cnt}')
+
+
+@handler_logging
+def compact_stale_count_shards(event, context):
+    compacted_cnt = clients['dynamo'].compact_stale_count_shards()
+    with LogLevelContext(logger, logging.INFO):
+        logger.info(f'Stale counter shards compacted: {compacted_cnt}')
+
+
 @handler_logging
 def send_user_notifications(event, context):
     if not USER_NOTIFICATIONS_ENABLED:
@@ -119,10 +137,10 @@ def auto_disable_dating(event, context):
 
 @handler_logging
 def detect_bad_words(event, context):
-    comment_manager.clear_comment_bad_words()
-    chat_message_manager.clear_chat_message_bad_words()
+    comment_cnt = comment_manager.clear_comment_bad_words()
+    chat_message_cnt = chat_message_manager.clear_chat_message_bad_words()
     with LogLevelContext(logger, logging.INFO):
-        logger.info('Detect bad words in comments & chat messages')
+        logger.info(f'Detect bad words in comments & chat messages: {comment_cnt} & {chat_message_cnt} checked')
 
 
 @handler_logging
@@ -1,8 +1,48 @@
+import collections
 import logging
-from collections import defaultdict
 
 logger = logging.getLogger()
 
+DispatchPlan = collections.namedtuple('DispatchPlan', ['changed_attributes', 'handlers'])
+
+
+class DispatchRoute:
+    """
+    The listeners registered for one (pk_prefix, sk_prefix, event_name) combination,
+    indexed by the attributes they watch for changes.
+    """
+
+    def __init__(self):
+        self.handlers = []
+        self.unconditional_positions = []
+        self.attribute_defaults = {}
+        self.attribute_positions = collections.defaultdict(list)
+
+    def add(self, handler, attributes=None):
+        position = len(self.handlers)
+        self.handlers.append(handler)
+        if not attributes:
+            self.unconditional_positions.append(position)
+            return
+        for name, default in attributes.items():
+            if name in self.attribute_defaults:
+                assert self.attribute_defaults[name] == default, f'Conflicting defaults for attribute `{name}`'
+            self.attribute_defaults[name] = default
+            self.attribute_positions[name].append(position)
+
+    def get_changed_attributes(self, old_item, new_item):
+        return {
+            name
+            for name, default in self.attribute_defaults.items()
+            if old_item.get(name, default) != new_item.get(name, default)
+        }
+
+    def get_handlers(self, changed_attributes):
+        positions = set(self.unconditional_positions)
+        for name in changed_attributes:
+            positions.update(self.attribute_positions.get(name, []))
+        return [self.handlers[position] for position in sorted(positions)]
+
 
 class DynamoDispatch:
     """
@@ -11,7 +51,7 @@ class DynamoDispatch:
     """
 
     def __init__(self):
-        self.listeners = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        self.routes = {}
 
     def register(self, pk_prefix, sk_prefix, event_names, handler, attributes=None):
         """
@@ -20,23 +60,25 @@ class DynamoDispatch:
         The `attributes` parameter, if provided, should be a dictionary of {name: default_value}.
         If `attributes` is present handler will only be called if at least one of the
         values of `attributes` have changed when applied to the old & new items.
+        All handlers watching the same attribute must use the same default value for it.
         """
         for event_name in event_names:
-            self.listeners[pk_prefix][sk_prefix][event_name].append(
-                {'handler': handler, 'attributes': attributes}
-            )
+            route = self.routes.setdefault((pk_prefix, sk_prefix, event_name), DispatchRoute())
+            route.add(handler, attributes)
 
     def search(self, pk_prefix, sk_prefix, event_name, old_item, new_item):
-        "Returns a set of matching listener functions"
-        matches = []
-        for listener in self.listeners[pk_prefix][sk_prefix][event_name]:
-            if not listener['attributes']:
-                matches.append(listener['handler'])
-                continue
-            for attr_name, attr_default in listener['attributes'].items():
-                old_value = old_item.get(attr_name, attr_default)
-                new_value = new_item.get(attr_name, attr_default)
-                if old_value != new_value:
-                    matches.append(listener['handler'])
-                    break
-        return matches
+        "Returns a list of matching listener functions, in order of registration"
+        return self.plan(pk_prefix, sk_prefix, event_name, old_item, new_item).handlers
+
+    def plan(self, pk_prefix, sk_prefix, event_name, old_item, new_item):
+        "Returns a DispatchPlan of the watched attributes that changed and the matching listener functions"
+        route = self.routes.get((pk_prefix, sk_prefix, event_name))
+        if not route:
+            return DispatchPlan(set(), [])
+        changed_attributes = route.get_changed_attributes(old_item, new_item)
+        return DispatchPlan(changed_attributes, route.get_handlers(changed_attributes))
+
+    def get_handlers(self, pk_prefix, sk_prefix, event_name, changed_attributes):
+        "Returns the listener functions that would be called for an event in which `changed_attributes` changed"
+        route = self.routes.get((pk_prefix, sk_prefix, event_name))
+        return route.get_handlers(changed_attributes) if route else []
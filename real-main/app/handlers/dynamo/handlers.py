@@ -1,17 +1,18 @@
+import contextlib
 import logging
 import os
 
-from boto3.dynamodb.types import TypeDeserializer
-
 from app import clients, models
 from app.handlers import xray
-from app.logging import LogLevelContext, handler_logging
+from app.logging import handler_logging
 from app.models.follower.enums import FollowStatus
 from app.models.user.enums import UserStatus, UserSubscriptionLevel
 
 from .dispatch import DynamoDispatch
+from .stream import DynamoStreamProcessor, DynamoStreamRetryLog
 
 DYNAMO_FEED_TABLE = os.environ.get('DYNAMO_FEED_TABLE')
+DYNAMO_STREAM_MAX_WORKERS = int(os.environ.get('DYNAMO_STREAM_MAX_WORKERS', 8))
 S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
 
 logger = logging.getLogger()
@@ -45,9 +46,6 @@ post_manager = managers.get('post') or models.PostManager(clients, managers=mana
 screen_manager = managers.get('screen') or models.ScreenManager(clients, managers=managers)
 user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
-# https://stackoverflow.com/a/46738251
-deserialize = TypeDeserializer().deserialize
-
 dispatch = DynamoDispatch()
 register = dispatch.register
 
@@ -71,6 +69,7 @@ register(
     {'status': None},
 )
 register('transaction', '-', ['INSERT'], user_manager.on_appstore_transaction_add)
+register('transaction', '-', ['INSERT'], user_manager.on_appstore_transaction_add_sync_royalty_stats)
 register('card', '-', ['INSERT'], card_manager.on_card_add)
 register('card', '-', ['INSERT'], user_manager.on_card_add_increment_count)
 register('card', '-', ['MODIFY'], card_manager.on_card_edit)
@@ -199,6 +198,14 @@ register(
 )
 register('post', 'view', ['INSERT', 'REMOVE'], post_manager.on_post_view_add_delete_sync_viewed_by_counts)
 register('post', 'view', ['INSERT', 'MODIFY'], post_manager.on_post_view_change_update_trending)
+# royalty stats must be synced before the royalty fee is calculated from them
+register(
+    'post',
+    'view',
+    ['INSERT', 'MODIFY', 'REMOVE'],
+    user_manager.on_post_view_change_sync_royalty_stats,
+    {'viewCount': 0, 'royaltyFee': 0},
+)
 register('post', 'view', ['INSERT'], post_manager.on_post_view_calculate_royalty_fee)
 register('user', 'blocker', ['INSERT'], block_manager.on_user_blocked_sync_user_status)
 register(
@@ -236,6 +243,13 @@ register(
     user_manager.sync_follow_counts_due_to_follow_status,
     {'followStatus': FollowStatus.NOT_FOLLOWING},
 )
+register(
+    'user',
+    'profile',
+    ['INSERT', 'MODIFY'],
+    feed_manager.on_user_follower_count_change_sync_pulled,
+    {'followerCount': 0},
+)
 register('user', 'profile', ['INSERT'], user_manager.on_user_add_delete_user_deleted_subitem)
 register(
     'user',
@@ -354,27 +368,36 @@ register('user', 'profile', ['REMOVE'], user_manager.on_user_delete_delete_cogni
 register('screen', 'view', ['INSERT', 'MODIFY'], screen_manager.on_view_log_amplitude_event)
 
 
-@handler_logging
-def process_records(event, context):
-    for record in event['Records']:
+@contextlib.contextmanager
+def record_context(sequence_number):
+    "Attribute buffered counter changes & elasticsearch actions to the record being processed"
+    with clients['dynamo'].count_changes_source(sequence_number):
+        with clients['elasticsearch'].actions_source(sequence_number):
+            yield
 
-        name = record['eventName']
-        pk = deserialize(record['dynamodb']['Keys']['partitionKey'])
-        sk = deserialize(record['dynamodb']['Keys']['sortKey'])
-        old_item = {k: deserialize(v) for k, v in record['dynamodb'].get('OldImage', {}).items()}
-        new_item = {k: deserialize(v) for k, v in record['dynamodb'].get('NewImage', {}).items()}
 
-        with LogLevelContext(logger, logging.INFO):
-            logger.info(f'{name}: `{pk}` / `{sk}` starting processing')
+stream_processor = DynamoStreamProcessor(
+    dispatch, max_workers=DYNAMO_STREAM_MAX_WORKERS, record_context=record_context
+)
+stream_retry_log = DynamoStreamRetryLog(clients['dynamo'])
 
-        pk_prefix, item_id = pk.split('/')
-        sk_prefix = sk.split('/')[0]
 
-        item_kwargs = {k: v for k, v in {'new_item': new_item, 'old_item': old_item}.items() if v}
-        for func in dispatch.search(pk_prefix, sk_prefix, name, old_item, new_item):
-            with LogLevelContext(logger, logging.INFO):
-                logger.info(f'{name}: `{pk}` / `{sk}` running: {func}')
-            try:
-                func(item_id, **item_kwargs)
-            except Exception as err:
-                logger.exception(str(err))
+@handler_logging
+def process_records(event, context):
+    # https://docs.aws.amazon.com/lambda/latest/dg/with-ddb.html#services-ddb-batchfailurereporting
+    # counter changes from across the batch are coalesced into one write per counter,
+    # elasticsearch updates are sent together in bulk, and gql notifications are batched
+    records = event['Records']
+    # records after a failed record are redelivered, skip those that have already been processed
+    processed_event_ids = stream_retry_log.get_processed_event_ids(records)
+    records_to_process = [record for record in records if record['eventID'] not in processed_event_ids]
+    with clients['dynamo'].buffer_counts() as count_buffer:
+        with clients['elasticsearch'].buffer_actions() as action_buffer, clients['appsync'].buffer_mutations():
+            failed_sequence_numbers = stream_processor.process(records_to_process)
+            # failed records will be retried, so their changes to counters must not be written this time
+            count_buffer.discard_sources(failed_sequence_numbers)
+    # likewise, records whose changes to counters or elasticsearch failed to apply are retried
+    failed_sources = count_buffer.failed_sources | action_buffer.failed_sources
+    failed_sequence_numbers = sorted(set(failed_sequence_numbers) | failed_sources, key=int)
+    stream_retry_log.update(records, failed_sequence_numbers, processed_event_ids)
+    return {'batchItemFailures': [{'itemIdentifier': seq} for seq in failed_sequence_numbers]}
@@ -0,0 +1,204 @@
+import collections
+import collections.abc
+import contextlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pendulum
+from boto3.dynamodb.types import TypeDeserializer
+
+logger = logging.getLogger()
+
+# https://stackoverflow.com/a/46738251
+deserialize = TypeDeserializer().deserialize
+
+# per-record logging goes through its own logger, as the root logger's level can't be safely toggled to info
+# from multiple threads. Its records propagate to the root logger's handlers regardless of the root's level.
+record_logger = logging.getLogger('dynamo_stream')
+record_logger.setLevel(logging.INFO)
+
+
+class LazyImage(collections.abc.MutableMapping):
+    """
+    A dict-like view of a dynamo stream image that deserializes each attribute on first access.
+
+    Attributes that no listener reads or diffs are never deserialized.
+    """
+
+    def __init__(self, image=None):
+        self.image = dict(image or {})
+        self.decoded = {}
+
+    def __getitem__(self, key):
+        if key not in self.decoded:
+            self.decoded[key] = deserialize(self.image[key])
+        return self.decoded[key]
+
+    def __setitem__(self, key, value):
+        self.image[key] = None
+        self.decoded[key] = value
+
+    def __delitem__(self, key):
+        del self.image[key]
+        self.decoded.pop(key, None)
+
+    def __iter__(self):
+        return iter(self.image)
+
+    def __len__(self):
+        return len(self.image)
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def copy(self):
+        return dict(self)
+
+
+class DynamoStreamProcessor:
+    """
+    Processes a batch of dynamo stream records against the listeners of a DynamoDispatch.
+
+    Records are grouped by the key of the item they describe. Records for the same item are
+    processed serially in stream order, while records for different items are processed
+    concurrently on a bounded pool of threads.
+
+    A record fails if any of its listeners raise an exception. All its listeners are still run,
+    but any later records for the same item are not processed so as to maintain per-item ordering.
+
+    If set, `record_context` is called with each record's sequence number and the returned context
+    manager is entered around the running of that record's listeners.
+    """
+
+    def __init__(self, dispatch, max_workers=8, record_context=None):
+        self.dispatch = dispatch
+        self.max_workers = max_workers
+        self.record_context = record_context or contextlib.nullcontext
+        # kept across batches, so worker threads and their dynamo table resources are reused
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def process(self, records):
+        "Process the records. Returns the sequence numbers of the records that failed, in stream order."
+        records_by_key = self.group_by_key(records)
+        if min(self.max_workers, len(records_by_key)) > 1:
+            failed = list(self.executor.map(self.process_item_records, records_by_key.values()))
+        else:
+            failed = list(map(self.process_item_records, records_by_key.values()))
+        # sequence numbers are numeric strings of varying length
+        return sorted((seq for seqs in failed for seq in seqs), key=int)
+
+    def group_by_key(self, records):
+        "Group the records by item key, maintaining stream order within each group"
+        records_by_key = collections.defaultdict(list)
+        for record in records:
+            keys = record['dynamodb']['Keys']
+            key = (deserialize(keys['partitionKey']), deserialize(keys['sortKey']))
+            records_by_key[key].append(record)
+        return records_by_key
+
+    def process_item_records(self, records):
+        "Process records for a single item in order. Returns sequence numbers of failed & skipped records."
+        for idx, record in enumerate(records):
+            if not self.process_record(record):
+                return [r['dynamodb']['SequenceNumber'] for r in records[idx:]]
+        return []
+
+    def process_record(self, record):
+        "Run all matching listeners for the record. Returns a boolean indicating success."
+        name = record['eventName']
+        pk = deserialize(record['dynamodb']['Keys']['partitionKey'])
+        sk = deserialize(record['dynamodb']['Keys']['sortKey'])
+        old_item = LazyImage(record['dynamodb'].get('OldImage'))
+        new_item = LazyImage(record['dynamodb'].get('NewImage'))
+
+        record_logger.info(f'{name}: `{pk}` / `{sk}` starting processing')
+
+        pk_prefix, item_id = pk.split('/', 1)
+        sk_prefix = sk.split('/')[0]
+
+        start = time.perf_counter()
+        plan = self.dispatch.plan(pk_prefix, sk_prefix, name, old_item, new_item)
+        if not plan.handlers:
+            return True
+
+        success = True
+        item_kwargs = {k: v for k, v in {'new_item': new_item, 'old_item': old_item}.items() if v}
+        with self.record_context(record['dynamodb']['SequenceNumber']):
+            for func in plan.handlers:
+                record_logger.info(f'{name}: `{pk}` / `{sk}` running: {func}')
+                try:
+                    func(item_id, **item_kwargs)
+                except Exception as err:
+                    logger.exception(str(err))
+                    success = False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        record_logger.info(
+            f'{name}: `{pk}` / `{sk}` ran {len(plan.handlers)} listeners in {elapsed_ms:.1f}ms, '
+            + f'changed attributes: {sorted(plan.changed_attributes)}'
+        )
+        return success
+
+
+class DynamoStreamRetryLog:
+    """
+    Remembers which records of a partially failed batch were processed successfully.
+
+    When records are reported as failed, Lambda redelivers the stream from the first failed record
+    onward, including those later records that were processed successfully. Running their listeners
+    again would double-apply any changes that are not idempotent, such as counter increments.
+
+    The records that will be redelivered needlessly are logged under the event id of the first failed
+    record, which is where the redelivered batch starts, so they can be skipped upon redelivery.
+    Entries that are never cleared, such as for a batch that is never redelivered, expire once the
+    stream itself would have discarded the records.
+    """
+
+    # dynamo streams keep records for 24 hours
+    ttl = pendulum.duration(hours=24)
+
+    def __init__(self, dynamo_client):
+        self.client = dynamo_client
+
+    def key(self, event_id):
+        return {'partitionKey': f'streamRetry/{event_id}', 'sortKey': '-'}
+
+    def get_processed_event_ids(self, records):
+        "Return the event ids of those records that were processed on a previous delivery of the batch"
+        if not records:
+            return set()
+        item = self.client.get_item(self.key(records[0]['eventID']), ConsistentRead=True)
+        return set(item['processedEventIds']) if item else set()
+
+    def update(self, records, failed_sequence_numbers, processed_event_ids, now=None):
+        """
+        Log the records that will be redelivered but need not be processed again, and clear the entry
+        for this delivery of the batch, if there was one.
+        """
+        now = now or pendulum.now('utc')
+        failed_sequence_numbers = set(failed_sequence_numbers)
+        prev_key = self.key(records[0]['eventID']) if processed_event_ids else None
+        next_key = None
+        if failed_sequence_numbers:
+            first_failed = min(failed_sequence_numbers, key=int)
+            first_failed_record = next(r for r in records if r['dynamodb']['SequenceNumber'] == first_failed)
+            next_key = self.key(first_failed_record['eventID'])
+            event_ids = [
+                r['eventID']
+                for r in records
+                if r['dynamodb']['SequenceNumber'] not in failed_sequence_numbers
+                and int(r['dynamodb']['SequenceNumber']) > int(first_failed)
+            ]
+            if event_ids:
+                item = {
+                    **next_key,
+                    'schemaVersion': 0,
+                    'processedEventIds': event_ids,
+                    'createdAt': now.to_iso8601_string(),
+                    'ttlExpiresAt': int((now + self.ttl).timestamp()),
+                }
+                self.client.table.put_item(Item=item)
+            else:
+                next_key = None
+        if prev_key and prev_key != next_key:
+            self.client.delete_item(prev_key)
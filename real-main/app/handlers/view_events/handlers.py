@@ -0,0 +1,37 @@
+import logging
+import os
+
+from app import clients, models
+from app.handlers import xray
+from app.logging import handler_logging
+
+from .processor import ViewEventsProcessor, ViewEventsRetryLog
+
+VIEW_EVENTS_MAX_WORKERS = int(os.environ.get('VIEW_EVENTS_MAX_WORKERS', 8))
+
+logger = logging.getLogger()
+xray.patch_all()
+
+clients = {
+    'appsync': clients.AppSyncClient(),
+    'dynamo': clients.DynamoClient(),
+}
+
+managers = {}
+chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
+post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+screen_manager = managers.get('screen') or models.ScreenManager(clients, managers=managers)
+user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
+
+view_events_processor = ViewEventsProcessor(
+    {'chat': chat_manager, 'post': post_manager, 'screen': screen_manager},
+    ViewEventsRetryLog(clients['dynamo']),
+    max_workers=VIEW_EVENTS_MAX_WORKERS,
+)
+
+
+@handler_logging
+def process_records(event, context):
+    # https://docs.aws.amazon.com/lambda/latest/dg/with-sqs.html#services-sqs-batchfailurereporting
+    failed_message_ids = view_events_processor.process(event['Records'])
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]}
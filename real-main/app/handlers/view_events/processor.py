@@ -0,0 +1,144 @@
+import collections
+import functools
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pendulum
+
+logger = logging.getLogger()
+
+
+class ViewEventsProcessor:
+    """
+    Processes a batch of buffered view events, as enqueued by ViewManagerMixin.report_views.
+
+    Events are aggregated by item type, user and view type, and the views of each item in an aggregate
+    are recorded with a single call to its manager's `record_views`, as of the first and last time they
+    were viewed. So a burst of reports from one user becomes one write per item viewed. Aggregates for
+    different users are recorded concurrently on a bounded pool of threads.
+
+    If recording the views of an item fails, the records that viewed it fail. The items those records'
+    views were recorded for are logged in the ViewEventsRetryLog, so they are not counted again on retry.
+    """
+
+    def __init__(self, managers, retry_log, max_workers=8):
+        "`managers` is a dict of item type to the manager that records views of that type of item"
+        self.managers = managers
+        self.retry_log = retry_log
+        self.max_workers = max_workers
+        # kept across batches, so worker threads and their dynamo table resources are reused
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def process(self, records):
+        "Process the sqs records. Returns the message ids of the records that failed."
+        recorded_item_ids = self.retry_log.get_recorded_item_ids(records)
+        records_by_group = self.group_records(records)
+        process_group = functools.partial(self.process_group, recorded_item_ids=recorded_item_ids)
+        if min(self.max_workers, len(records_by_group)) > 1:
+            failed = list(self.executor.map(process_group, *zip(*records_by_group.items())))
+        else:
+            failed = list(map(process_group, records_by_group.keys(), records_by_group.values()))
+        failed = dict(item for group_failed in failed for item in group_failed.items())
+        self.retry_log.update(failed)
+        return list(failed)
+
+    def group_records(self, records):
+        records_by_group = collections.defaultdict(list)
+        for record in records:
+            try:
+                view_event = json.loads(record['body'])
+                group = (view_event['itemType'], view_event['userId'], view_event.get('viewType'))
+            except (ValueError, KeyError):
+                # retrying won't help a malformed event, so drop it
+                logger.warning(f'Dropping malformed view event: `{record}`')
+                continue
+            records_by_group[group].append((record['messageId'], view_event))
+        return records_by_group
+
+    def process_group(self, group, group_records, recorded_item_ids):
+        """
+        Record the aggregated views of the group, skipping views of items already recorded for a message.
+        Returns a dict of the message ids of the records that failed, to the ids of the items that their
+        views have been recorded for.
+        """
+        item_type, user_id, view_type = group
+        item_views = {}  # item_id to [view count, first viewed at, last viewed at, message ids]
+        for message_id, view_event in group_records:
+            viewed_at = pendulum.parse(view_event['viewedAt'])
+            for item_id in view_event['itemIds']:
+                if item_id in recorded_item_ids.get(message_id, ()):
+                    continue
+                views = item_views.setdefault(item_id, [0, viewed_at, viewed_at, set()])
+                views[0] += 1
+                views[1], views[2] = min(views[1], viewed_at), max(views[2], viewed_at)
+                views[3].add(message_id)
+
+        kwargs = {'view_type': view_type} if view_type else {}
+        failed_item_ids, failed_message_ids = set(), set()
+        for item_id, (view_count, first_viewed_at, last_viewed_at, message_ids) in item_views.items():
+            try:
+                manager = self.managers[item_type]
+                manager.record_views(
+                    [item_id] * view_count,
+                    user_id,
+                    viewed_at=last_viewed_at,
+                    first_viewed_at=first_viewed_at,
+                    **kwargs,
+                )
+            except Exception as err:
+                logger.exception(f'Failed to record views by user `{user_id}` of {item_type} `{item_id}`: {err}')
+                failed_item_ids.add(item_id)
+                failed_message_ids.update(message_ids)
+
+        return {
+            message_id: {
+                item_id
+                for item_id in view_event['itemIds']
+                if item_id not in failed_item_ids or item_id in recorded_item_ids.get(message_id, ())
+            }
+            for message_id, view_event in group_records
+            if message_id in failed_message_ids
+        }
+
+
+class ViewEventsRetryLog:
+    """
+    Remembers the items whose views were recorded for a message that failed, as the views of other items
+    in the message are recorded separately. When the message is redelivered, those items are skipped.
+    """
+
+    # well beyond the time it takes a message to exhaust its receives and go to the dead letter queue
+    ttl = pendulum.duration(hours=24)
+
+    def __init__(self, dynamo_client):
+        self.client = dynamo_client
+
+    def key(self, message_id):
+        return {'partitionKey': f'viewEventsRetry/{message_id}', 'sortKey': '-'}
+
+    def get_recorded_item_ids(self, records):
+        "Return a dict of message id to the ids of the items already recorded, for records being redelivered"
+        keys = [
+            self.key(record['messageId'])
+            for record in records
+            if int(record.get('attributes', {}).get('ApproximateReceiveCount', 1)) > 1
+        ]
+        items = self.client.batch_get_untyped_items(keys) if keys else []
+        return {item['partitionKey'].split('/', 1)[1]: set(item['recordedItemIds']) for item in items}
+
+    def update(self, recorded_item_ids, now=None):
+        "Log the ids of the items recorded for each failed message, given as a dict of message id to item ids"
+        now = now or pendulum.now('utc')
+        items = (
+            {
+                **self.key(message_id),
+                'schemaVersion': 0,
+                'recordedItemIds': sorted(item_ids),
+                'createdAt': now.to_iso8601_string(),
+                'ttlExpiresAt': int((now + self.ttl).timestamp()),
+            }
+            for message_id, item_ids in recorded_item_ids.items()
+            if item_ids
+        )
+        self.client.batch_put_items(items)
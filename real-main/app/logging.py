@@ -1,5 +1,7 @@
 import json
 import logging
+import os
+import time
 
 
 def handler_logging(*args, event_to_extras=None):
@@ -44,6 +46,33 @@ def handler_logging(*args, event_to_extras=None):
         return outer_wrapper
 
 
+def log_metrics(metrics, dimensions, properties=None):
+    """
+    Emit counts to CloudWatch metrics in the embedded metric format. `metrics` maps metric names to counts,
+    `dimensions` maps dimension names to values, and `properties` are extra data to log alongside.
+
+    The line is printed rather than logged: lambda only extracts metrics from log lines that are pure json,
+    and it is emitted regardless of the log level.
+    https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/CloudWatch_Embedded_Metric_Format.html
+    """
+    data = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [
+                {
+                    'Namespace': os.environ.get('METRICS_NAMESPACE', 'real'),
+                    'Dimensions': [list(dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': 'Count'} for name in metrics],
+                }
+            ],
+        },
+        **(properties or {}),
+        **dimensions,
+        **metrics,
+    }
+    print(json.dumps(data), flush=True)
+
+
 # https://docs.python.org/3/howto/logging-cookbook.html#using-a-context-manager-for-selective-logging
 class LogLevelContext:
     def __init__(self, logger, level):
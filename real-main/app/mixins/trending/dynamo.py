@@ -1,4 +1,9 @@
+import functools
+import heapq
+import itertools
 import logging
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
 import pendulum
@@ -12,6 +17,10 @@ class TrendingDynamo:
 
     PERCISION = Decimal(10) ** -9
 
+    # writes to the trending index are spread over this many GSI-A4 partitions to avoid a hot partition,
+    # reads merge across all of them. Changing this requires re-partitioning the existing items.
+    partition_count = 8
+
     def __init__(self, item_type, dynamo_client):
         self.item_type = item_type
         self.client = dynamo_client
@@ -22,22 +31,41 @@ class TrendingDynamo:
             'sortKey': 'trending',
         }
 
+    def partition(self, item_id):
+        "Stable mapping of an item to one of the trending partitions"
+        return zlib.crc32(item_id.encode()) % self.partition_count
+
+    def partition_key(self, partition):
+        return f'{self.item_type}/trending/{partition}'
+
     def get(self, item_id, strongly_consistent=False):
         return self.client.get_item(self.pk(item_id), ConsistentRead=strongly_consistent)
 
-    def add(self, item_id, initial_score, now=None):
+    def batch_get_scores(self, item_ids):
+        "Return a dict of item_id to score, for those items that are trending"
+        items = self.client.batch_get_untyped_items(
+            [self.pk(item_id) for item_id in item_ids],
+            projection_expression='partitionKey, sortKey, gsiA4SortKey',
+        )
+        return {item['partitionKey'].split('/')[1]: item['gsiA4SortKey'] for item in items}
+
+    def add(self, item_id, initial_score, now=None, anchored_at=None):
+        """
+        The score is stored relative to `anchored_at`, which is recorded as `lastDeflatedAt`.
+        Defaults to `now`.
+        """
         assert isinstance(initial_score, Decimal), 'Boto uses decimals for numbers'
         assert initial_score >= 0, 'Score cannot be negative'
         now = now or pendulum.now('utc')
-        now_str = now.to_iso8601_string()
+        anchored_at = anchored_at or now
         query_kwargs = {
             'Item': {
                 **self.pk(item_id),
-                'schemaVersion': 0,
-                'gsiA4PartitionKey': f'{self.item_type}/trending',
+                'schemaVersion': 2,
+                'gsiA4PartitionKey': self.partition_key(self.partition(item_id)),
                 'gsiA4SortKey': initial_score.quantize(self.PERCISION).normalize(),
-                'lastDeflatedAt': now_str,
-                'createdAt': now_str,
+                'lastDeflatedAt': anchored_at.to_iso8601_string(),
+                'createdAt': now.to_iso8601_string(),
             },
         }
         try:
@@ -102,9 +130,83 @@ class TrendingDynamo:
 
     def generate_items(self):
         "Ordered with lowest score first."
+        generators = [self.generate_partition_items(partition) for partition in range(self.partition_count)]
+        return heapq.merge(*generators, key=lambda item: item['gsiA4SortKey'])
+
+    def generate_partition_items(self, partition):
         query_kwargs = {
-            'KeyConditionExpression': 'gsiA4PartitionKey = :gsia1pk',
-            'ExpressionAttributeValues': {':gsia1pk': f'{self.item_type}/trending'},
+            'KeyConditionExpression': 'gsiA4PartitionKey = :gsia4pk',
+            'ExpressionAttributeValues': {':gsia4pk': self.partition_key(partition)},
             'IndexName': 'GSI-A4',
         }
         return self.client.generate_all_query(query_kwargs)
+
+    @functools.cached_property
+    def query_executor(self):
+        # kept for the life of the dynamo, so worker threads and their dynamo table resources are reused
+        return ThreadPoolExecutor(max_workers=self.partition_count)
+
+    def query_items(self, limit, next_token=None):
+        """
+        Return a page of up to `limit` trending items, highest score first, merged across all partitions.
+
+        The `nextToken` holds a cursor per partition that still has items: the key of the last item
+        taken from that partition, or None if nothing has been taken from it yet.
+        """
+        cursors = (
+            self.decode_cursors(next_token)
+            if next_token
+            else {partition: None for partition in range(self.partition_count)}
+        )
+        if not cursors:
+            return {'items': [], 'nextToken': None}
+
+        results = dict(
+            zip(cursors, self.query_executor.map(lambda p: self.query_partition(p, cursors[p], limit), cursors))
+        )
+
+        merged = heapq.merge(
+            *[[(partition, item) for item in items] for partition, (items, _) in results.items()],
+            key=lambda partition_item: partition_item[1]['gsiA4SortKey'],
+            reverse=True,
+        )
+        page = list(itertools.islice(merged, limit))
+
+        next_cursors = {}
+        for partition, (items, has_more) in results.items():
+            taken = [item for p, item in page if p == partition]
+            if len(taken) < len(items) or has_more:
+                next_cursors[partition] = self.cursor(taken[-1]) if taken else cursors[partition]
+        return {
+            'items': [item for _, item in page],
+            'nextToken': self.client.encode_pagination_token(next_cursors) if next_cursors else None,
+        }
+
+    def query_partition(self, partition, cursor, limit):
+        "Return a pair: the items of the partition after the cursor, and whether there may be more"
+        query_kwargs = {
+            'KeyConditionExpression': 'gsiA4PartitionKey = :gsia4pk',
+            'ExpressionAttributeValues': {':gsia4pk': self.partition_key(partition)},
+            'IndexName': 'GSI-A4',
+            'ScanIndexForward': False,
+            'Limit': limit,
+        }
+        if cursor:
+            query_kwargs['ExclusiveStartKey'] = {
+                **self.pk(cursor['itemId']),
+                'gsiA4PartitionKey': self.partition_key(partition),
+                'gsiA4SortKey': Decimal(cursor['score']),
+            }
+        paginated = self.client.table.query(**query_kwargs)
+        return paginated['Items'], 'LastEvaluatedKey' in paginated
+
+    def cursor(self, item):
+        # scores are serialized as strings to keep their exact decimal value
+        return {'itemId': item['partitionKey'].split('/')[1], 'score': str(item['gsiA4SortKey'])}
+
+    def decode_cursors(self, next_token):
+        try:
+            cursors = self.client.decode_pagination_token(next_token)
+            return {int(partition): cursor for partition, cursor in cursors.items()}
+        except (ValueError, AttributeError) as err:
+            raise exceptions.TrendingException(f'Invalid nextToken `{next_token}`') from err
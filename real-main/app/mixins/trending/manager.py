@@ -1,5 +1,6 @@
 import logging
 import os
+from decimal import Decimal
 
 import pendulum
 
@@ -14,6 +15,9 @@ logger = logging.getLogger()
 class TrendingManagerMixin:
 
     score_inflation_per_day = 2
+    # scores of all items are stored relative to the start of the current period, so they can be compared
+    # directly without needing to deflate every item every day
+    score_anchor_period = 'week'
 
     min_count_to_keep = int(TRENDING_POST_MIN_COUNT_TO_KEEP) if TRENDING_POST_MIN_COUNT_TO_KEEP else 10 * 100
     min_score_to_keep = 0.5
@@ -23,9 +27,18 @@ class TrendingManagerMixin:
         if 'dynamo' in clients:
             self.trending_dynamo = TrendingDynamo(self.item_type, clients['dynamo'])
 
+    def get_trending_page(self, limit, next_token=None):
+        "Return a page of ids of trending items, highest score first"
+        paginated = self.trending_dynamo.query_items(limit, next_token=next_token)
+        return {
+            'nextToken': paginated['nextToken'],
+            'items': [item['partitionKey'].split('/')[1] for item in paginated['items']],
+        }
+
     def trending_deflate(self, now=None):
         """
-        Iterate over all trending items and deflate them.
+        Iterate over all trending items and deflate those anchored before the start of the current period.
+        Only does writes on the first run of a period.
         Returns a pair of integers: (total_items, deflated_items)
         """
         now = now or pendulum.now('utc')
@@ -44,37 +57,47 @@ class TrendingManagerMixin:
                 f'trending_deflate_item() failed for item `{self.item_type}:{item_id}` after {retry_count} tries'
             )
 
-        current_score = trending_item['gsiA4SortKey']
-        if current_score == 0:
-            logging.warning(f'Trending for item `{self.item_type}:{item_id}` already has score of zero')
-
         now = now or pendulum.now('utc')
+        anchored_at = self.trending_anchor(now)
         last_deflation_at = pendulum.parse(trending_item['lastDeflatedAt'])
-        days_since_last_deflation = (now - last_deflation_at.start_of('day')).days
+        days_since_last_deflation = (anchored_at - last_deflation_at.start_of('day')).days
         if days_since_last_deflation < 1:
-            logging.warning(f'Trending for item `{self.item_type}:{item_id}` has already been deflated today')
+            logging.debug(f'Trending for item `{self.item_type}:{item_id}` has already been deflated this period')
             return False
 
+        current_score = trending_item['gsiA4SortKey']
+        if current_score == 0:
+            logging.warning(f'Trending for item `{self.item_type}:{item_id}` already has score of zero')
+
         new_score = current_score / (self.score_inflation_per_day ** days_since_last_deflation)
 
         try:
-            self.trending_dynamo.deflate_score(item_id, current_score, new_score, last_deflation_at.date(), now)
+            self.trending_dynamo.deflate_score(
+                item_id, current_score, new_score, last_deflation_at.date(), anchored_at
+            )
         except TrendingDNEOrAttributeMismatch:
             logging.warning(f'Trending deflate failure, trying again for `{self.item_type}:{item_id}`')
             trending_item = self.trending_dynamo.get(item_id, strongly_consistent=True)
             return self.trending_deflate_item(trending_item, now=now, retry_count=retry_count + 1)
         return True
 
-    def trending_delete_tail(self, total_count):
+    def trending_delete_tail(self, total_count, now=None):
         max_to_delete = total_count - self.min_count_to_keep
         if max_to_delete <= 0:
             return 0
 
+        # min_score_to_keep applies to scores as of the start of today, stored scores are relative to their anchor
+        today = (now or pendulum.now('utc')).start_of('day')
         deleted = 0
         for item in self.trending_dynamo.generate_items():
             item_id = item['partitionKey'].split('/')[1]
             current_score = item['gsiA4SortKey']
-            if current_score >= self.min_score_to_keep:
+            anchored_at = pendulum.parse(item['lastDeflatedAt']).start_of('day')
+            min_score = (
+                Decimal(self.min_score_to_keep)
+                * Decimal(self.score_inflation_per_day) ** (today - anchored_at).days
+            )
+            if current_score >= min_score:
                 break
             try:
                 self.trending_dynamo.delete(item_id, expected_score=current_score)
@@ -87,3 +110,6 @@ class TrendingManagerMixin:
                 break
 
         return deleted
+
+    def trending_anchor(self, now):
+        return now.start_of(self.score_anchor_period)
@@ -11,6 +11,9 @@ logger = logging.getLogger()
 class TrendingModelMixin:
 
     score_inflation_per_day = 2
+    # scores of all items are stored relative to the start of the current period, so they can be compared
+    # directly without needing to deflate every item every day
+    score_anchor_period = 'week'
 
     def __init__(self, trending_dynamo=None, **kwargs):
         super().__init__(**kwargs)
@@ -41,7 +44,11 @@ class TrendingModelMixin:
                 f'trending_increment_score() failed for item `{self.item_type}:{self.id}` after {retry_count} tries'
             )
         now = now or pendulum.now('utc')
-        last_deflated_at = pendulum.parse(self.trending_item['lastDeflatedAt']) if self.trending_item else now
+        last_deflated_at = (
+            pendulum.parse(self.trending_item['lastDeflatedAt'])
+            if self.trending_item
+            else self.trending_anchor(now)
+        )
         days_since_last_deflation = (now - last_deflated_at.start_of('day')).total_days()
         inflated_score = Decimal(multiplier * self.score_inflation_per_day ** days_since_last_deflation)
 
@@ -54,7 +61,9 @@ class TrendingModelMixin:
                 return True
         else:
             try:
-                self._trending_item = self.trending_dynamo.add(self.id, inflated_score, now=now)
+                self._trending_item = self.trending_dynamo.add(
+                    self.id, inflated_score, now=now, anchored_at=last_deflated_at
+                )
             except TrendingAlreadyExists:
                 pass
             else:
@@ -64,6 +73,9 @@ class TrendingModelMixin:
         self.refresh_trending_item(strongly_consistent=True)
         return self.trending_increment_score(now=now, multiplier=multiplier, retry_count=retry_count + 1)
 
+    def trending_anchor(self, now):
+        return now.start_of(self.score_anchor_period)
+
     def trending_delete(self):
         self.trending_dynamo.delete(self.id)
         if hasattr(self, '_trending_item'):
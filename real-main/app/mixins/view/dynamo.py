@@ -23,6 +23,17 @@ class ViewDynamo:
     def get_view(self, item_id, user_id, strongly_consistent=False):
         return self.client.get_item(self.key(item_id, user_id), ConsistentRead=strongly_consistent)
 
+    def get_views_by_item_ids(self, item_ids, user_id):
+        "Get the user's views of the items in batch. Returns a dict of item_id to view item."
+        items = self.client.batch_get_untyped_items([self.key(item_id, user_id) for item_id in item_ids])
+        return {item['partitionKey'].split('/', 1)[1]: item for item in items}
+
+    def get_views_by_user_ids(self, item_id, user_ids, projection_expression=None):
+        "Get the views of the item by the given users in batch. Returns a dict of user_id to view item."
+        keys = [self.key(item_id, user_id) for user_id in user_ids]
+        items = self.client.batch_get_untyped_items(keys, projection_expression=projection_expression)
+        return {item['sortKey'][len('view/') :]: item for item in items}
+
     def generate_keys_by_item(self, item_id):
         query_kwargs = {
             'KeyConditionExpression': 'partitionKey = :pk AND begins_with(sortKey, :sk_prefix)',
@@ -55,23 +66,37 @@ class ViewDynamo:
         }
         return self.client.generate_all_query(query_kwargs)
 
+    def generate_views_by_user_rest_of_day(self, user_id, since):
+        "Generate the user's views first viewed at or after `since` and on the same (utc) day"
+        query_kwargs = {
+            'KeyConditionExpression': 'gsiA2PartitionKey = :pk AND gsiA2SortKey BETWEEN :sk_min AND :sk_max',
+            'ExpressionAttributeValues': {
+                ':pk': f'{self.item_type}View/{user_id}',
+                ':sk_min': since.to_iso8601_string(),
+                ':sk_max': since.to_date_string() + '~',
+            },
+            'IndexName': 'GSI-A2',
+        }
+        return self.client.generate_all_query(query_kwargs)
+
     def delete_view(self, item_id, user_id):
         return self.client.delete_item(self.key(item_id, user_id))
 
-    def add_view(self, item_id, user_id, view_count, viewed_at, view_type=None):
+    def add_view(self, item_id, user_id, view_count, viewed_at, view_type=None, first_viewed_at=None):
+        "`viewed_at` is the last of the views, `first_viewed_at` the first if they were at different times"
         key = self.key(item_id, user_id)
-        viewed_at_str = viewed_at.to_iso8601_string()
+        first_viewed_at_str = (first_viewed_at or viewed_at).to_iso8601_string()
         query_kwargs = {
             'Item': {
                 **key,
                 'gsiA1PartitionKey': f'{self.item_type}View/{item_id}',
-                'gsiA1SortKey': viewed_at_str,
+                'gsiA1SortKey': first_viewed_at_str,
                 'gsiA2PartitionKey': f'{self.item_type}View/{user_id}',
-                'gsiA2SortKey': viewed_at_str,
+                'gsiA2SortKey': first_viewed_at_str,
                 'schemaVersion': 0,
                 'viewCount': view_count,
-                'firstViewedAt': viewed_at_str,
-                'lastViewedAt': viewed_at_str,
+                'firstViewedAt': first_viewed_at_str,
+                'lastViewedAt': viewed_at.to_iso8601_string(),
             },
         }
 
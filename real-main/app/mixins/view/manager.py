@@ -1,5 +1,7 @@
 import logging
 
+import pendulum
+
 from .dynamo import ViewDynamo
 
 logger = logging.getLogger()
@@ -10,10 +12,32 @@ class ViewManagerMixin:
         super().__init__(clients, managers=managers)
         if 'dynamo' in clients:
             self.view_dynamo = ViewDynamo(self.item_type, clients['dynamo'])
+        if 'view_events' in clients:
+            self.view_events_client = clients['view_events']
 
-    def record_views(self, item_ids, user_id, viewed_at=None):
+    def record_views(self, item_ids, user_id, viewed_at=None, first_viewed_at=None):
         raise NotImplementedError  # subclasses must implement
 
+    def report_views(self, item_ids, user_id, viewed_at=None, view_type=None):
+        """
+        Record views of the items. If a view events queue is configured, the views are instead
+        enqueued as one event to be aggregated with other events and recorded asynchronously.
+        """
+        viewed_at = viewed_at or pendulum.now('utc')
+        kwargs = {'view_type': view_type} if view_type else {}
+        if not hasattr(self, 'view_events_client'):
+            self.record_views(item_ids, user_id, viewed_at=viewed_at, **kwargs)
+            return
+
+        view_event = {
+            'itemType': self.item_type,
+            'itemIds': list(item_ids),
+            'userId': user_id,
+            'viewedAt': viewed_at.to_iso8601_string(),
+            **({'viewType': view_type} if view_type else {}),
+        }
+        self.view_events_client.send_message(view_event)
+
     def on_item_delete_delete_views(self, item_id, old_item):
         key_gen = self.view_dynamo.generate_keys_by_item(item_id)
         self.view_dynamo.client.batch_delete_items(key_gen)
@@ -32,7 +32,7 @@ class ViewModelMixin:
         else:
             return ViewedStatus.NOT_VIEWED
 
-    def record_view_count(self, user_id, view_count, viewed_at=None, view_type=None):
+    def record_view_count(self, user_id, view_count, viewed_at=None, view_type=None, first_viewed_at=None):
         viewed_at = viewed_at or pendulum.now('utc')
         is_first_view_for_user = False
         view_item = self.view_dynamo.get_view(self.id, user_id)
@@ -40,7 +40,9 @@ class ViewModelMixin:
             self.view_dynamo.increment_view_count(self.id, user_id, view_count, viewed_at, view_type=view_type)
         else:
             try:
-                self.view_dynamo.add_view(self.id, user_id, view_count, viewed_at, view_type=view_type)
+                self.view_dynamo.add_view(
+                    self.id, user_id, view_count, viewed_at, view_type=view_type, first_viewed_at=first_viewed_at
+                )
             except ViewAlreadyExists:
                 # we lost a race condition to add the view, so still need to record our data
                 self.view_dynamo.increment_view_count(
@@ -6,6 +6,7 @@ __all__ = [
     'ChatManager',
     'ChatMessageManager',
     'CommentManager',
+    'FanOutManager',
     'FeedManager',
     'FollowerManager',
     'LikeManager',
@@ -21,6 +22,7 @@ from .card.manager import CardManager
 from .chat.manager import ChatManager
 from .chat_message.manager import ChatMessageManager
 from .comment.manager import CommentManager
+from .fan_out.manager import FanOutManager
 from .feed.manager import FeedManager
 from .follower.manager import FollowerManager
 from .like.manager import LikeManager
@@ -117,6 +117,10 @@ class AlbumDynamo:
 
     def increment_post_count(self, album_id, now=None):
         now = now or pendulum.now('utc')
+        if self.client.buffer_count(
+            self.pk(album_id), 'postCount', 1, postsLastUpdatedAt=now.to_iso8601_string()
+        ):
+            return None
         query_kwargs = {
             'Key': self.pk(album_id),
             'UpdateExpression': 'ADD postCount :one SET postsLastUpdatedAt = :now',
@@ -129,6 +133,10 @@ class AlbumDynamo:
 
     def decrement_post_count(self, album_id, now=None):
         now = now or pendulum.now('utc')
+        if self.client.buffer_count(
+            self.pk(album_id), 'postCount', -1, postsLastUpdatedAt=now.to_iso8601_string()
+        ):
+            return None
         query_kwargs = {
             'Key': self.pk(album_id),
             'UpdateExpression': 'ADD postCount :negative_one SET postsLastUpdatedAt = :now',
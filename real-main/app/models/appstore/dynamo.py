@@ -156,3 +156,16 @@ class AppStoreSubDynamo:
             'IndexName': 'GSI-A1',
         }
         return self.client.generate_all_query(query_kwargs)
+
+    def generate_transactions_by_user_rest_of_day(self, user_id, since):
+        "Generate the user's transactions created at or after `since` and on the same (utc) day"
+        query_kwargs = {
+            'KeyConditionExpression': 'gsiA1PartitionKey = :pk AND gsiA1SortKey BETWEEN :sk_min AND :sk_max',
+            'ExpressionAttributeValues': {
+                ':pk': f'transaction/{user_id}',
+                ':sk_min': since.to_iso8601_string(),
+                ':sk_max': since.to_date_string() + '~',
+            },
+            'IndexName': 'GSI-A1',
+        }
+        return self.client.generate_all_query(query_kwargs)
@@ -16,7 +16,7 @@ class BlockDynamo:
         return {'partitionKey': f'user/{blocked_user_id}', 'sortKey': f'blocker/{blocker_user_id}'}
 
     def get_block(self, blocker_user_id, blocked_user_id):
-        return self.client.get_item(self.pk(blocker_user_id, blocked_user_id))
+        return self.client.get_item(self.pk(blocker_user_id, blocked_user_id), cached=True)
 
     def add_block(self, blocker_user_id, blocked_user_id, now=None):
         now = now or pendulum.now('utc')
@@ -66,6 +66,32 @@ class ChatMemberDynamo:
         msg = f'Failed to update last message activity for chat `{chat_id}` and member `{user_id}` to `{now_str}`'
         return self.client.update_item(query_kwargs, failure_warning=msg)
 
+    def update_for_message_added(self, chat_id, user_id, now, increment_messages_unviewed_count=False):
+        """
+        Best effort to update last message activity at and, optionally, increment the unviewed messages
+        count in one write. Logs WARNING on failure.
+        """
+        now_str = now.to_iso8601_string()
+        query_kwargs = {
+            'Key': self.pk(chat_id, user_id),
+            'UpdateExpression': 'SET gsiK2SortKey = :gsik2sk',
+            'ExpressionAttributeValues': {':gsik2sk': 'chat/' + now_str},
+            'ConditionExpression': 'NOT :gsik2sk < gsiK2SortKey',
+        }
+        if increment_messages_unviewed_count:
+            query_kwargs['UpdateExpression'] += ' ADD messagesUnviewedCount :one'
+            query_kwargs['ExpressionAttributeValues'][':one'] = 1
+        try:
+            return self.client.update_item(query_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            pass
+        # the message arrived out of order, or the member does not exist
+        logger.warning(
+            f'Failed to update last message activity for chat `{chat_id}` and member `{user_id}` to `{now_str}`'
+        )
+        if increment_messages_unviewed_count:
+            return self.increment_messages_unviewed_count(chat_id, user_id)
+
     def increment_messages_unviewed_count(self, chat_id, user_id):
         return self.client.increment_count(self.pk(chat_id, user_id), 'messagesUnviewedCount')
 
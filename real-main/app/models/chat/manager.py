@@ -1,6 +1,8 @@
 import collections
+import functools
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import pendulum
 
@@ -22,6 +24,8 @@ logger = logging.getLogger()
 class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
 
     item_type = 'chat'
+    # max number of chat member writes in flight at once when reacting to a message
+    member_update_max_workers = 8
 
     def __init__(self, clients, managers=None):
         super().__init__(clients, managers=managers)
@@ -140,7 +144,7 @@ class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
             else:
                 chat.leave(user)
 
-    def record_views(self, chat_ids, user_id, viewed_at=None):
+    def record_views(self, chat_ids, user_id, viewed_at=None, first_viewed_at=None):
         for chat_id, view_count in dict(collections.Counter(chat_ids)).items():
             chat = self.get_chat(chat_id)
             if not chat:
@@ -148,39 +152,63 @@ class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
             elif not chat.is_member(user_id):
                 logger.warning(f'Cannot record view(s) by non-member user `{user_id}` on chat `{chat_id}`')
             else:
-                chat.record_view_count(user_id, view_count, viewed_at=viewed_at)
+                chat.record_view_count(user_id, view_count, viewed_at=viewed_at, first_viewed_at=first_viewed_at)
 
     def on_chat_message_add(self, message_id, new_item):
         message = self.chat_message_manager.init_chat_message(new_item)
         self.dynamo.update_last_message_activity_at(message.chat_id, message.created_at)
         self.dynamo.increment_messages_count(message.chat_id)
 
-        # for each memeber of the chat
+        # for each memeber of the chat, in one write
         #   - update the last message activity timestamp (controls chat ordering)
         #   - for everyone except the author, increment their 'messagesUnviewedCount'
-        for user_id in self.member_dynamo.generate_user_ids_by_chat(message.chat_id):
-            self.member_dynamo.update_last_message_activity_at(message.chat_id, user_id, message.created_at)
-            if user_id != message.user_id:
-                # Note that dynamo has no support for batch updates.
-                self.member_dynamo.increment_messages_unviewed_count(message.chat_id, user_id)
-                # TODO
-                # we can be in a state where the user manually dismissed a card, and this view does not
-                # change the user's overall count of chats with unread messages, but should still create a card
+        # TODO
+        # we can be in a state where the user manually dismissed a card, and this view does not
+        # change the user's overall count of chats with unread messages, but should still create a card
+        def update_member(user_id):
+            self.member_dynamo.update_for_message_added(
+                message.chat_id,
+                user_id,
+                message.created_at,
+                increment_messages_unviewed_count=(user_id != message.user_id),
+            )
+
+        self.update_members(update_member, self.member_dynamo.generate_user_ids_by_chat(message.chat_id))
 
     def on_chat_message_delete(self, message_id, old_item):
         message = self.chat_message_manager.init_chat_message(old_item)
         self.dynamo.decrement_messages_count(message.chat_id)
 
         # for each memeber of the chat other than the author
-        #   - delete any view record that exists directly on the message
         #   - determine if the message had status 'unviewed', and if so, then decrement the unviewed message counter
-        for user_id in self.member_dynamo.generate_user_ids_by_chat(message.chat_id):
-            if user_id != message.user_id:
-                chat_view_item = self.view_dynamo.get_view(message.chat_id, user_id)
-                chat_last_viewed_at = pendulum.parse(chat_view_item['lastViewedAt']) if chat_view_item else None
-                if not (chat_last_viewed_at and chat_last_viewed_at > message.created_at):
-                    # Note that dynamo has no support for batch updates.
-                    self.member_dynamo.decrement_messages_unviewed_count(message.chat_id, user_id)
+        user_ids = [
+            user_id
+            for user_id in self.member_dynamo.generate_user_ids_by_chat(message.chat_id)
+            if user_id != message.user_id
+        ]
+        chat_view_items = self.view_dynamo.get_views_by_user_ids(
+            message.chat_id, user_ids, projection_expression='partitionKey, sortKey, lastViewedAt'
+        )
+
+        def update_member(user_id):
+            chat_view_item = chat_view_items.get(user_id)
+            chat_last_viewed_at = pendulum.parse(chat_view_item['lastViewedAt']) if chat_view_item else None
+            if not (chat_last_viewed_at and chat_last_viewed_at > message.created_at):
+                self.member_dynamo.decrement_messages_unviewed_count(message.chat_id, user_id)
+
+        self.update_members(update_member, user_ids)
+
+    @functools.cached_property
+    def member_update_executor(self):
+        # kept for the life of the manager, so worker threads and their dynamo table resources are reused
+        return ThreadPoolExecutor(max_workers=self.member_update_max_workers)
+
+    def update_members(self, update_member, user_ids):
+        """
+        Call `update_member(user_id)` for each of `user_ids`, with up to `member_update_max_workers` in flight.
+        Dynamo has no support for batch updates, so this keeps large group chats from being written serially.
+        """
+        list(self.member_update_executor.map(update_member, user_ids))
 
     def sync_member_messages_unviewed_count(self, chat_id, new_item, old_item=None):
         if new_item.get('viewCount', 0) > (old_item or {}).get('viewCount', 0):
@@ -1,48 +1,47 @@
 import logging
 
-import gql
+from app.clients.appsync import GqlMutation
 
 logger = logging.getLogger()
 
+TRIGGER_CHAT_MESSAGE_NOTIFICATION = GqlMutation(
+    'triggerChatMessageNotification',
+    'ChatMessageNotificationInput',
+    '''
+    userId
+    type
+    message {
+        messageId
+        chat {
+            chatId
+        }
+        authorUserId
+        author {
+            userId
+            username
+            photo {
+                url64p
+            }
+        }
+        text
+        textTaggedUsers {
+            tag
+            user {
+                userId
+            }
+        }
+        createdAt
+        lastEditedAt
+    }
+''',
+)
+
 
 class ChatMessageAppSync:
     def __init__(self, appsync_client):
         self.client = appsync_client
 
     def trigger_notification(self, notification_type, user_id, message):
-        mutation = gql.gql(
-            '''
-            mutation TriggerChatMessageNotification ($input: ChatMessageNotificationInput!) {
-                triggerChatMessageNotification (input: $input) {
-                    userId
-                    type
-                    message {
-                        messageId
-                        chat {
-                            chatId
-                        }
-                        authorUserId
-                        author {
-                            userId
-                            username
-                            photo {
-                                url64p
-                            }
-                        }
-                        text
-                        textTaggedUsers {
-                            tag
-                            user {
-                                userId
-                            }
-                        }
-                        createdAt
-                        lastEditedAt
-                    }
-                }
-            }
-        '''
-        )
         input_obj = {
             'userId': user_id,
             'messageId': message.id,
@@ -55,4 +54,4 @@ class ChatMessageAppSync:
             'createdAt': message.item['createdAt'],
             'lastEditedAt': message.item.get('lastEditedAt'),
         }
-        self.client.send(mutation, {'input': input_obj})
+        self.client.send(TRIGGER_CHAT_MESSAGE_NOTIFICATION, {'input': input_obj})
@@ -68,9 +68,11 @@ class ChatMessageDynamo:
             gen = ({'partitionKey': item['partitionKey'], 'sortKey': item['sortKey']} for item in gen)
         return gen
 
-    def generate_all_chat_messages_by_scan(self):
+    def generate_all_chat_messages_by_scan(self, total_segments=None, max_capacity_per_second=None):
         scan_kwargs = {
             'FilterExpression': 'begins_with(partitionKey, :pk_prefix) AND sortKey = :sk_prefix',
             'ExpressionAttributeValues': {':pk_prefix': 'chatMessage/', ':sk_prefix': '-'},
         }
-        return self.client.generate_all_scan(scan_kwargs)
+        return self.client.generate_all_scan(
+            scan_kwargs, total_segments=total_segments, max_capacity_per_second=max_capacity_per_second
+        )
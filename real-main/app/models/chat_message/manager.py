@@ -21,6 +21,10 @@ logger = logging.getLogger()
 class ChatMessageManager(FlagManagerMixin, ManagerBase):
 
     item_type = 'chatMessage'
+    # whole-table scans done by cron jobs are split into this many segments, scanned in parallel
+    scan_total_segments = 8
+    # caps the read capacity those scans consume, so they leave room for live traffic
+    scan_max_capacity_per_second = 1000
 
     def __init__(self, clients, managers=None):
         super().__init__(clients, managers=managers)
@@ -31,6 +35,7 @@ class ChatMessageManager(FlagManagerMixin, ManagerBase):
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
 
+        self.bad_words_client = BadWordsClient()
         self.clients = clients
         if 'appsync' in clients:
             self.appsync = ChatMessageAppSync(clients['appsync'])
@@ -98,9 +103,18 @@ class ChatMessageManager(FlagManagerMixin, ManagerBase):
         return message
 
     def clear_chat_message_bad_words(self):
-        # scan for all chat messages and detect bad words
-        for message in self.dynamo.generate_all_chat_messages_by_scan():
+        "Detect bad words in all chat messages, returns the number of chat messages checked"
+        # the bad words file just changed, so don't check against a cached copy of it
+        self.bad_words_client.get_matcher(revalidate=True)
+        messages = self.dynamo.generate_all_chat_messages_by_scan(
+            total_segments=self.scan_total_segments,
+            max_capacity_per_second=self.scan_max_capacity_per_second,
+        )
+        cnt = 0
+        for message in messages:
             self.on_chat_message_changed_detect_bad_words(message['messageId'], message)
+            cnt += 1
+        return cnt
 
     def on_flag_add(self, message_id, new_item):
         chat_message_item = self.dynamo.increment_flag_count(message_id)
@@ -124,8 +138,7 @@ class ChatMessageManager(FlagManagerMixin, ManagerBase):
             return
 
         # if detects bad words, force delete the chat message
-        bad_words_client = BadWordsClient()
-        if bad_words_client.validate_bad_words_detection(text):
+        if self.bad_words_client.validate_bad_words_detection(text):
             logger.warning(f'Force deleting chat message `{message_id}` from detecting bad words')
             chat_message.delete(forced=True)
 
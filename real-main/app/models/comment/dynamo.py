@@ -68,9 +68,11 @@ class CommentDynamo:
         }
         return self.client.generate_all_query(query_kwargs)
 
-    def generate_all_comments_by_scan(self):
+    def generate_all_comments_by_scan(self, total_segments=None, max_capacity_per_second=None):
         scan_kwargs = {
             'FilterExpression': 'begins_with(partitionKey, :pk_prefix) AND sortKey = :sk_prefix',
             'ExpressionAttributeValues': {':pk_prefix': 'comment/', ':sk_prefix': '-'},
         }
-        return self.client.generate_all_scan(scan_kwargs)
+        return self.client.generate_all_scan(
+            scan_kwargs, total_segments=total_segments, max_capacity_per_second=max_capacity_per_second
+        )
@@ -21,6 +21,10 @@ logger = logging.getLogger()
 class CommentManager(FlagManagerMixin, ManagerBase):
 
     item_type = 'comment'
+    # whole-table scans done by cron jobs are split into this many segments, scanned in parallel
+    scan_total_segments = 8
+    # caps the read capacity those scans consume, so they leave room for live traffic
+    scan_max_capacity_per_second = 1000
 
     def __init__(self, clients, managers=None):
         super().__init__(clients, managers=managers)
@@ -32,7 +36,7 @@ class CommentManager(FlagManagerMixin, ManagerBase):
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
         self.real_dating_client = RealDatingClient()
-        # self.bad_words_client = BadWordsClient()
+        self.bad_words_client = BadWordsClient()
         if 'dynamo' in clients:
             self.dynamo = CommentDynamo(clients['dynamo'])
 
@@ -90,9 +94,18 @@ class CommentManager(FlagManagerMixin, ManagerBase):
         return self.init_comment(comment_item)
 
     def clear_comment_bad_words(self):
-        # scan for all comment texts and detect bad words
-        for comment in self.dynamo.generate_all_comments_by_scan():
+        "Detect bad words in all comments, returns the number of comments checked"
+        # the bad words file just changed, so don't check against a cached copy of it
+        self.bad_words_client.get_matcher(revalidate=True)
+        comments = self.dynamo.generate_all_comments_by_scan(
+            total_segments=self.scan_total_segments,
+            max_capacity_per_second=self.scan_max_capacity_per_second,
+        )
+        cnt = 0
+        for comment in comments:
             self.on_comment_added_detect_bad_words(comment['commentId'], comment)
+            cnt += 1
+        return cnt
 
     def on_user_delete_delete_all_by_user(self, user_id, old_item):
         for comment_item in self.dynamo.generate_by_user(user_id):
@@ -137,8 +150,7 @@ class CommentManager(FlagManagerMixin, ManagerBase):
                 return
 
         # if detects bad words, force delete the comment
-        bad_words_client = BadWordsClient()
-        if bad_words_client.validate_bad_words_detection(text):
+        if self.bad_words_client.validate_bad_words_detection(text):
             logger.warning(f'Force deleting comment `{comment_id}` from detecting bad words')
             comment.delete(forced=True)
 
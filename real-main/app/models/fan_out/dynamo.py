@@ -0,0 +1,119 @@
+import logging
+
+from boto3.dynamodb.conditions import Key
+
+logger = logging.getLogger()
+
+
+class FanOutJobDynamo:
+    def __init__(self, dynamo_client):
+        self.client = dynamo_client
+
+    def pk(self, job_id):
+        return {
+            'partitionKey': f'fanOutJob/{job_id}',
+            'sortKey': '-',
+        }
+
+    def get_job(self, job_id, strongly_consistent=False):
+        return self.client.get_item(self.pk(job_id), ConsistentRead=strongly_consistent)
+
+    def start_job(self, job_id, job_type, job_args, run_id, lease_expires_at, now):
+        "Start the job, or if it already exists restart it from the beginning as a new run"
+        query_kwargs = {
+            'Key': self.pk(job_id),
+            'UpdateExpression': ' '.join(
+                [
+                    'SET schemaVersion = :sv, gsiK1PartitionKey = :gsik1pk, gsiK1SortKey = :gsik1sk,',
+                    'jobId = :jid, jobType = :jt, jobArgs = :ja, runId = :rid, processedCount = :zero,',
+                    'startedAt = :now',
+                    'REMOVE cursorUserId, isDeferred',
+                ]
+            ),
+            'ExpressionAttributeValues': {
+                ':sv': 0,
+                ':gsik1pk': 'fanOutJob',
+                ':gsik1sk': lease_expires_at.to_iso8601_string(),
+                ':jid': job_id,
+                ':jt': job_type,
+                ':ja': job_args,
+                ':rid': run_id,
+                ':zero': 0,
+                ':now': now.to_iso8601_string(),
+            },
+            'ReturnValues': 'ALL_NEW',
+        }
+        item = self.client.table.update_item(**query_kwargs).get('Attributes')
+        self.client.refresh_cached_item(self.pk(job_id), item)
+        return item
+
+    def advance_job(self, job_item, cursor_user_id, count, lease_expires_at):
+        "Record that `count` more users, up to `cursor_user_id`, have been processed. Fails softly."
+        query_kwargs = {
+            'Key': self.pk(job_item['jobId']),
+            'UpdateExpression': (
+                'SET cursorUserId = :cuid, processedCount = processedCount + :cnt, gsiK1SortKey = :gsik1sk'
+            ),
+            'ConditionExpression': 'runId = :rid AND processedCount = :pc',
+            'ExpressionAttributeValues': {
+                ':cuid': cursor_user_id,
+                ':cnt': count,
+                ':gsik1sk': lease_expires_at.to_iso8601_string(),
+                ':rid': job_item['runId'],
+                ':pc': job_item['processedCount'],
+            },
+        }
+        failure_warning = f'Fan-out job `{job_item["jobId"]}` run `{job_item["runId"]}` superseded or taken over'
+        return self.client.update_item(query_kwargs, failure_warning=failure_warning)
+
+    def claim_job(self, job_item, lease_expires_at):
+        "Take the lease on a job whose lease has expired. Fails softly if someone else got there first."
+        query_kwargs = {
+            'Key': self.pk(job_item['jobId']),
+            'UpdateExpression': 'SET gsiK1SortKey = :gsik1sk REMOVE isDeferred',
+            'ConditionExpression': 'runId = :rid AND processedCount = :pc AND gsiK1SortKey = :prev_gsik1sk',
+            'ExpressionAttributeValues': {
+                ':gsik1sk': lease_expires_at.to_iso8601_string(),
+                ':rid': job_item['runId'],
+                ':pc': job_item['processedCount'],
+                ':prev_gsik1sk': job_item['gsiK1SortKey'],
+            },
+        }
+        failure_warning = f'Fan-out job `{job_item["jobId"]}` already claimed'
+        return self.client.update_item(query_kwargs, failure_warning=failure_warning)
+
+    def defer_job(self, job_item, now):
+        "Give up the lease on the job, so a worker will pick it up as soon as it can. Fails softly."
+        query_kwargs = {
+            'Key': self.pk(job_item['jobId']),
+            'UpdateExpression': 'SET gsiK1SortKey = :gsik1sk, isDeferred = :true',
+            'ConditionExpression': 'runId = :rid AND processedCount = :pc',
+            'ExpressionAttributeValues': {
+                ':gsik1sk': now.to_iso8601_string(),
+                ':true': True,
+                ':rid': job_item['runId'],
+                ':pc': job_item['processedCount'],
+            },
+        }
+        failure_warning = f'Fan-out job `{job_item["jobId"]}` run `{job_item["runId"]}` superseded or taken over'
+        return self.client.update_item(query_kwargs, failure_warning=failure_warning)
+
+    def delete_job(self, job_item):
+        "Delete the job, unless it has been restarted as a new run"
+        kwargs = {
+            'ConditionExpression': 'runId = :rid',
+            'ExpressionAttributeValues': {':rid': job_item['runId']},
+        }
+        try:
+            return self.client.delete_item(self.pk(job_item['jobId']), **kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return None
+
+    def generate_job_ids_with_expired_lease(self, now):
+        query_kwargs = {
+            'KeyConditionExpression': (
+                Key('gsiK1PartitionKey').eq('fanOutJob') & Key('gsiK1SortKey').lte(now.to_iso8601_string())
+            ),
+            'IndexName': 'GSI-K1',
+        }
+        return (key['partitionKey'].split('/', 1)[1] for key in self.client.generate_all_query(query_kwargs))
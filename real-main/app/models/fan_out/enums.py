@@ -0,0 +1,8 @@
+class FanOutJobType:
+    FEED_ADD_POST = 'FEED_ADD_POST'
+    FEED_DELETE_POST = 'FEED_DELETE_POST'
+    FEED_ADD_PULLED_FOLLOWS = 'FEED_ADD_PULLED_FOLLOWS'
+    FIRST_STORY_SET = 'FIRST_STORY_SET'
+    FIRST_STORY_DELETE = 'FIRST_STORY_DELETE'
+
+    _ALL = (FEED_ADD_POST, FEED_DELETE_POST, FEED_ADD_PULLED_FOLLOWS, FIRST_STORY_SET, FIRST_STORY_DELETE)
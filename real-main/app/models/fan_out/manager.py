@@ -0,0 +1,121 @@
+import itertools
+import logging
+import uuid
+
+import pendulum
+
+from app import models
+from app.logging import log_metrics
+
+from .dynamo import FanOutJobDynamo
+from .enums import FanOutJobType
+
+logger = logging.getLogger()
+
+
+class FanOutManager:
+    """
+    Runs jobs that write to (or delete from) something per follower of a user, such as adding a post to all
+    their followers' feeds. The users are processed in chunks in order of user id, and a cursor is persisted
+    after each chunk so that a job interrupted part way through can be resumed by a worker.
+
+    The manager that owns a job type provides `generate_fan_out_user_ids(job_type, job_args, after_user_id)`
+    and `process_fan_out_chunk(job_type, job_args, user_ids)`, both of which must be idempotent.
+
+    Progress is emitted as cloudwatch metrics of users processed, by job type & event. Jobs found to have
+    stalled are logged as warnings, which are hooked up to a cloudwatch metric & alert.
+    """
+
+    chunk_size = 100
+    # chunks processed by whoever starts a job before handing off the rest to the worker
+    max_inline_chunks = 10
+    # a job that has not progressed in this long is assumed to have been interrupted
+    lease_duration = pendulum.duration(minutes=2)
+
+    def __init__(self, clients, managers=None):
+        managers = managers or {}
+        managers['fan_out'] = self
+        self.feed_manager = managers.get('feed') or models.FeedManager(clients, managers=managers)
+        self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
+
+        self.clients = clients
+        if 'dynamo' in clients:
+            self.dynamo = FanOutJobDynamo(clients['dynamo'])
+
+        self.job_type_owners = {
+            FanOutJobType.FEED_ADD_POST: self.feed_manager,
+            FanOutJobType.FEED_DELETE_POST: self.feed_manager,
+            FanOutJobType.FEED_ADD_PULLED_FOLLOWS: self.feed_manager,
+            FanOutJobType.FIRST_STORY_SET: self.follower_manager,
+            FanOutJobType.FIRST_STORY_DELETE: self.follower_manager,
+        }
+
+    def start_job(self, job_id, job_type, job_args, now=None):
+        """
+        Start a job and process its first chunks. Starting a job with the same `job_id` as one that
+        is still running restarts it from the beginning. Returns True if the job was completed.
+        """
+        assert job_type in self.job_type_owners, f'Unrecognized fan-out job type `{job_type}`'
+        now = now or pendulum.now('utc')
+        run_id = str(uuid.uuid4())
+        job_item = self.dynamo.start_job(job_id, job_type, job_args, run_id, now + self.lease_duration, now)
+        return self.run_job(job_item, max_chunks=self.max_inline_chunks)
+
+    def run_job(self, job_item, max_chunks=None):
+        """
+        Process the job chunk by chunk until it is complete, or `max_chunks` have been processed at which point
+        it is handed off to the worker. Returns True if the job was completed.
+        """
+        job_type, job_args = job_item['jobType'], job_item['jobArgs']
+        owner = self.job_type_owners[job_type]
+        chunks = range(max_chunks) if max_chunks is not None else itertools.count()
+        for _ in chunks:
+            user_id_gen = owner.generate_fan_out_user_ids(
+                job_type, job_args, after_user_id=job_item.get('cursorUserId')
+            )
+            user_ids = list(itertools.islice(user_id_gen, self.chunk_size))
+            if user_ids:
+                owner.process_fan_out_chunk(job_type, job_args, user_ids)
+            if len(user_ids) < self.chunk_size:
+                self.dynamo.delete_job(job_item)
+                self.log_progress('COMPLETED', job_item, len(user_ids))
+                return True
+            lease_expires_at = pendulum.now('utc') + self.lease_duration
+            job_item = self.dynamo.advance_job(job_item, user_ids[-1], len(user_ids), lease_expires_at)
+            if not job_item:
+                # the job was restarted, or our lease expired and another worker took it over
+                return False
+            self.log_progress('PROGRESS', job_item, len(user_ids))
+        if self.dynamo.defer_job(job_item, pendulum.now('utc')):
+            self.log_progress('DEFERRED', job_item, 0)
+        return False
+
+    def resume_jobs(self, now=None):
+        "Resume all jobs that were handed off, or whose lease expired. Returns count of jobs resumed."
+        now = now or pendulum.now('utc')
+        resumed_cnt = 0
+        for job_id in self.dynamo.generate_job_ids_with_expired_lease(now):
+            job_item = self.dynamo.get_job(job_id, strongly_consistent=True)
+            if not job_item or job_item['gsiK1SortKey'] > now.to_iso8601_string():
+                continue
+            was_deferred = job_item.get('isDeferred', False)
+            job_item = self.dynamo.claim_job(job_item, pendulum.now('utc') + self.lease_duration)
+            if not job_item:
+                continue
+            if not was_deferred:
+                # the string FAN_OUT_JOB_STALLED is hooked up to a cloudwatch metric & alert
+                logger.warning(
+                    f'FAN_OUT_JOB_STALLED: job `{job_id}` of type `{job_item["jobType"]}` was interrupted '
+                    + f'after `{job_item["processedCount"]}` users'
+                )
+            self.run_job(job_item)
+            resumed_cnt += 1
+        return resumed_cnt
+
+    def log_progress(self, event, job_item, chunk_count):
+        "Emit metrics for `chunk_count` more users processed by the job, with `event` one of PROGRESS, etc"
+        log_metrics(
+            {'fanOutUsersProcessed': chunk_count},
+            {'jobType': job_item['jobType'], 'event': event},
+            properties={'jobId': job_item['jobId'], 'runId': job_item['runId']},
+        )
@@ -31,12 +31,9 @@ class FeedDynamo:
         key_generator = self.generate_keys_by_posted_by_user(feed_user_id, post_user_id)
         self.feed_client.batch_delete(key_generator)
 
-    def delete_by_post(self, post_id):
-        "Delete all feed items of `post_id`, return a list of affected user_ids"
-        keys = list(self.generate_keys_by_post(post_id))
-        feed_user_ids = [key['feedUserId'] for key in keys]
-        self.feed_client.batch_delete(k for k in keys)
-        return feed_user_ids
+    def delete_post_from_feeds(self, feed_user_ids, post_id):
+        "Delete the post from all the feeds of the given user_ids"
+        self.feed_client.batch_delete({'postId': post_id, 'feedUserId': uid} for uid in feed_user_ids)
 
     def generate_items(self, feed_user_id):
         query_kwargs = {
@@ -46,12 +43,31 @@ class FeedDynamo:
         }
         return self.feed_client.generate_all_query(query_kwargs)
 
-    def generate_keys_by_post(self, post_id):
+    def generate_items_newest_first(self, feed_user_id, max_posted_at=None, page_size=None):
+        "Generate the feed newest first, optionally starting at `max_posted_at`, fetching `page_size` at a time"
+        query_kwargs = {
+            'KeyConditionExpression': 'feedUserId = :fuid',
+            'ExpressionAttributeValues': {':fuid': feed_user_id},
+            'IndexName': 'GSI-A1',
+            'ScanIndexForward': False,
+        }
+        if max_posted_at:
+            query_kwargs['KeyConditionExpression'] += ' AND postedAt <= :maxpa'
+            query_kwargs['ExpressionAttributeValues'][':maxpa'] = max_posted_at
+        if page_size:
+            query_kwargs['Limit'] = page_size
+        return self.feed_client.generate_all_query(query_kwargs)
+
+    def generate_keys_by_post(self, post_id, after_feed_user_id=None):
+        "Generate keys in order of feedUserId, optionally starting after `after_feed_user_id`"
         query_kwargs = {
             'KeyConditionExpression': 'postId = :pid',
             'ExpressionAttributeValues': {':pid': post_id},
             'ProjectionExpression': 'postId, feedUserId',
         }
+        if after_feed_user_id:
+            query_kwargs['KeyConditionExpression'] += ' AND feedUserId > :afuid'
+            query_kwargs['ExpressionAttributeValues'][':afuid'] = after_feed_user_id
         return self.feed_client.generate_all_query(query_kwargs)
 
     def generate_keys_by_posted_by_user(self, feed_user_id, posted_by_user_id):
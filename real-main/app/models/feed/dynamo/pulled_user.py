@@ -0,0 +1,69 @@
+import logging
+
+import pendulum
+from boto3.dynamodb.conditions import Key
+
+logger = logging.getLogger()
+
+
+class FeedPulledUserDynamo:
+    """
+    Users whose posts are pulled into their followers' feeds when read, rather than fanned out to them.
+    Each follower of such a user has a follow item recording that, so they can find who to pull from.
+    """
+
+    def __init__(self, dynamo_client):
+        self.client = dynamo_client
+
+    def pk(self, user_id):
+        return {
+            'partitionKey': f'user/{user_id}',
+            'sortKey': 'feedPulled',
+        }
+
+    def follow_pk(self, follower_user_id, followed_user_id):
+        return {
+            'partitionKey': f'user/{follower_user_id}',
+            'sortKey': f'feedPulledFollow/{followed_user_id}',
+        }
+
+    def get(self, user_id):
+        return self.client.get_item(self.pk(user_id))
+
+    def add(self, user_id, now=None):
+        "Idempotent"
+        now = now or pendulum.now('utc')
+        query_kwargs = {
+            'Item': {
+                **self.pk(user_id),
+                'schemaVersion': 0,
+                'userId': user_id,
+                'pulledAt': now.to_iso8601_string(),
+            },
+        }
+        try:
+            return self.client.add_item(query_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return self.get(user_id)
+
+    def delete(self, user_id):
+        return self.client.delete_item(self.pk(user_id))
+
+    def add_follows(self, follower_user_ids, followed_user_id):
+        "Record that the followers follow the pulled user. Idempotent."
+        items = (
+            {**self.follow_pk(follower_user_id, followed_user_id), 'schemaVersion': 0}
+            for follower_user_id in follower_user_ids
+        )
+        self.client.batch_put_items(items)
+
+    def delete_follow(self, follower_user_id, followed_user_id):
+        return self.client.delete_item(self.follow_pk(follower_user_id, followed_user_id))
+
+    def generate_followed_user_ids(self, follower_user_id):
+        "Generate the ids of the pulled users followed by the follower"
+        sort_key_condition = Key('sortKey').begins_with('feedPulledFollow/')
+        query_kwargs = {
+            'KeyConditionExpression': Key('partitionKey').eq(f'user/{follower_user_id}') & sort_key_condition,
+        }
+        return (key['sortKey'].split('/')[1] for key in self.client.generate_all_query(query_kwargs))
@@ -1,42 +1,98 @@
-import itertools
+import base64
+import heapq
+import json
 import logging
 
 from app import models
+from app.models.fan_out.enums import FanOutJobType
 from app.models.follower.enums import FollowStatus
 from app.models.post.enums import PostStatus
 from app.utils import GqlNotificationType
 
-from .dynamo import FeedDynamo
+from .dynamo.base import FeedDynamo
+from .dynamo.pulled_user import FeedPulledUserDynamo
+from .exceptions import FeedException
 
 logger = logging.getLogger()
 
 
 class FeedManager:
+
+    # posts by users with more followers than this are not fanned out to their followers' feeds,
+    # rather they are merged into those feeds when read
+    fan_out_max_follower_count = 10000
+
     def __init__(self, clients, managers=None):
         managers = managers or {}
         managers['feed'] = self
+        self.fan_out_manager = managers.get('fan_out') or models.FanOutManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
 
         self.clients = clients
         if 'appsync' in clients:
             self.appsync_client = clients['appsync']
+        if 'dynamo' in clients:
+            self.pulled_user_dynamo = FeedPulledUserDynamo(clients['dynamo'])
         if 'dynamo_feed' in clients:
             self.dynamo = FeedDynamo(clients['dynamo_feed'])
 
+    def is_pulled(self, user_id):
+        return bool(self.pulled_user_dynamo.get(user_id))
+
     def add_users_posts_to_feed(self, feed_user_id, posted_by_user_id):
+        if self.is_pulled(posted_by_user_id):
+            return
         post_item_generator = self.post_manager.dynamo.generate_posts_by_user(posted_by_user_id, completed=True)
         self.dynamo.add_posts_to_feed(feed_user_id, post_item_generator)
 
     def add_post_to_followers_feeds(self, followed_user_id, post_item):
-        user_id_gen = itertools.chain(
-            [followed_user_id], self.follower_manager.generate_follower_user_ids(followed_user_id)
-        )
-        return self.dynamo.add_post_to_feeds(user_id_gen, post_item)
+        "Add the post to the poster's feed now, and start a job to add it to their followers' feeds"
+        self.dynamo.add_post_to_feeds([followed_user_id], post_item)
+        if not self.is_pulled(followed_user_id):
+            job_args = {'postItem': {k: post_item[k] for k in ('postId', 'postedByUserId', 'postedAt')}}
+            self.fan_out_manager.start_job(f'feed:{post_item["postId"]}', FanOutJobType.FEED_ADD_POST, job_args)
+
+    def delete_post_from_feeds(self, post_id):
+        "Start a job to delete the post from all feeds. Supersedes any job still adding the post to feeds."
+        self.fan_out_manager.start_job(f'feed:{post_id}', FanOutJobType.FEED_DELETE_POST, {'postId': post_id})
+
+    def generate_fan_out_user_ids(self, job_type, job_args, after_user_id=None):
+        if job_type == FanOutJobType.FEED_ADD_POST:
+            return self.follower_manager.dynamo.generate_follower_user_ids_by_id(
+                job_args['postItem']['postedByUserId'], after_user_id=after_user_id
+            )
+        if job_type == FanOutJobType.FEED_DELETE_POST:
+            keys = self.dynamo.generate_keys_by_post(job_args['postId'], after_feed_user_id=after_user_id)
+            return (key['feedUserId'] for key in keys)
+        if job_type == FanOutJobType.FEED_ADD_PULLED_FOLLOWS:
+            return self.follower_manager.dynamo.generate_follower_user_ids_by_id(
+                job_args['followedUserId'], follow_status=FollowStatus.FOLLOWING, after_user_id=after_user_id
+            )
+        raise AssertionError(f'Unrecognized fan-out job type `{job_type}`')
+
+    def process_fan_out_chunk(self, job_type, job_args, user_ids):
+        if job_type == FanOutJobType.FEED_ADD_POST:
+            self.dynamo.add_post_to_feeds(user_ids, job_args['postItem'])
+        elif job_type == FanOutJobType.FEED_DELETE_POST:
+            self.dynamo.delete_post_from_feeds(user_ids, job_args['postId'])
+        elif job_type == FanOutJobType.FEED_ADD_PULLED_FOLLOWS:
+            # what's in the feeds doesn't change, just where it comes from
+            self.pulled_user_dynamo.add_follows(user_ids, job_args['followedUserId'])
+            return
+        else:
+            raise AssertionError(f'Unrecognized fan-out job type `{job_type}`')
+        for user_id in user_ids:
+            self.appsync_client.fire_notification(user_id, GqlNotificationType.USER_FEED_CHANGED)
 
     def on_user_follow_status_change_sync_feed(self, followed_user_id, new_item=None, old_item=None):
         follower_user_id = (new_item or old_item)['followerUserId']
         new_status = (new_item or {}).get('followStatus', FollowStatus.NOT_FOLLOWING)
+        if self.is_pulled(followed_user_id):
+            if new_status == FollowStatus.FOLLOWING:
+                self.pulled_user_dynamo.add_follows([follower_user_id], followed_user_id)
+            else:
+                self.pulled_user_dynamo.delete_follow(follower_user_id, followed_user_id)
         if new_status == FollowStatus.FOLLOWING:
             self.add_users_posts_to_feed(follower_user_id, followed_user_id)
         else:
@@ -47,8 +103,68 @@ class FeedManager:
         posted_by_user_id = (new_item or old_item)['postedByUserId']
         new_status = (new_item or {}).get('postStatus')
         if new_status == PostStatus.COMPLETED:
-            feed_user_ids = self.add_post_to_followers_feeds(posted_by_user_id, new_item)
+            self.add_post_to_followers_feeds(posted_by_user_id, new_item)
+            self.appsync_client.fire_notification(posted_by_user_id, GqlNotificationType.USER_FEED_CHANGED)
         else:
-            feed_user_ids = self.dynamo.delete_by_post(post_id)
-        for user_id in feed_user_ids:
-            self.appsync_client.fire_notification(user_id, GqlNotificationType.USER_FEED_CHANGED)
+            self.delete_post_from_feeds(post_id)
+
+    def on_user_follower_count_change_sync_pulled(self, user_id, new_item, old_item=None):
+        """
+        Once a user has too many followers, their posts are no longer fanned out. Users do not go back to
+        having their posts fanned out if they lose followers, as their posts from the interim would be missing.
+        Once pulled, a job records the user as followed by each of their followers, for `get_feed()` to find.
+        """
+        if new_item.get('followerCount', 0) <= self.fan_out_max_follower_count or self.is_pulled(user_id):
+            return
+        self.pulled_user_dynamo.add(user_id)
+        job_args = {'followedUserId': user_id}
+        self.fan_out_manager.start_job(f'feedPulled:{user_id}', FanOutJobType.FEED_ADD_PULLED_FOLLOWS, job_args)
+
+    def get_feed(self, user_id, limit=20, next_token=None):
+        """
+        Return a page of the ids of the posts in the user's feed, newest first, along with a token
+        for the next page. Posts from pulled users the user follows are merged with those fanned out.
+        """
+        max_posted_at, after_post_id = self.decode_feed_token(next_token) if next_token else (None, None)
+        page_size = limit + 1
+        items_gens = [self.dynamo.generate_items_newest_first(user_id, max_posted_at, page_size=page_size)]
+        for pulled_user_id in self.generate_followed_pulled_user_ids(user_id):
+            items_gens.append(
+                self.post_manager.dynamo.generate_completed_posts_by_user_newest_first(
+                    pulled_user_id, max_posted_at, page_size=page_size
+                )
+            )
+
+        # items with the same postedAt as the last item of the previous page are ordered by postId
+        def sort_key(item):
+            return (item['postedAt'], item['postId'])
+
+        cursor = (max_posted_at, after_post_id) if next_token else None
+        merged = heapq.merge(*items_gens, key=sort_key, reverse=True)
+        post_ids, last_item = [], None
+        for item in merged:
+            if (cursor and sort_key(item) >= cursor) or (last_item and item['postId'] == last_item['postId']):
+                continue
+            if len(post_ids) == limit:
+                return {'items': post_ids, 'nextToken': self.encode_feed_token(*sort_key(last_item))}
+            post_ids.append(item['postId'])
+            last_item = item
+        return {'items': post_ids, 'nextToken': None}
+
+    def generate_followed_pulled_user_ids(self, user_id):
+        pulled_user_ids = self.pulled_user_dynamo.generate_followed_user_ids(user_id)
+        # a follow item may be left behind by an unfollow that raced with the job that adds them
+        keys = [self.follower_manager.dynamo.pk(user_id, pulled_user_id) for pulled_user_id in pulled_user_ids]
+        for item in self.follower_manager.dynamo.client.batch_get_untyped_items(keys):
+            if item['followStatus'] == FollowStatus.FOLLOWING:
+                yield item['partitionKey'].split('/')[1]
+
+    def encode_feed_token(self, posted_at, post_id):
+        return base64.urlsafe_b64encode(json.dumps([posted_at, post_id]).encode()).decode()
+
+    def decode_feed_token(self, token):
+        try:
+            posted_at, post_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+        except Exception as err:
+            raise FeedException(f'Invalid nextToken `{token}`') from err
+        return posted_at, post_id
@@ -2,7 +2,7 @@ import functools
 import logging
 
 import pendulum
-from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.conditions import Attr, Key
 
 from ..exceptions import FollowerAlreadyHasStatus
 
@@ -21,7 +21,7 @@ class FollowerDynamo:
 
     def get_following(self, follower_user_id, followed_user_id, strongly_consistent=False):
         pk = self.pk(follower_user_id, followed_user_id)
-        return self.client.get_item(pk, ConsistentRead=strongly_consistent)
+        return self.client.get_item(pk, ConsistentRead=strongly_consistent, cached=True)
 
     def add_following(self, follower_user_id, followed_user_id, follow_status):
         followed_at_str = pendulum.now('utc').to_iso8601_string()
@@ -73,6 +73,20 @@ class FollowerDynamo:
             query_kwargs['ProjectionExpression'] = 'partitionKey, sortKey'
         return self.client.generate_all_query(query_kwargs)
 
+    def generate_follower_user_ids_by_id(self, user_id, follow_status=None, after_user_id=None):
+        "Generate user ids of the followers of the given user in order of id, optionally after `after_user_id`"
+        # the firstStory items share the sort key prefix, and are filtered out by their lack of a followStatus
+        sort_key_condition = Key('sortKey').between(f'follower/{after_user_id or ""}', 'follower/~')
+        query_kwargs = {
+            'KeyConditionExpression': Key('partitionKey').eq(f'user/{user_id}') & sort_key_condition,
+            'FilterExpression': (
+                Attr('followStatus').eq(follow_status) if follow_status else Attr('followStatus').exists()
+            ),
+            'ProjectionExpression': 'followerUserId',
+        }
+        gen = (item['followerUserId'] for item in self.client.generate_all_query(query_kwargs))
+        return (uid for uid in gen if uid != after_user_id)
+
     def generate_follower_items(self, user_id, follow_status=None, keys_only=False):
         "Generate items that represent a follower of the given user (that the given user is the followed)"
         key_conditions = [Key('gsiA2PartitionKey').eq(f'followed/{user_id}')]
@@ -2,6 +2,7 @@ import logging
 from itertools import chain
 
 from app import models
+from app.models.fan_out.enums import FanOutJobType
 from app.models.user.enums import UserPrivacyStatus, UserStatus
 from app.utils import GqlNotificationType
 
@@ -20,6 +21,7 @@ class FollowerManager:
         managers['follower'] = self
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+        self.fan_out_manager = managers.get('fan_out') or models.FanOutManager(clients, managers=managers)
 
         self.clients = clients
         if 'appsync' in clients:
@@ -117,23 +119,47 @@ class FollowerManager:
             None,
         )
 
-        follower_uids_generator = self.generate_follower_user_ids(user_id, follow_status=FollowStatus.FOLLOWING)
+        # a job started for this user supersedes any still running from a previous refresh
+        job_id = f'firstStory:{user_id}'
         if ffs_prev and not ffs_now:
             # a story was deleted, and there are no more stories to take its place as ffs
-            self.first_story_dynamo.delete_all(follower_uids_generator, user_id)
+            self.fan_out_manager.start_job(job_id, FanOutJobType.FIRST_STORY_DELETE, {'userId': user_id})
 
         if not ffs_prev and ffs_now:
             # there was no ffs, but a story was added and can now be ffs
-            self.first_story_dynamo.set_all(follower_uids_generator, ffs_now)
+            self.start_first_story_set_job(job_id, ffs_now)
 
         if ffs_prev and ffs_now:
             if ffs_prev != ffs_now:
                 # the ffs has changed: either different post, or same post but that post changed
-                self.first_story_dynamo.set_all(follower_uids_generator, ffs_now)
+                self.start_first_story_set_job(job_id, ffs_now)
 
         if not ffs_prev and not ffs_now:
             raise AssertionError('Should be unreachable condition')
 
+    def start_first_story_set_job(self, job_id, post_item):
+        job_args = {'postItem': {k: post_item[k] for k in ('postId', 'postedByUserId', 'expiresAt')}}
+        self.fan_out_manager.start_job(job_id, FanOutJobType.FIRST_STORY_SET, job_args)
+
+    def generate_fan_out_user_ids(self, job_type, job_args, after_user_id=None):
+        if job_type == FanOutJobType.FIRST_STORY_SET:
+            user_id = job_args['postItem']['postedByUserId']
+        elif job_type == FanOutJobType.FIRST_STORY_DELETE:
+            user_id = job_args['userId']
+        else:
+            raise AssertionError(f'Unrecognized fan-out job type `{job_type}`')
+        return self.dynamo.generate_follower_user_ids_by_id(
+            user_id, follow_status=FollowStatus.FOLLOWING, after_user_id=after_user_id
+        )
+
+    def process_fan_out_chunk(self, job_type, job_args, user_ids):
+        if job_type == FanOutJobType.FIRST_STORY_SET:
+            self.first_story_dynamo.set_all(user_ids, job_args['postItem'])
+        elif job_type == FanOutJobType.FIRST_STORY_DELETE:
+            self.first_story_dynamo.delete_all(user_ids, job_args['userId'])
+        else:
+            raise AssertionError(f'Unrecognized fan-out job type `{job_type}`')
+
     def on_first_story_post_id_change_fire_gql_notifications(self, user_id, new_item=None, old_item=None):
         followed_user_id, follower_user_id = self.first_story_dynamo.parse_key(new_item or old_item)
         kwargs = {'followedUserId': followed_user_id}
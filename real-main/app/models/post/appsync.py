@@ -1,30 +1,29 @@
 import logging
 
-import gql
+from app.clients.appsync import GqlMutation
 
 logger = logging.getLogger()
 
+TRIGGER_POST_NOTIFICATION = GqlMutation(
+    'triggerPostNotification',
+    'PostNotificationInput',
+    '''
+    userId
+    type
+    post {
+        postId
+        postStatus
+        isVerified
+    }
+''',
+)
+
 
 class PostAppSync:
     def __init__(self, appsync_client):
         self.client = appsync_client
 
     def trigger_notification(self, notification_type, post):
-        mutation = gql.gql(
-            '''
-            mutation TriggerPostNotification ($input: PostNotificationInput!) {
-                triggerPostNotification (input: $input) {
-                    userId
-                    type
-                    post {
-                        postId
-                        postStatus
-                        isVerified
-                    }
-                }
-            }
-        '''
-        )
         input_obj = {
             'userId': post.user_id,
             'type': notification_type,
@@ -32,4 +31,4 @@ class PostAppSync:
             'postStatus': post.status,
             'isVerified': post.item.get('isVerified'),
         }
-        self.client.send(mutation, {'input': input_obj})
+        self.client.send(TRIGGER_POST_NOTIFICATION, {'input': input_obj})
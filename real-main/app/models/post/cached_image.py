@@ -1,3 +1,4 @@
+import hashlib
 import imghdr
 import io
 import logging
@@ -10,6 +11,10 @@ from .exceptions import PostException
 
 logger = logging.getLogger()
 
+EXIF_ORIENTATION_TAG = 0x0112
+# exif orientations that transpose the image's width and height
+TRANSPOSING_EXIF_ORIENTATIONS = (5, 6, 7, 8)
+
 
 class CachedImage:
     def __init__(self, post_id, image_size=None, s3_client=None, s3_path=None, source=None, content_type=None):
@@ -33,6 +38,9 @@ class CachedImage:
         #   - None: cache has never been filled
         self.is_synced = None
 
+        # md5 hex digest of the data last read from or written to S3, if known
+        self.checksum = None
+
     @property
     def readonly_image(self):
         """
@@ -56,11 +64,7 @@ class CachedImage:
                 heif_file.mode, heif_file.size, heif_file.data, 'raw', heif_file.mode, heif_file.stride
             )
         elif self.content_type == 'image/jpeg':
-            file_type = imghdr.what(fh)
-            if file_type is None:
-                raise PostException(f'Unable to recognize file type of uploaded file for post `{self.post_id}`')
-            if file_type != 'jpeg' and file_type != 'png':
-                raise PostException(f'File of type `{file_type}` for uploaded jpeg image post `{self.post_id}`')
+            self._validate_jpeg_data(fh)
             try:
                 self._image = PIL.ImageOps.exif_transpose(PIL.Image.open(fh))
             except Exception as err:
@@ -68,6 +72,59 @@ class CachedImage:
         else:
             raise PostException(f'Unrecognized content-type `{self.content_type}`')
 
+    def _validate_jpeg_data(self, fh):
+        file_type = imghdr.what(fh)
+        if file_type is None:
+            raise PostException(f'Unable to recognize file type of uploaded file for post `{self.post_id}`')
+        if file_type != 'jpeg' and file_type != 'png':
+            raise PostException(f'File of type `{file_type}` for uploaded jpeg image post `{self.post_id}`')
+
+    def _open_jpeg_data_lazily(self):
+        """
+        Open our data without decoding it, if possible. Only the header is read.
+        Returns a tuple of (image, is_transposed) where is_transposed indicates if exif orientation will
+        swap the image's width and height. Returns (None, None) if lazy opening isn't possible.
+        """
+        if not self._image and not self._data:
+            self.refresh()
+        if self._image or self.content_type != 'image/jpeg':
+            return None, None
+        fh = io.BytesIO(self._data)
+        self._validate_jpeg_data(fh)
+        try:
+            image = PIL.Image.open(fh)
+            orientation = image.getexif().get(EXIF_ORIENTATION_TAG)
+        except Exception as err:
+            raise PostException(f'Unable to decode jpeg data for post `{self.post_id}`: {err}') from err
+        return image, orientation in TRANSPOSING_EXIF_ORIENTATIONS
+
+    def get_dimensions(self):
+        "Returns (width, height), without decoding the image if possible"
+        image, is_transposed = self._open_jpeg_data_lazily()
+        if not image:
+            return self.readonly_image.size
+        width, height = image.size
+        return (height, width) if is_transposed else (width, height)
+
+    def get_proxy_image(self, max_dimensions):
+        """
+        Returns a new image, downscaled to fit within `max_dimensions`. Intended for analysis that
+        doesn't need full resolution. If the jpeg data hasn't already been decoded, it is decoded at
+        reduced resolution (draft mode) which is much faster and uses much less memory.
+        """
+        image, is_transposed = self._open_jpeg_data_lazily()
+        if not image:
+            image = self.readonly_image
+            scale = min(max_dimensions[0] / image.size[0], max_dimensions[1] / image.size[1], 1)
+            size = (max(round(image.size[0] * scale), 1), max(round(image.size[1] * scale), 1))
+            return image.resize(size, resample=PIL.Image.LANCZOS, reducing_gap=2.0)
+        try:
+            # thumbnail() uses draft mode for jpegs
+            image.thumbnail(max_dimensions[::-1] if is_transposed else max_dimensions, resample=PIL.Image.LANCZOS)
+            return PIL.ImageOps.exif_transpose(image)
+        except Exception as err:
+            raise PostException(f'Unable to decode jpeg data for post `{self.post_id}`: {err}') from err
+
     def set_image(self, image):
         self._data = None
         self._image = image.copy()
@@ -99,6 +156,7 @@ class CachedImage:
                 raise PostException(f'{self.s3_path} image data not found for post `{self.post_id}`') from err
             self._data = fh.read()
             self._image = None
+            self.checksum = hashlib.md5(self._data).hexdigest()
         self.is_synced = True
         return self
 
@@ -140,6 +198,30 @@ class CachedImage:
         self.is_synced = False
         return self
 
+    def encode(self):
+        "Returns the bytes that would be written to S3 on flush"
+        if self._data:
+            return self._data
+        assert self._image, 'Nothing to encode'
+        assert self.content_type == 'image/jpeg', 'Non-jpeg images can only be flushed back empty'
+        fh = io.BytesIO()
+        # Note: Pillow's Image.save treats None differently than not present for some kwargs
+        kwargs = {
+            k: v
+            for k, v in {
+                'format': 'JPEG',
+                'quality': 100,  # per spec
+                'icc_profile': self._image.info.get('icc_profile'),
+                'exif': self._image.info.get('exif'),
+            }.items()
+            if v is not None
+        }
+        try:
+            self._image.convert('RGB').save(fh, **kwargs)
+        except Exception as err:
+            raise PostException(f'Unable to save pil image for post `{self.post_id}`: {err}') from err
+        return fh.getvalue()
+
     def flush(self, include_deletes=False):
         assert self.s3_path, 'Can only flush cached images backed by S3'
         if self.is_synced is None:
@@ -149,28 +231,10 @@ class CachedImage:
                 if not include_deletes:
                     raise Exception('Refusing to flush back empty cache without `include_deletes` kwarg')
                 self.s3_client.delete_object(self.s3_path)
+                self.checksum = None
             else:
-                if self._data:
-                    fh = io.BytesIO(self._data)
-                elif self._image:
-                    assert self.content_type == 'image/jpeg', 'Non-jpeg images can only be flushed back empty'
-                    fh = io.BytesIO()
-                    # Note: Pillow's Image.save treats None differently than not present for some kwargs
-                    kwargs = {
-                        k: v
-                        for k, v in {
-                            'format': 'JPEG',
-                            'quality': 100,  # per spec
-                            'icc_profile': self._image.info.get('icc_profile'),
-                            'exif': self._image.info.get('exif'),
-                        }.items()
-                        if v is not None
-                    }
-                    try:
-                        self._image.convert('RGB').save(fh, **kwargs)
-                    except Exception as err:
-                        raise PostException(f'Unable to save pil image for post `{self.post_id}`: {err}') from err
-                    fh.seek(0)
-                self.s3_client.put_object(self.s3_path, fh, self.content_type)
+                body = self.encode()
+                self.s3_client.put_object(self.s3_path, io.BytesIO(body), self.content_type)
+                self.checksum = hashlib.md5(body).hexdigest()
             self.is_synced = True
         return self
@@ -23,7 +23,11 @@ class PostDynamo:
         }
 
     def get_post(self, post_id, strongly_consistent=False):
-        return self.client.get_item(self.pk(post_id), ConsistentRead=strongly_consistent)
+        return self.client.get_item(self.pk(post_id), ConsistentRead=strongly_consistent, cached=True)
+
+    def batch_get_posts(self, post_ids):
+        "Order *not* maintained, posts that do not exist are omitted"
+        return self.client.batch_get_untyped_items([self.pk(post_id) for post_id in post_ids], cached=True)
 
     def delete_post(self, post_id):
         return self.client.delete_item(self.pk(post_id))
@@ -51,6 +55,23 @@ class PostDynamo:
             query_kwargs['FilterExpression'] = filter_exp(PostStatus.COMPLETED)
         return self.client.generate_all_query(query_kwargs)
 
+    def generate_completed_posts_by_user_newest_first(self, user_id, max_posted_at=None, page_size=None):
+        "Optionally starting at `max_posted_at`, fetching `page_size` at a time"
+        prefix = f'{PostStatus.COMPLETED}/'
+        sort_key_condition = (
+            Key('gsiA2SortKey').between(prefix, prefix + max_posted_at)
+            if max_posted_at
+            else Key('gsiA2SortKey').begins_with(prefix)
+        )
+        query_kwargs = {
+            'KeyConditionExpression': Key('gsiA2PartitionKey').eq(f'post/{user_id}') & sort_key_condition,
+            'IndexName': 'GSI-A2',
+            'ScanIndexForward': False,
+        }
+        if page_size:
+            query_kwargs['Limit'] = page_size
+        return self.client.generate_all_query(query_kwargs)
+
     def generate_expired_post_pks_by_day(self, date, cut_off_time=None):
         key_conditions = [Key('gsiK1PartitionKey').eq(f'post/{date}')]
         if cut_off_time:
@@ -62,7 +83,9 @@ class PostDynamo:
         }
         return self.client.generate_all_query(query_kwargs)
 
-    def generate_expired_post_pks_with_scan(self, cut_off_date):
+    def generate_expired_post_pks_with_scan(
+        self, cut_off_date, total_segments=None, max_capacity_per_second=None
+    ):
         "Do a table **scan** to generate pks of expired posts. Does *not* include cut_off_date."
         query_kwargs = {
             'FilterExpression': (
@@ -70,7 +93,9 @@ class PostDynamo:
             ),
             'ProjectionExpression': 'partitionKey, sortKey',
         }
-        return self.client.generate_all_scan(query_kwargs)
+        return self.client.generate_all_scan(
+            query_kwargs, total_segments=total_segments, max_capacity_per_second=max_capacity_per_second
+        )
 
     def add_pending_post(
         self,
@@ -148,10 +173,10 @@ class PostDynamo:
         return self.client.decrement_count(self.pk(post_id), 'flagCount')
 
     def increment_viewed_by_count(self, post_id):
-        return self.client.increment_count(self.pk(post_id), 'viewedByCount')
+        return self.client.increment_count(self.pk(post_id), 'viewedByCount', buffered=True, sharded=True)
 
     def decrement_viewed_by_count(self, post_id):
-        return self.client.decrement_count(self.pk(post_id), 'viewedByCount')
+        return self.client.decrement_count(self.pk(post_id), 'viewedByCount', buffered=True, sharded=True)
 
     def set_post_status(self, post_item, status, status_reason=None, original_post_id=None, album_rank=None):
         album_id = post_item.get('albumId')
@@ -355,18 +380,21 @@ class PostDynamo:
         return self.client.update_item(update_query_kwargs)
 
     def increment_onymous_like_count(self, post_id):
-        return self.client.increment_count(self.pk(post_id), 'onymousLikeCount')
+        return self.client.increment_count(self.pk(post_id), 'onymousLikeCount', buffered=True, sharded=True)
 
     def decrement_onymous_like_count(self, post_id):
-        return self.client.decrement_count(self.pk(post_id), 'onymousLikeCount')
+        return self.client.decrement_count(self.pk(post_id), 'onymousLikeCount', buffered=True, sharded=True)
 
     def increment_anonymous_like_count(self, post_id):
-        return self.client.increment_count(self.pk(post_id), 'anonymousLikeCount')
+        return self.client.increment_count(self.pk(post_id), 'anonymousLikeCount', buffered=True, sharded=True)
 
     def decrement_anonymous_like_count(self, post_id):
-        return self.client.decrement_count(self.pk(post_id), 'anonymousLikeCount')
+        return self.client.decrement_count(self.pk(post_id), 'anonymousLikeCount', buffered=True, sharded=True)
 
     def increment_comment_count(self, post_id, viewed=False):
+        # commentsUnviewedCount is also decremented and cleared directly, so it is not buffered
+        if self.client.buffer_count(self.pk(post_id), 'commentCount', 1, sharded=True):
+            return None if viewed else self.client.increment_count(self.pk(post_id), 'commentsUnviewedCount')
         query_kwargs = {
             'Key': self.pk(post_id),
             'UpdateExpression': 'ADD commentCount :one',
@@ -381,7 +409,7 @@ class PostDynamo:
         return self.client.update_item(query_kwargs, failure_warning=msg)
 
     def decrement_comment_count(self, post_id):
-        return self.client.decrement_count(self.pk(post_id), 'commentCount')
+        return self.client.decrement_count(self.pk(post_id), 'commentCount', buffered=True, sharded=True)
 
     def decrement_comments_unviewed_count(self, post_id):
         return self.client.decrement_count(self.pk(post_id), 'commentsUnviewedCount')
@@ -1,6 +1,8 @@
 import collections
+import functools
 import itertools
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
 import pendulum
@@ -10,6 +12,7 @@ from app.mixins.base import ManagerBase
 from app.mixins.flag.manager import FlagManagerMixin
 from app.mixins.trending.manager import TrendingManagerMixin
 from app.mixins.view.enums import ViewType
+from app.mixins.view.exceptions import ViewAlreadyExists
 from app.mixins.view.manager import ViewManagerMixin
 from app.models.like.enums import LikeStatus
 from app.models.user.enums import SubscriptionGrantCode, UserPrivacyStatus, UserSubscriptionLevel
@@ -27,6 +30,12 @@ logger = logging.getLogger()
 class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, ManagerBase):
 
     item_type = 'post'
+    # whole-table scans done by cron jobs are split into this many segments, scanned in parallel
+    scan_total_segments = 8
+    # caps the read capacity those scans consume, so they leave room for live traffic
+    scan_max_capacity_per_second = 1000
+    # max number of view writes in flight at once when recording views of many posts
+    view_write_max_workers = 8
     app_store_fee_percent = Decimal('0.15')
     real_fee_percent = Decimal('0.1')
 
@@ -59,6 +68,11 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         post_item = self.dynamo.get_post(post_id, strongly_consistent=strongly_consistent)
         return self.init_post(post_item) if post_item else None
 
+    def get_posts(self, post_ids):
+        "Returns a list of the posts, in the same order as `post_ids`, with None in place of those that don't exist"
+        post_items = {item['postId']: item for item in self.dynamo.batch_get_posts(post_ids)}
+        return [self.init_post(post_items[post_id]) if post_id in post_items else None for post_id in post_ids]
+
     def init_post(self, post_item):
         kwargs = {
             'post_appsync': getattr(self, 'appsync', None),
@@ -207,21 +221,81 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
 
         return post
 
-    def record_views(self, post_ids, user_id, viewed_at=None, view_type=None):
+    @functools.cached_property
+    def view_write_executor(self):
+        # kept for the life of the manager, so worker threads and their dynamo table resources are reused
+        return ThreadPoolExecutor(max_workers=self.view_write_max_workers)
+
+    def record_views(self, post_ids, user_id, viewed_at=None, view_type=None, first_viewed_at=None):
+        """
+        Record views of the posts in bulk. Views of non-original posts are counted as views of the original too.
+        If the views were at different times, `viewed_at` is the last of them and `first_viewed_at` the first.
+        Returns a dict of post_id to whether this was the user's first view of that post, for the posts viewed.
+        """
         grouped_post_ids = dict(collections.Counter(post_ids))
         if not grouped_post_ids:
-            return
+            return {}
+        viewed_at = viewed_at or pendulum.now('utc')
 
-        results = []
+        posts = {post.id: post for post in self.get_posts(list(grouped_post_ids)) if post}
+        view_counts = collections.Counter()
+        viewed_post_ids = []
         for post_id, view_count in grouped_post_ids.items():
-            post = self.get_post(post_id)
+            post = posts.get(post_id)
             if not post:
                 logger.warning(f'Cannot record view(s) by user `{user_id}` on DNE post `{post_id}`')
                 continue
-            results.append(post.record_view_count(user_id, view_count, viewed_at=viewed_at, view_type=view_type))
-
-        if any(results):
+            if post.status != PostStatus.COMPLETED:
+                logger.warning(f'Cannot record views by user `{user_id}` on non-COMPLETED post `{post_id}`')
+                continue
+            view_counts[post_id] += view_count
+            viewed_post_ids.append(post_id)
+
+        # If this is a non-original post, count this like a view of the original post as well
+        to_originals = {post_id: view_counts[post_id] for post_id in viewed_post_ids}
+        while to_originals:
+            original_post_ids = {posts[pid].original_post_id for pid in to_originals} - set(to_originals)
+            missing_post_ids = [pid for pid in original_post_ids if pid not in posts]
+            posts.update((post.id, post) for post in self.get_posts(missing_post_ids) if post)
+            next_to_originals = collections.Counter()
+            for post_id, view_count in to_originals.items():
+                original_post = posts.get(posts[post_id].original_post_id)
+                if not original_post or original_post.id == post_id:
+                    continue
+                if original_post.status != PostStatus.COMPLETED:
+                    logger.warning(
+                        f'Cannot record views by user `{user_id}` on non-COMPLETED post `{original_post.id}`'
+                    )
+                    continue
+                view_counts[original_post.id] += view_count
+                next_to_originals[original_post.id] += view_count
+            to_originals = next_to_originals
+
+        view_items = self.view_dynamo.get_views_by_item_ids(list(view_counts), user_id)
+
+        def record_view_count(post_id):
+            "Returns True if this was the user's first view of the post"
+            args = [post_id, user_id, view_counts[post_id], viewed_at]
+            if post_id not in view_items:
+                try:
+                    self.view_dynamo.add_view(*args, view_type=view_type, first_viewed_at=first_viewed_at)
+                except ViewAlreadyExists:
+                    # we lost a race condition to add the view, so still need to record our data
+                    pass
+                else:
+                    return True
+            self.view_dynamo.increment_view_count(*args, view_type=view_type)
+            return False
+
+        is_first_views = {}
+        if view_counts:
+            post_ids_to_record = list(view_counts)
+            results = self.view_write_executor.map(record_view_count, post_ids_to_record)
+            is_first_views = dict(zip(post_ids_to_record, results))
+
+        if viewed_post_ids:
             self.user_manager.dynamo.update_last_post_view_at(user_id, now=viewed_at, view_type=view_type)
+        return {post_id: is_first_views[post_id] for post_id in viewed_post_ids}
 
     def delete_recently_expired_posts(self, now=None):
         "Delete posts that expired yesterday or today"
@@ -254,8 +328,13 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         now = now or pendulum.now('utc')
         today = now.date()
 
-        # scan for expired posts
-        for post_pk in self.dynamo.generate_expired_post_pks_with_scan(today):  # excludes today
+        # scan for expired posts, excludes today
+        post_pks = self.dynamo.generate_expired_post_pks_with_scan(
+            today,
+            total_segments=self.scan_total_segments,
+            max_capacity_per_second=self.scan_max_capacity_per_second,
+        )
+        for post_pk in post_pks:
             logger.warning(f'Deleting expired post with pk ({post_pk["partitionKey"]}, {post_pk["sortKey"]})')
             post_item = self.dynamo.client.get_item(post_pk)
             self.init_post(post_item).delete()
@@ -274,15 +353,13 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
             },
         }
         search_result = self.elasticsearch_client.query_posts(query)
-        post_id_to_trending_score = {}
         sorted_post_ids = []
 
-        for hit in search_result['hits']['hits']:
-            source = hit.get('_source')
-            if source is not None:
-                post_id = source['postId']
-                trending_score = self.get_post(source['postId']).trending_score
-                post_id_to_trending_score[post_id] = trending_score
+        hits = search_result['hits']['hits']
+        post_ids = [hit['_source']['postId'] for hit in hits if hit.get('_source') is not None]
+        # posts that have dropped out of trending sort last
+        trending_scores = self.trending_dynamo.batch_get_scores(post_ids)
+        post_id_to_trending_score = {post_id: trending_scores.get(post_id, 0) for post_id in post_ids}
 
         if post_id_to_trending_score:
             # sort post ids by trending weight
@@ -495,8 +572,8 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         for k in keywords:
             self.elasticsearch_client.put_keyword(post_id, k)
 
-    def get_royalty_paid_and_posts_viewed_past_30_days(self, user_id):
-        now = pendulum.now('utc')
+    def get_royalty_paid_and_posts_viewed_past_30_days(self, user_id, now=None):
+        now = now or pendulum.now('utc')
         royalty_paid = Decimal('0')
         posts_viewed_count = 0
 
@@ -509,6 +586,24 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
 
         return [royalty_paid, posts_viewed_count]
 
+    def get_royalty_stats_past_30_days(self, user_id, now=None):
+        """
+        Returns [royalty paid, posts viewed, real paid] by the user over the past 30 days. Whole days are read
+        from the user's daily royalty stats, only the partial first day is summed from the underlying items.
+        """
+        now = now or pendulum.now('utc')
+        since = now - pendulum.duration(days=30)
+        date_strs = [(since + pendulum.duration(days=days)).to_date_string() for days in range(1, 31)]
+        stats_dynamo = self.user_manager.royalty_stats_dynamo
+        royalty_paid, posts_viewed, real_paid = stats_dynamo.get_totals(user_id, date_strs)
+        for post_view_item in self.view_dynamo.generate_views_by_user_rest_of_day(user_id, since):
+            royalty_paid += post_view_item.get('royaltyFee', Decimal('0'))
+            posts_viewed += post_view_item.get('viewCount', 0)
+        sub_dynamo = self.appstore_manager.sub_dynamo
+        for transaction_item in sub_dynamo.generate_transactions_by_user_rest_of_day(user_id, since):
+            real_paid += transaction_item.get('price', Decimal('0'))
+        return [royalty_paid, posts_viewed, real_paid]
+
     def on_post_view_calculate_royalty_fee(self, post_id, new_item):
         # only COMPLETED posts should run royalty payout alg
         post = self.get_post(post_id)
@@ -544,8 +639,8 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         (
             royalty_paid_past_30_days,
             posts_viewed_past_30_days,
-        ) = self.get_royalty_paid_and_posts_viewed_past_30_days(user_id)
-        paid_real_past_30_days = self.appstore_manager.get_paid_real_past_30_days(user_id)
+            paid_real_past_30_days,
+        ) = self.get_royalty_stats_past_30_days(user_id)
 
         if royalty_paid_past_30_days < paid_real_past_30_days:
             fees = self.app_store_fee_percent + self.real_fee_percent
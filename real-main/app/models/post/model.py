@@ -1,6 +1,7 @@
 import base64
 import io
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import colorthief
 import pendulum
@@ -250,15 +251,21 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         return resp
 
     def build_image_thumbnails(self):
-        image = self.native_jpeg_cache.readonly_image.copy()
-        # ordered by decreasing size
-        for cache in (self.k4_jpeg_cache, self.p1080_jpeg_cache, self.p480_jpeg_cache, self.p64_jpeg_cache):
-            try:
-                image.thumbnail(cache.image_size.max_dimensions, resample=PIL.Image.LANCZOS)
-            except Exception as err:
-                raise PostException(f'Unable to thumbnail image as jpeg for post `{self.id}`: {err}') from err
-            cache.set_image(image)
-            cache.flush()
+        # if the native jpeg hasn't been decoded yet, decode it only at the resolution of the largest thumbnail
+        image = self.native_jpeg_cache.get_proxy_image(image_size.K4.max_dimensions)
+        # each thumbnail is encoded & uploaded in the background while the next smaller one is built
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = []
+            # ordered by decreasing size
+            for cache in (self.k4_jpeg_cache, self.p1080_jpeg_cache, self.p480_jpeg_cache, self.p64_jpeg_cache):
+                try:
+                    image.thumbnail(cache.image_size.max_dimensions, resample=PIL.Image.LANCZOS)
+                except Exception as err:
+                    raise PostException(f'Unable to thumbnail image as jpeg for post `{self.id}`: {err}') from err
+                cache.set_image(image)
+                futures.append(executor.submit(cache.flush))
+            for future in futures:
+                future.result()
 
     def process_image_upload(self, image_data=None, now=None):
         assert self.type == PostType.IMAGE, 'Can only process_image_upload() for IMAGE posts'
@@ -295,10 +302,14 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
             self.native_heic_cache.clear()
             self.native_heic_cache.flush(include_deletes=True)
 
-        self.build_image_thumbnails()
-        self.set_height_and_width()
-        self.set_colors()
-        self.set_is_verified()
+        # verification is a call to an external api that only needs the native image to be in S3.
+        # Writes to self.item are left to it until it finishes, the others only write to self.image_item
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            is_verified_future = executor.submit(self.set_is_verified)
+            self.build_image_thumbnails()
+            self.set_height_and_width()
+            self.set_colors()
+            is_verified_future.result()
         self.set_checksum()
         self.complete(now=now)
 
@@ -492,13 +503,15 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         return self
 
     def set_height_and_width(self):
-        width, height = self.native_jpeg_cache.readonly_image.size
+        width, height = self.native_jpeg_cache.get_dimensions()
         self._image_item = self.image_dynamo.set_height_and_width(self.id, height, width)
         return self
 
     def set_colors(self):
         try:
-            colors = ColorThiefFromImage(self.native_jpeg_cache.readonly_image).get_palette(color_count=5)
+            # the palette of a downscaled proxy is near identical to that of the full image, and far faster
+            proxy_image = self.native_jpeg_cache.get_proxy_image(image_size.P480.max_dimensions)
+            colors = ColorThiefFromImage(proxy_image).get_palette(color_count=5)
         except Exception as err:
             logger.warning(f'ColorTheif failed to get palette with error `{err}` for post `{self.id}`')
         else:
@@ -506,8 +519,12 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         return self
 
     def set_checksum(self):
-        path = self.get_image_path(image_size.NATIVE)
-        checksum = self.s3_uploads_client.get_object_checksum(path)
+        # the md5 of the data we last read or wrote is the same as the ETag S3 would give us
+        native_jpeg_cache = getattr(self, 'native_jpeg_cache', None)
+        checksum = native_jpeg_cache.checksum if native_jpeg_cache else None
+        if not checksum:
+            path = self.get_image_path(image_size.NATIVE)
+            checksum = self.s3_uploads_client.get_object_checksum(path)
         self.item = self.dynamo.set_checksum(self.id, self.item['postedAt'], checksum)
         return self
 
@@ -616,20 +633,21 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
 
         return super().flag(user)
 
-    def record_view_count(self, user_id, view_count, viewed_at=None, view_type=None):
+    def record_view_count(self, user_id, view_count, viewed_at=None, view_type=None, first_viewed_at=None):
         if self.status != PostStatus.COMPLETED:
             logger.warning(f'Cannot record views by user `{user_id}` on non-COMPLETED post `{self.id}`')
             return False
 
         # record user's view of their own post, but don't increment any counters about it
         # their view will be filtered out when looking at Post.viewedBy
-        super().record_view_count(user_id, view_count, viewed_at=viewed_at, view_type=view_type)
+        kwargs = {'viewed_at': viewed_at, 'view_type': view_type, 'first_viewed_at': first_viewed_at}
+        super().record_view_count(user_id, view_count, **kwargs)
 
         # If this is a non-original post, count this like a view of the original post as well
         if self.original_post_id != self.id:
             original_post = self.post_manager.get_post(self.original_post_id)
             if original_post:
-                original_post.record_view_count(user_id, view_count, viewed_at=viewed_at, view_type=view_type)
+                original_post.record_view_count(user_id, view_count, **kwargs)
 
         return True
 
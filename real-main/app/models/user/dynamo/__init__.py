@@ -1,7 +1,9 @@
 __all__ = [
     'UserDynamo',
     'UserContactAttributeDynamo',
+    'UserRoyaltyStatsDynamo',
 ]
 
 from .base import UserDynamo
 from .contact_attribute import UserContactAttributeDynamo
+from .royalty_stats import UserRoyaltyStatsDynamo
@@ -25,7 +25,7 @@ class UserDynamo:
         return pk['partitionKey'].split('/')[1]
 
     def get_user(self, user_id, strongly_consistent=False):
-        return self.client.get_item(self.pk(user_id), ConsistentRead=strongly_consistent)
+        return self.client.get_item(self.pk(user_id), ConsistentRead=strongly_consistent, cached=True)
 
     def get_user_by_username(self, username):
         query_kwargs = {
@@ -418,91 +418,91 @@ class UserDynamo:
         return self.client.update_item(query_kwargs, failure_warning=failure_warning)
 
     def increment_album_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'albumCount')
+        return self.client.increment_count(self.pk(user_id), 'albumCount', buffered=True)
 
     def decrement_album_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'albumCount')
+        return self.client.decrement_count(self.pk(user_id), 'albumCount', buffered=True)
 
     def increment_card_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'cardCount')
+        return self.client.increment_count(self.pk(user_id), 'cardCount', buffered=True)
 
     def decrement_card_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'cardCount')
+        return self.client.decrement_count(self.pk(user_id), 'cardCount', buffered=True)
 
     def increment_chat_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'chatCount')
+        return self.client.increment_count(self.pk(user_id), 'chatCount', buffered=True)
 
     def decrement_chat_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'chatCount')
+        return self.client.decrement_count(self.pk(user_id), 'chatCount', buffered=True)
 
     def increment_chat_messages_creation_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'chatMessagesCreationCount')
+        return self.client.increment_count(self.pk(user_id), 'chatMessagesCreationCount', buffered=True)
 
     def increment_chat_messages_deletion_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'chatMessagesDeletionCount')
+        return self.client.increment_count(self.pk(user_id), 'chatMessagesDeletionCount', buffered=True)
 
     def increment_chat_messages_forced_deletion_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'chatMessagesForcedDeletionCount')
+        return self.client.increment_count(self.pk(user_id), 'chatMessagesForcedDeletionCount', buffered=True)
 
     def increment_chats_with_unviewed_messages_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'chatsWithUnviewedMessagesCount')
+        return self.client.increment_count(self.pk(user_id), 'chatsWithUnviewedMessagesCount', buffered=True)
 
     def decrement_chats_with_unviewed_messages_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'chatsWithUnviewedMessagesCount')
+        return self.client.decrement_count(self.pk(user_id), 'chatsWithUnviewedMessagesCount', buffered=True)
 
     def increment_comment_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'commentCount')
+        return self.client.increment_count(self.pk(user_id), 'commentCount', buffered=True)
 
     def decrement_comment_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'commentCount')
+        return self.client.decrement_count(self.pk(user_id), 'commentCount', buffered=True)
 
     def increment_comment_deleted_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'commentDeletedCount')
+        return self.client.increment_count(self.pk(user_id), 'commentDeletedCount', buffered=True)
 
     def increment_comment_forced_deletion_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'commentForcedDeletionCount')
+        return self.client.increment_count(self.pk(user_id), 'commentForcedDeletionCount', buffered=True)
 
     def increment_followed_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'followedCount')
+        return self.client.increment_count(self.pk(user_id), 'followedCount', buffered=True)
 
     def decrement_followed_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'followedCount')
+        return self.client.decrement_count(self.pk(user_id), 'followedCount', buffered=True)
 
     def increment_follower_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'followerCount')
+        return self.client.increment_count(self.pk(user_id), 'followerCount', buffered=True, sharded=True)
 
     def decrement_follower_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'followerCount')
+        return self.client.decrement_count(self.pk(user_id), 'followerCount', buffered=True, sharded=True)
 
     def increment_followers_requested_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'followersRequestedCount')
+        return self.client.increment_count(self.pk(user_id), 'followersRequestedCount', buffered=True)
 
     def decrement_followers_requested_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'followersRequestedCount')
+        return self.client.decrement_count(self.pk(user_id), 'followersRequestedCount', buffered=True)
 
     def increment_post_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'postCount')
+        return self.client.increment_count(self.pk(user_id), 'postCount', buffered=True)
 
     def decrement_post_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'postCount')
+        return self.client.decrement_count(self.pk(user_id), 'postCount', buffered=True)
 
     def increment_post_archived_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'postArchivedCount')
+        return self.client.increment_count(self.pk(user_id), 'postArchivedCount', buffered=True)
 
     def decrement_post_archived_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'postArchivedCount')
+        return self.client.decrement_count(self.pk(user_id), 'postArchivedCount', buffered=True)
 
     def increment_post_deleted_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'postDeletedCount')
+        return self.client.increment_count(self.pk(user_id), 'postDeletedCount', buffered=True)
 
     def increment_post_forced_archiving_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'postForcedArchivingCount')
+        return self.client.increment_count(self.pk(user_id), 'postForcedArchivingCount', buffered=True)
 
     def increment_post_viewed_by_count(self, user_id):
-        return self.client.increment_count(self.pk(user_id), 'postViewedByCount')
+        return self.client.increment_count(self.pk(user_id), 'postViewedByCount', buffered=True, sharded=True)
 
     def decrement_post_viewed_by_count(self, user_id):
-        return self.client.decrement_count(self.pk(user_id), 'postViewedByCount')
+        return self.client.decrement_count(self.pk(user_id), 'postViewedByCount', buffered=True, sharded=True)
 
     def increment_paid_real_so_far(self, user_id, price):
         assert isinstance(price, Decimal), 'Price should be Decimal type'
@@ -0,0 +1,55 @@
+import logging
+from decimal import Decimal
+
+logger = logging.getLogger()
+
+
+class UserRoyaltyStatsDynamo:
+    "Running daily (utc) totals, per user, of what goes into calculating the royalty fees they pay"
+
+    schema_version = 0
+
+    def __init__(self, dynamo_client):
+        self.client = dynamo_client
+
+    def key(self, user_id, date_str):
+        return {'partitionKey': f'user/{user_id}', 'sortKey': f'royaltyStats/{date_str}'}
+
+    def add_to_stats(self, user_id, date_str, royalty_paid=0, posts_viewed=0, real_paid=0):
+        "Add to the totals for the day, creating the item if it doesn't already exist"
+        deltas = {'royaltyPaid': royalty_paid, 'postsViewed': posts_viewed, 'realPaid': real_paid}
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            return None
+        key = self.key(user_id, date_str)
+        add_exp = ', '.join(f'{name} :{name}' for name in deltas)
+        query_kwargs = {
+            'Key': key,
+            'UpdateExpression': f'SET schemaVersion = if_not_exists(schemaVersion, :sv) ADD {add_exp}',
+            'ExpressionAttributeValues': {
+                ':sv': self.schema_version,
+                **{f':{name}': delta for name, delta in deltas.items()},
+            },
+            'ReturnValues': 'ALL_NEW',
+        }
+        item = self.client.table.update_item(**query_kwargs).get('Attributes')
+        self.client.refresh_cached_item(key, item)
+        return item
+
+    def get_totals(self, user_id, date_strs):
+        "Returns the [royalty paid, posts viewed, real paid] totals summed over the given days"
+        keys = [self.key(user_id, date_str) for date_str in date_strs]
+        royalty_paid, posts_viewed, real_paid = Decimal('0'), 0, Decimal('0')
+        for item in self.client.batch_get_untyped_items(keys):
+            royalty_paid += item.get('royaltyPaid', Decimal('0'))
+            posts_viewed += item.get('postsViewed', 0)
+            real_paid += item.get('realPaid', Decimal('0'))
+        return [royalty_paid, posts_viewed, real_paid]
+
+    def generate_keys_by_user(self, user_id):
+        query_kwargs = {
+            'KeyConditionExpression': 'partitionKey = :pk AND begins_with(sortKey, :sk_prefix)',
+            'ExpressionAttributeValues': {':pk': f'user/{user_id}', ':sk_prefix': 'royaltyStats/'},
+            'ProjectionExpression': 'partitionKey, sortKey',
+        }
+        return self.client.generate_all_query(query_kwargs)
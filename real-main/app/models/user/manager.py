@@ -18,7 +18,7 @@ from app.models.follower.enums import FollowStatus
 from app.models.post.enums import PostStatus
 from app.utils import GqlNotificationType
 
-from .dynamo import UserContactAttributeDynamo, UserDynamo
+from .dynamo import UserContactAttributeDynamo, UserDynamo, UserRoyaltyStatsDynamo
 from .enums import UserDatingStatus, UserStatus, UserSubscriptionLevel
 from .exceptions import UserAlreadyExists, UserException, UserValidationException
 from .model import User
@@ -71,6 +71,7 @@ class UserManager(TrendingManagerMixin, ManagerBase):
             self.dynamo = UserDynamo(clients['dynamo'])
             self.email_dynamo = UserContactAttributeDynamo(clients['dynamo'], 'userEmail')
             self.phone_number_dynamo = UserContactAttributeDynamo(clients['dynamo'], 'userPhoneNumber')
+            self.royalty_stats_dynamo = UserRoyaltyStatsDynamo(clients['dynamo'])
         self.placeholder_photos_directory = placeholder_photos_directory
         self.amplitude_client = AmplitudeClient()
         self.ses_client = SesClient()
@@ -330,6 +331,8 @@ class UserManager(TrendingManagerMixin, ManagerBase):
     def on_user_delete(self, user_id, old_item):
         "Delete various user-related objects/items"
         self.dynamo.add_user_deleted(user_id)
+        key_generator = self.royalty_stats_dynamo.generate_keys_by_user(user_id)
+        self.royalty_stats_dynamo.client.batch_delete_items(key_generator)
         self.elasticsearch_client.delete_user(user_id)
         self.pinpoint_client.delete_user_endpoints(user_id)
         self.real_dating_client.remove_user(user_id, fail_soft=True)
@@ -574,6 +577,24 @@ class UserManager(TrendingManagerMixin, ManagerBase):
             price = new_item.get('price', Decimal('0'))
             self.dynamo.increment_paid_real_so_far(new_item['userId'], price)
 
+    def on_appstore_transaction_add_sync_royalty_stats(self, transaction_id, new_item):
+        self.royalty_stats_dynamo.add_to_stats(
+            new_item['userId'], new_item['gsiA1SortKey'][:10], real_paid=new_item.get('price', Decimal('0'))
+        )
+
+    def on_post_view_change_sync_royalty_stats(self, post_id, new_item=None, old_item=None):
+        view_item = new_item or old_item
+        user_id = view_item['sortKey'].split('/')[1]
+        if not new_item and not self.dynamo.get_user(user_id):
+            # the view was deleted along with the user, and so were their royalty stats
+            return
+        # views are counted on the day they were first viewed, same as GSI-A2
+        royalty_paid = (new_item or {}).get('royaltyFee', 0) - (old_item or {}).get('royaltyFee', 0)
+        posts_viewed = (new_item or {}).get('viewCount', 0) - (old_item or {}).get('viewCount', 0)
+        self.royalty_stats_dynamo.add_to_stats(
+            user_id, view_item['gsiA2SortKey'][:10], royalty_paid=royalty_paid, posts_viewed=posts_viewed
+        )
+
     def on_user_change_log_amplitude_event(self, user_id, new_item, old_item=None):
         self.amplitude_client.send_event(user_id, new_item, old_item)
 
@@ -0,0 +1,100 @@
+import json
+from unittest.mock import patch
+
+import gql
+import pytest
+
+from app.clients import AppSyncClient
+from app.clients.appsync import GqlMutation
+
+url = 'https://real.appsync-api.amazonaws.com/graphql'
+
+
+@pytest.fixture
+def appsync_client(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
+    yield AppSyncClient(appsync_graphql_url=url)
+
+
+def test_gql_mutation():
+    mutation = GqlMutation('triggerThing', 'ThingInput', '\n  userId\n  thing {\n    thingId\n  }\n')
+    assert mutation.selection == 'userId thing { thingId }'
+    assert str(mutation) == (
+        'mutation Trigger ($input0: ThingInput!) { m0: triggerThing (input: $input0) { userId thing { thingId } } }'
+    )
+    # is valid graphql
+    gql.gql(str(mutation))
+
+
+def test_fire_notification(appsync_client, requests_mock):
+    requests_mock.post(url, json={'data': {'m0': {'userId': 'uid', 'type': 'T', 'a': 'b'}}})
+    appsync_client.fire_notification('uid', 'T', a='b')
+    appsync_client.fire_notification('uid2', 'T')
+
+    assert len(requests_mock.request_history) == 2
+    req = requests_mock.request_history[0]
+    assert req.json()['variables'] == {'input0': {'userId': 'uid', 'type': 'T', 'a': 'b'}}
+    assert 'triggerNotification (input: $input0) { userId type a }' in req.json()['query']
+    assert req.headers['Authorization'].startswith('AWS4-HMAC-SHA256 Credential=foo/')
+    assert requests_mock.request_history[1].json()['variables'] == {'input0': {'userId': 'uid2', 'type': 'T'}}
+
+
+def test_send_errors(appsync_client, requests_mock):
+    query = gql.gql('mutation M { m }')
+    requests_mock.post(url, json={'data': None, 'errors': [{'message': 'nope'}]})
+    with pytest.raises(Exception, match='nope'):
+        appsync_client.send(query, {})
+    with pytest.raises(Exception, match='nope'):
+        appsync_client.fire_notification('uid', 'T')
+
+    requests_mock.post(url, status_code=403, text='forbidden')
+    with pytest.raises(Exception, match='403'):
+        appsync_client.send(query, {})
+
+
+def test_buffer_mutations(appsync_client, requests_mock):
+    appsync_client.mutation_batch_size = 3
+    requests_mock.post(url, json={'data': {}})
+    with appsync_client.buffer_mutations():
+        appsync_client.fire_notification('uid1', 'FEED')
+        appsync_client.fire_notification('uid2', 'FEED')
+        appsync_client.fire_notification('uid1', 'COUNT', count=1)
+        appsync_client.fire_notification('uid1', 'FEED')
+        appsync_client.fire_notification('uid1', 'COUNT', count=2)
+        appsync_client.fire_notification('uid3', 'FEED')
+        assert len(requests_mock.request_history) == 0
+
+    # duplicates dropped keeping the last occurrence, each user's notifications kept together & in order
+    assert len(requests_mock.request_history) == 3
+    reqs = sorted(
+        (req.json() for req in requests_mock.request_history),
+        key=lambda r: (-len(r['variables']), r['variables']['input0']['userId']),
+    )
+    assert reqs[0]['variables'] == {
+        'input0': {'userId': 'uid1', 'type': 'COUNT', 'count': 1},
+        'input1': {'userId': 'uid1', 'type': 'FEED'},
+        'input2': {'userId': 'uid1', 'type': 'COUNT', 'count': 2},
+    }
+    assert 'm2: triggerNotification (input: $input2) { userId type count }' in reqs[0]['query']
+    assert reqs[1]['variables'] == {'input0': {'userId': 'uid2', 'type': 'FEED'}}
+    assert reqs[2]['variables'] == {'input0': {'userId': 'uid3', 'type': 'FEED'}}
+
+    # no longer buffering
+    appsync_client.fire_notification('uid1', 'FEED')
+    assert len(requests_mock.request_history) == 4
+
+
+def test_buffer_mutations_failure_logged(appsync_client, requests_mock, caplog):
+    requests_mock.post(url, json={'data': None, 'errors': [{'message': 'nope'}]})
+    with appsync_client.buffer_mutations():
+        appsync_client.fire_notification('uid1', 'FEED')
+    assert len(requests_mock.request_history) == 1
+    assert 'nope' in caplog.text
+
+    # parsed documents are not batched
+    with patch.object(appsync_client, 'execute') as execute_mock:
+        with appsync_client.buffer_mutations():
+            appsync_client.send(gql.gql('mutation M { m }'), {})
+            assert len(execute_mock.mock_calls) == 1
+    assert json.dumps(execute_mock.call_args.args[1]) == '{}'
@@ -0,0 +1,119 @@
+import json
+from unittest.mock import patch
+
+import moto
+import pytest
+
+from app.clients import BadWordsClient, S3Client
+from app.clients.bad_words import BadWordsMatcher
+
+
+@pytest.fixture
+def s3_client():
+    with moto.mock_s3():
+        yield S3Client('bad-words-bucket', create_bucket=True)
+
+
+@pytest.fixture
+def bad_words_client(s3_client):
+    s3_client.bucket.put_object(Key='bad_words.json', Body=json.dumps({'uh': 1, 'no no': 1}).encode())
+    BadWordsClient.matchers.clear()
+    yield BadWordsClient(bucket_name=s3_client.bucket_name)
+    BadWordsClient.matchers.clear()
+
+
+@pytest.mark.parametrize(
+    'text, detected',
+    [
+        ['', False],
+        ['all good', False],
+        ['uh', True],
+        ['well, UH', True],
+        ['uh!', True],
+        ['(uh)', True],
+        ['huh', False],
+        ['uhh', False],
+        ['no', False],
+        ['no no', True],
+        ['oh no   no.', True],
+        ['no-no', True],
+        ['no noo', False],
+        ['no nono no no', True],
+        ['a$$', True],
+        ['a$$!', True],
+        ['a$', False],
+        ['bad a$$hole', False],
+        ['well then', True],
+        ['wellthen', False],
+    ],
+)
+def test_matcher(text, detected):
+    matcher = BadWordsMatcher(['UH', 'no  no', 'a$$', 'well then', 'then well', ''])
+    assert matcher.search(text) is detected
+
+
+def test_matcher_overlapping_phrases():
+    matcher = BadWordsMatcher(['b c d', 'a b c x', 'c'])
+    assert matcher.search('a b c x') is True
+    assert matcher.search('a b d') is False
+    assert matcher.search('x a b c') is True
+
+
+def test_matcher_no_bad_words():
+    assert BadWordsMatcher([]).search('anything at all') is False
+
+
+def test_validate_bad_words_detection(bad_words_client):
+    assert bad_words_client.validate_bad_words_detection('uh, hi') is True
+    assert bad_words_client.validate_bad_words_detection('hi') is False
+
+
+def test_matcher_shared_and_cached(bad_words_client):
+    with patch.object(BadWordsClient, 'load_matcher', wraps=bad_words_client.load_matcher) as load_mock:
+        matcher = bad_words_client.get_matcher()
+        assert BadWordsClient(bucket_name=bad_words_client.bucket_name).get_matcher() is matcher
+        assert bad_words_client.get_matcher() is matcher
+    assert len(load_mock.mock_calls) == 1
+
+
+def test_matcher_revalidated_by_etag(bad_words_client, s3_client):
+    bad_words_client.matcher_ttl_seconds = 0
+    matcher = bad_words_client.get_matcher()
+
+    # file unchanged, same matcher
+    assert bad_words_client.get_matcher() is matcher
+
+    # file changed, new matcher
+    s3_client.bucket.put_object(Key='bad_words.json', Body=json.dumps({'oops': 1}).encode())
+    new_matcher = bad_words_client.get_matcher()
+    assert new_matcher is not matcher
+    assert new_matcher.search('oops') is True
+    assert new_matcher.search('uh') is False
+
+
+def test_matcher_revalidate_immediately(bad_words_client, s3_client):
+    matcher = bad_words_client.get_matcher()
+    assert matcher.etag
+    s3_client.bucket.put_object(Key='bad_words.json', Body=json.dumps({'oops': 1}).encode())
+
+    # within the ttl, so the cached matcher is used unless revalidation is forced
+    assert bad_words_client.get_matcher() is matcher
+    new_matcher = bad_words_client.get_matcher(revalidate=True)
+    assert new_matcher is not matcher
+    assert new_matcher.etag != matcher.etag
+    assert new_matcher.search('oops') is True
+
+
+def test_matcher_stale_on_revalidation_failure(bad_words_client, caplog):
+    bad_words_client.matcher_ttl_seconds = 0
+    matcher = bad_words_client.get_matcher()
+    with patch.object(BadWordsClient, 'load_matcher', side_effect=Exception('s3 down')):
+        assert bad_words_client.get_matcher() is matcher
+    assert 's3 down' in caplog.text
+
+
+def test_matcher_load_failure(s3_client):
+    BadWordsClient.matchers.clear()
+    bad_words_client = BadWordsClient(bucket_name=s3_client.bucket_name)
+    with pytest.raises(s3_client.exceptions.NoSuchKey):
+        bad_words_client.validate_bad_words_detection('uh')
@@ -1,4 +1,7 @@
 import urllib
+from unittest.mock import patch
+
+import pendulum
 
 from app.clients import CloudFrontClient
 
@@ -64,3 +67,39 @@ def test_generate_presigned_url():
     parsed_qs = urllib.parse.parse_qs(parsed.query)
     assert set(parsed_qs.keys()) == set(['Method', 'Expires', 'Key-Pair-Id', 'Signature'])
     assert set(parsed_qs['Method']) == set(methods)
+
+
+def test_generate_presigned_url_default_expiry_rounded_to_window():
+    client = CloudFrontClient(get_key_pair, domain='d.cloudfront.net')
+    now = pendulum.now('utc')
+    parsed_qs = urllib.parse.parse_qs(urllib.parse.urlparse(client.generate_presigned_url('p', ['GET'])).query)
+    expires = int(parsed_qs['Expires'][0])
+    assert expires % client.expiry_window.in_seconds() == 0
+    assert (now + client.lifetime).int_timestamp <= expires
+    assert expires <= (now + client.lifetime + client.expiry_window).int_timestamp
+
+
+def test_generate_presigned_url_signatures_cached():
+    client = CloudFrontClient(get_key_pair, domain='d.cloudfront.net')
+    with patch.object(client, 'get_cloudfront_signer', wraps=client.get_cloudfront_signer) as signer_mock:
+        url1 = client.generate_presigned_url('p1', ['GET', 'HEAD'])
+        assert client.generate_presigned_url('p1', ['GET', 'HEAD']) == url1
+        assert len(signer_mock.mock_calls) == 1
+
+        # different path, methods or expiry are signed anew
+        assert client.generate_presigned_url('p2', ['GET', 'HEAD']) != url1
+        assert client.generate_presigned_url('p1', ['GET']) != url1
+        expires_at = pendulum.now('utc') + pendulum.duration(hours=1)
+        assert client.generate_presigned_url('p1', ['GET', 'HEAD'], expires_at=expires_at) != url1
+        assert len(signer_mock.mock_calls) == 4
+
+
+def test_signature_cache_is_bounded():
+    client = CloudFrontClient(get_key_pair, domain='d.cloudfront.net')
+    client.signature_cache_size = 2
+    url1 = client.generate_presigned_url('p1', ['GET'])
+    client.generate_presigned_url('p2', ['GET'])
+    assert client.generate_presigned_url('p1', ['GET']) == url1  # p1 is now most recently used
+    client.generate_presigned_url('p3', ['GET'])
+    assert [key[0] for key in client.signature_cache] == ['p1', 'p3']
+
@@ -0,0 +1,549 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import call, patch
+
+import pendulum
+import pytest
+
+from app.clients.dynamo import ScanRateLimiter
+
+pk = {'partitionKey': 'item/id', 'sortKey': '-'}
+
+
+@pytest.fixture
+def item(dynamo_client):
+    yield dynamo_client.add_item({'Item': {**pk, 'cnt': 2}})
+
+
+def test_buffered_counts_not_buffered_outside_context(dynamo_client, item):
+    assert dynamo_client.buffer_count(pk, 'cnt', 1) is False
+    assert dynamo_client.increment_count(pk, 'cnt', buffered=True)['cnt'] == 3
+    assert dynamo_client.decrement_count(pk, 'cnt', buffered=True)['cnt'] == 2
+
+
+def test_buffered_counts_coalesced_into_one_write(dynamo_client, item):
+    with patch.object(dynamo_client, 'update_item', wraps=dynamo_client.update_item) as update_item_mock:
+        with dynamo_client.buffer_counts():
+            for _ in range(5):
+                assert dynamo_client.increment_count(pk, 'cnt', buffered=True) is None
+            assert dynamo_client.decrement_count(pk, 'cnt', buffered=True) is None
+            assert dynamo_client.increment_count(pk, 'other', buffered=True) is None
+            assert dynamo_client.get_item(pk) == item
+    assert len(update_item_mock.mock_calls) == 2
+    assert dynamo_client.get_item(pk) == {**pk, 'cnt': 6, 'other': 1}
+
+
+def test_buffered_counts_unbuffered_calls_not_deferred(dynamo_client, item):
+    with dynamo_client.buffer_counts():
+        assert dynamo_client.increment_count(pk, 'cnt')['cnt'] == 3
+        assert dynamo_client.decrement_count(pk, 'cnt')['cnt'] == 2
+
+
+def test_buffered_counts_net_zero_not_written(dynamo_client, item):
+    with patch.object(dynamo_client, 'update_item') as update_item_mock:
+        with dynamo_client.buffer_counts():
+            dynamo_client.increment_count(pk, 'cnt', buffered=True)
+            dynamo_client.decrement_count(pk, 'cnt', buffered=True)
+    assert update_item_mock.mock_calls == []
+
+
+def test_buffered_counts_floor_at_zero(dynamo_client, item, caplog):
+    # counter has value 2, three decrements in a row would take it negative
+    with dynamo_client.buffer_counts():
+        for _ in range(3):
+            dynamo_client.decrement_count(pk, 'cnt', buffered=True)
+        dynamo_client.increment_count(pk, 'cnt', buffered=True)
+    # same result as applying them one at a time unbuffered
+    assert dynamo_client.get_item(pk)['cnt'] == 1
+    assert len(caplog.records) == 1
+    assert caplog.records[0].levelname == 'WARNING'
+    assert 'Failed to add -1 to cnt' in caplog.records[0].msg
+
+
+def test_buffered_counts_floor_applies_to_running_total(dynamo_client, item, caplog):
+    # net change is zero, but the running total dips below zero
+    with dynamo_client.buffer_counts():
+        for _ in range(3):
+            dynamo_client.decrement_count(pk, 'cnt', buffered=True)
+        for _ in range(3):
+            dynamo_client.increment_count(pk, 'cnt', buffered=True)
+    assert dynamo_client.get_item(pk)['cnt'] == 3
+    assert len(caplog.records) == 1
+
+    # net change is zero, running total stays non-negative
+    caplog.clear()
+    with dynamo_client.buffer_counts():
+        for _ in range(3):
+            dynamo_client.decrement_count(pk, 'cnt', buffered=True)
+        for _ in range(3):
+            dynamo_client.increment_count(pk, 'cnt', buffered=True)
+    assert dynamo_client.get_item(pk)['cnt'] == 3
+    assert len(caplog.records) == 0
+
+
+def test_buffered_counts_item_does_not_exist(dynamo_client, caplog):
+    with caplog.at_level(logging.WARNING):
+        with dynamo_client.buffer_counts():
+            dynamo_client.increment_count(pk, 'cnt', buffered=True)
+            dynamo_client.increment_count(pk, 'cnt', buffered=True)
+    assert dynamo_client.get_item(pk) is None
+    assert len(caplog.records) == 2
+    assert all(rec.levelname == 'WARNING' for rec in caplog.records)
+
+
+def test_buffered_counts_with_attributes_to_set(dynamo_client, item):
+    with dynamo_client.buffer_counts():
+        assert dynamo_client.buffer_count(pk, 'cnt', 1, lastAt='a') is True
+        assert dynamo_client.buffer_count(pk, 'cnt', 1, lastAt='b') is True
+    assert dynamo_client.get_item(pk) == {**pk, 'cnt': 4, 'lastAt': 'b'}
+
+
+def test_buffered_counts_cannot_nest(dynamo_client):
+    with dynamo_client.buffer_counts():
+        with pytest.raises(AssertionError):
+            with dynamo_client.buffer_counts():
+                pass
+
+
+def test_buffered_counts_discard_sources(dynamo_client, item):
+    with dynamo_client.buffer_counts() as count_buffer:
+        with dynamo_client.count_changes_source('1'):
+            dynamo_client.increment_count(pk, 'cnt', buffered=True)
+            dynamo_client.increment_count(pk, 'other', buffered=True)
+        with dynamo_client.count_changes_source('2'):
+            dynamo_client.increment_count(pk, 'cnt', buffered=True)
+        dynamo_client.increment_count(pk, 'cnt', buffered=True)
+        count_buffer.discard_sources(['1'])
+    assert dynamo_client.get_item(pk) == {**pk, 'cnt': 4}
+    assert count_buffer.failed_sources == set()
+
+
+def test_buffered_counts_failed_sources(dynamo_client, item, caplog):
+    apply_count_changes = dynamo_client.apply_count_changes
+
+    def fail_on_other(key, attribute_name, changes):
+        if attribute_name == 'other':
+            raise Exception('throttled')
+        return apply_count_changes(key, attribute_name, changes)
+
+    with patch.object(dynamo_client, 'apply_count_changes', side_effect=fail_on_other):
+        with dynamo_client.buffer_counts() as count_buffer:
+            with dynamo_client.count_changes_source('1'):
+                dynamo_client.increment_count(pk, 'cnt', buffered=True)
+            with dynamo_client.count_changes_source('2'):
+                dynamo_client.increment_count(pk, 'other', buffered=True)
+            with dynamo_client.count_changes_source('3'):
+                dynamo_client.increment_count(pk, 'other', buffered=True)
+            dynamo_client.increment_count(pk, 'other', buffered=True)
+    assert dynamo_client.get_item(pk) == {**pk, 'cnt': 3}
+    assert count_buffer.failed_sources == {'2', '3'}
+    assert len(caplog.records) == 1
+    assert 'Failed to apply buffered changes to other' in caplog.records[0].msg
+
+
+@pytest.fixture
+def sharded_dynamo_client(dynamo_client):
+    dynamo_client.count_shards = 4
+    yield dynamo_client
+
+
+def test_sharded_counts_not_sharded_if_disabled(dynamo_client, item):
+    assert dynamo_client.count_shards == 0
+    assert dynamo_client.increment_count(pk, 'cnt', sharded=True)['cnt'] == 3
+    assert dynamo_client.decrement_count(pk, 'cnt', sharded=True)['cnt'] == 2
+    with dynamo_client.buffer_counts():
+        dynamo_client.increment_count(pk, 'cnt', buffered=True, sharded=True)
+    assert dynamo_client.get_item(pk)['cnt'] == 3
+
+
+def test_sharded_counts_written_to_shards(sharded_dynamo_client, item):
+    client = sharded_dynamo_client
+    for _ in range(5):
+        assert client.increment_count(pk, 'cnt', sharded=True) is None
+    assert client.decrement_count(pk, 'cnt', sharded=True) is None
+
+    # counted item is untouched until compaction, but exact reads include the shards
+    assert client.get_item(pk) == item
+    assert client.get_sharded_count(pk, 'cnt') == 6
+    assert client.get_sharded_count(pk, 'other') == 0
+
+    shard_keys = [client.count_shard_key(pk, shard) for shard in range(4)]
+    shards = client.batch_get_untyped_items(shard_keys)
+    assert 1 <= len(shards) <= 4
+    assert sum(shard['shardVersion'] for shard in shards) == 6
+    assert all(shard['gsiK1PartitionKey'].startswith('counterShard/') for shard in shards)
+    assert all(client.counted_key({k: shard[k] for k in ('partitionKey', 'sortKey')}) == pk for shard in shards)
+
+
+def test_sharded_counts_compacted_by_writes_once_stale(sharded_dynamo_client, item):
+    client = sharded_dynamo_client
+    client.count_shard_compact_after = pendulum.duration()
+    client.increment_count(pk, 'cnt', sharded=True)
+    client.increment_count(pk, 'other', sharded=True)
+    assert client.get_item(pk) == {**pk, 'cnt': 3, 'other': 1}
+    assert client.get_sharded_count(pk, 'cnt') == 3
+
+
+def test_sharded_counts_buffered_into_one_shard_write(sharded_dynamo_client, item):
+    client = sharded_dynamo_client
+    with patch.object(client.table, 'update_item', wraps=client.table.update_item) as update_item_mock:
+        with client.buffer_counts():
+            for _ in range(3):
+                assert client.increment_count(pk, 'cnt', buffered=True, sharded=True) is None
+            assert client.decrement_count(pk, 'cnt', buffered=True, sharded=True) is None
+    assert len(update_item_mock.mock_calls) == 1
+    assert client.get_sharded_count(pk, 'cnt') == 4
+
+
+def test_compact_stale_count_shards(sharded_dynamo_client, item):
+    client = sharded_dynamo_client
+    for _ in range(8):
+        client.increment_count(pk, 'cnt', sharded=True)
+    client.decrement_count(pk, 'other', sharded=True)
+
+    # nothing is stale yet
+    assert client.compact_stale_count_shards() == 0
+    assert client.get_item(pk) == item
+
+    # the changes pending in all the shards are folded into the counted item together
+    shard_keys = [client.count_shard_key(pk, shard) for shard in range(4)]
+    shards_cnt = len(client.batch_get_untyped_items(shard_keys))
+    later = pendulum.now('utc') + client.count_shard_compact_after + pendulum.duration(seconds=1)
+    assert client.compact_stale_count_shards(now=later) == 1
+    assert client.get_item(pk) == {**pk, 'cnt': 10, 'other': 0}
+    assert client.get_sharded_count(pk, 'cnt') == 10
+
+    # once empty shards go stale, they are deleted
+    assert len(client.batch_get_untyped_items(shard_keys)) == shards_cnt
+    assert client.compact_stale_count_shards(now=later) == 0
+    much_later = later + client.count_shard_compact_after + pendulum.duration(seconds=1)
+    assert client.compact_stale_count_shards(now=much_later) == 1
+    assert client.batch_get_untyped_items(shard_keys) == []
+    assert client.get_item(pk) == {**pk, 'cnt': 10, 'other': 0}
+
+
+def test_compact_count_shards_counted_item_does_not_exist(sharded_dynamo_client):
+    client = sharded_dynamo_client
+    client.increment_count(pk, 'cnt', sharded=True)
+    shard_keys = [client.count_shard_key(pk, shard) for shard in range(4)]
+    assert len(client.batch_get_untyped_items(shard_keys)) == 1
+
+    client.compact_count_shards(pk)
+    assert client.batch_get_untyped_items(shard_keys) == []
+    assert client.get_item(pk) is None
+
+
+def test_compact_count_shards_only_folds_in_changes_once(sharded_dynamo_client, item):
+    client = sharded_dynamo_client
+    client.increment_count(pk, 'cnt', sharded=True)
+    shard_keys = [client.count_shard_key(pk, shard) for shard in range(4)]
+    items = client.transact_get_untyped_items([pk, *shard_keys])
+
+    # a compaction that read the shards before another compaction of them completed does nothing
+    later = pendulum.now('utc') + pendulum.duration(seconds=1)
+    with patch.object(client, 'transact_get_untyped_items', return_value=items):
+        client.compact_count_shards(pk, now=later)
+        client.compact_count_shards(pk, now=later + pendulum.duration(seconds=1))
+    assert client.get_item(pk)['cnt'] == 3
+
+
+def test_compact_count_shards_folds_in_all_shards_together(sharded_dynamo_client, item):
+    client = sharded_dynamo_client
+    # a like and then an unlike, that landed in different shards
+    with patch('app.clients.dynamo.random.randrange', side_effect=[1, 3]):
+        client.increment_count(pk, 'likes', sharded=True)
+        client.decrement_count(pk, 'likes', sharded=True)
+
+    # never goes negative, the shards are emptied even though their changes cancelled out
+    with patch.object(client, 'transact_write_items', wraps=client.transact_write_items) as transact_mock:
+        client.compact_count_shards(pk)
+    assert len(transact_mock.call_args.args[0]) == 2
+    assert client.get_item(pk) == item
+    shard_keys = [client.count_shard_key(pk, shard) for shard in range(4)]
+    assert [shard['likes'] for shard in client.batch_get_untyped_items(shard_keys)] == [0, 0]
+    assert client.get_sharded_count(pk, 'likes') == 0
+
+
+def test_compact_count_shards_clamps_at_zero(sharded_dynamo_client, item):
+    client = sharded_dynamo_client
+    # replayed decrements, that would take the counter below zero
+    for _ in range(4):
+        client.decrement_count(pk, 'cnt', sharded=True)
+    client.decrement_count(pk, 'other', sharded=True)
+    client.increment_count(pk, 'another', sharded=True)
+    assert client.get_sharded_count(pk, 'cnt') == 0
+
+    client.compact_count_shards(pk)
+    assert client.get_item(pk) == {**pk, 'cnt': 0, 'other': 0, 'another': 1}
+    assert client.get_sharded_count(pk, 'cnt') == 0
+
+    # a counter changed since the shards were read is not clamped, and the compaction is left for later
+    shard_keys = [client.count_shard_key(pk, shard) for shard in range(4)]
+    client.decrement_count(pk, 'cnt', sharded=True)
+    items = client.transact_get_untyped_items([pk, *shard_keys])
+    client.increment_count(pk, 'cnt')
+    with patch.object(client, 'transact_get_untyped_items', return_value=items):
+        client.compact_count_shards(pk)
+    assert client.get_item(pk)['cnt'] == 1
+    assert client.get_sharded_count(pk, 'cnt') == 0
+
+    client.compact_count_shards(pk)
+    assert client.get_item(pk)['cnt'] == 0
+
+
+def test_transact_get_untyped_items(dynamo_client, item):
+    other_pk = {'partitionKey': 'item/other', 'sortKey': '-'}
+    assert dynamo_client.transact_get_untyped_items([]) == []
+    assert dynamo_client.transact_get_untyped_items([other_pk, pk]) == [None, item]
+
+
+def test_cached_items_not_cached_outside_context(dynamo_client, item):
+    with patch.object(dynamo_client.table, 'get_item', wraps=dynamo_client.table.get_item) as get_item_mock:
+        assert dynamo_client.get_item(pk, cached=True) == item
+        assert dynamo_client.get_item(pk, cached=True) == item
+    assert len(get_item_mock.mock_calls) == 2
+
+
+def test_cached_items_read_through(dynamo_client, item):
+    other_pk = {'partitionKey': 'item/other', 'sortKey': '-'}
+    with patch.object(dynamo_client.table, 'get_item', wraps=dynamo_client.table.get_item) as get_item_mock:
+        with dynamo_client.cache_items() as stats:
+            assert dynamo_client.get_item(pk, cached=True) == item
+            assert dynamo_client.get_item(pk, cached=True) == item
+            assert dynamo_client.get_item(other_pk, cached=True) is None
+            assert dynamo_client.get_item(other_pk, cached=True) is None
+            # uncached & strongly consistent reads go to dynamo
+            assert dynamo_client.get_item(pk) == item
+            assert dynamo_client.get_item(pk, cached=True, ConsistentRead=True) == item
+    assert len(get_item_mock.mock_calls) == 4
+    assert stats == {'hits': 2, 'misses': 3}
+
+
+def test_cached_items_are_copies(dynamo_client, item):
+    with dynamo_client.cache_items():
+        dynamo_client.get_item(pk, cached=True)['cnt'] = 42
+        assert dynamo_client.get_item(pk, cached=True) == item
+
+
+def test_cached_items_refreshed_by_writes(dynamo_client):
+    with dynamo_client.cache_items() as stats:
+        assert dynamo_client.get_item(pk, cached=True) is None
+        dynamo_client.add_item({'Item': {**pk, 'cnt': 2}})
+        assert dynamo_client.get_item(pk, cached=True) == {**pk, 'cnt': 2}
+        dynamo_client.increment_count(pk, 'cnt')
+        assert dynamo_client.get_item(pk, cached=True) == {**pk, 'cnt': 3}
+        dynamo_client.set_attributes(pk, foo='bar')
+        assert dynamo_client.get_item(pk, cached=True) == {**pk, 'cnt': 3, 'foo': 'bar'}
+        dynamo_client.delete_item(pk)
+        assert dynamo_client.get_item(pk, cached=True) is None
+        assert stats == {'hits': 4, 'misses': 1}
+
+
+def test_cached_items_invalidated_by_batch_and_transact_writes(dynamo_client, item):
+    with dynamo_client.cache_items() as stats:
+        assert dynamo_client.get_item(pk, cached=True) == item
+        dynamo_client.batch_put_items([{**pk, 'cnt': 5}])
+        assert dynamo_client.get_item(pk, cached=True) == {**pk, 'cnt': 5}
+        transact = {
+            'Update': {
+                'Key': {'partitionKey': {'S': pk['partitionKey']}, 'sortKey': {'S': pk['sortKey']}},
+                'UpdateExpression': 'SET cnt = :cnt',
+                'ExpressionAttributeValues': {':cnt': {'N': '6'}},
+            }
+        }
+        dynamo_client.transact_write_items([transact])
+        assert dynamo_client.get_item(pk, cached=True) == {**pk, 'cnt': 6}
+        dynamo_client.batch_delete_items([pk])
+        assert dynamo_client.get_item(pk, cached=True) is None
+        assert stats == {'hits': 0, 'misses': 4}
+
+
+def test_cached_items_cannot_nest(dynamo_client):
+    with dynamo_client.cache_items():
+        with pytest.raises(AssertionError):
+            with dynamo_client.cache_items():
+                pass
+
+
+def test_batch_get_untyped_items(dynamo_client):
+    keys = [{'partitionKey': f'item/{i}', 'sortKey': '-'} for i in range(150)]
+    dynamo_client.batch_put_items({**key, 'i': i} for i, key in enumerate(keys) if i % 2)
+    assert dynamo_client.batch_get_untyped_items([]) == []
+
+    # more than one batch request's worth, with duplicates & non-existent items
+    items = dynamo_client.batch_get_untyped_items(keys + keys[:10])
+    assert sorted(item['i'] for item in items) == list(range(1, 150, 2))
+    assert items[0] == dynamo_client.get_item({k: items[0][k] for k in ('partitionKey', 'sortKey')})
+
+
+def test_batch_get_untyped_items_projection(dynamo_client):
+    keys = [{'partitionKey': f'item/{i}', 'sortKey': '-'} for i in range(3)]
+    dynamo_client.batch_put_items({**key, 'i': i, 'j': -i} for i, key in enumerate(keys))
+    items = dynamo_client.batch_get_untyped_items(keys, projection_expression='partitionKey, sortKey, i')
+    assert sorted(items, key=lambda item: item['i']) == [{**key, 'i': i} for i, key in enumerate(keys)]
+    with pytest.raises(AssertionError, match='cached'):
+        dynamo_client.batch_get_untyped_items(keys, cached=True, projection_expression='partitionKey, sortKey')
+
+
+def test_batch_get_untyped_items_backs_off_unprocessed_keys(dynamo_client, item):
+    typed_pk = {'partitionKey': {'S': pk['partitionKey']}, 'sortKey': {'S': pk['sortKey']}}
+    unprocessed = {dynamo_client.table_name: {'Keys': [typed_pk]}}
+    batch_get_item = dynamo_client.boto3_client.batch_get_item
+    with patch.object(dynamo_client.boto3_client, 'batch_get_item') as batch_get_item_mock:
+        batch_get_item_mock.side_effect = [
+            {'Responses': {}, 'UnprocessedKeys': unprocessed},
+            {'Responses': {}, 'UnprocessedKeys': unprocessed},
+            batch_get_item(RequestItems=unprocessed),
+        ]
+        with patch('app.clients.dynamo.time.sleep') as sleep_mock:
+            assert dynamo_client.batch_get_untyped_items([pk]) == [item]
+    assert len(batch_get_item_mock.mock_calls) == 3
+    assert len(sleep_mock.mock_calls) == 2
+    assert all(0 <= c.args[0] <= dynamo_client.batch_retry_max_delay for c in sleep_mock.mock_calls)
+
+
+def test_batch_get_untyped_items_cached(dynamo_client, item):
+    other_pk = {'partitionKey': 'item/other', 'sortKey': '-'}
+    with dynamo_client.cache_items() as stats:
+        assert dynamo_client.get_item(pk, cached=True) == item
+        with patch.object(dynamo_client.boto3_client, 'batch_get_item') as batch_get_item_mock:
+            batch_get_item_mock.return_value = {'Responses': {}}
+            assert dynamo_client.batch_get_untyped_items([pk, other_pk], cached=True) == [item]
+        assert len(batch_get_item_mock.mock_calls) == 1
+        assert batch_get_item_mock.call_args.kwargs['RequestItems'][dynamo_client.table_name]['Keys'] == [
+            {'partitionKey': {'S': 'item/other'}, 'sortKey': {'S': '-'}}
+        ]
+        assert dynamo_client.get_item(other_pk, cached=True) is None
+        assert stats == {'hits': 2, 'misses': 2}
+
+
+@pytest.fixture
+def scan_items(dynamo_client):
+    items = [{'partitionKey': f'scan/{i}', 'sortKey': '-', 'i': i, 'pad': 'x' * 4000} for i in range(150)]
+    with dynamo_client.table.batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+    yield items
+
+
+@pytest.mark.parametrize('total_segments', [None, 1])
+def test_generate_all_scan(dynamo_client, scan_items, total_segments):
+    scan_kwargs = {
+        'FilterExpression': 'begins_with(partitionKey, :pk_prefix)',
+        'ExpressionAttributeValues': {':pk_prefix': 'scan/'},
+        'Limit': 20,
+    }
+    items = list(dynamo_client.generate_all_scan(scan_kwargs, total_segments=total_segments))
+    assert sorted(item['i'] for item in items) == list(range(150))
+
+
+def test_table_per_thread(dynamo_client, item):
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        table = executor.submit(lambda: dynamo_client.table).result()
+        assert executor.submit(lambda: dynamo_client.table).result() is table
+        assert executor.submit(dynamo_client.get_item, pk).result() == item
+    assert table is not dynamo_client.table
+    assert dynamo_client.table is dynamo_client.table
+
+    # threads other than the constructing one share a session to create their tables from
+    thread_session = dynamo_client.thread_session
+    assert thread_session is not None
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(lambda: dynamo_client.table).result() is not table
+    assert dynamo_client.thread_session is thread_session
+
+
+def test_generate_all_scan_parallel(dynamo_client, scan_items):
+    scan_kwargs = {
+        'FilterExpression': 'begins_with(partitionKey, :pk_prefix)',
+        'ExpressionAttributeValues': {':pk_prefix': 'scan/'},
+        'Limit': 20,
+    }
+    worker_tables, scan_calls = [], []
+    init_table = dynamo_client.init_table
+
+    def init_table_recording_scans():
+        table = init_table()
+        scan = table.scan
+
+        def recorded_scan(**kwargs):
+            scan_calls.append(kwargs)
+            return scan(**kwargs)
+
+        table.scan = recorded_scan
+        worker_tables.append(table)
+        return table
+
+    with patch.object(dynamo_client, 'init_table', init_table_recording_scans):
+        items = list(dynamo_client.generate_all_scan(scan_kwargs, total_segments=4))
+    assert sorted(item['i'] for item in items) == list(range(150))
+    # each worker thread scans through a table resource of its own
+    assert len(worker_tables) == 4
+    assert all(table is not dynamo_client.table for table in worker_tables)
+    # each segment pages through the table on its own
+    segments = [(kwargs['Segment'], kwargs['TotalSegments']) for kwargs in scan_calls]
+    assert sorted(set(segments)) == [(0, 4), (1, 4), (2, 4), (3, 4)]
+    assert len(segments) == 4 * 8
+
+
+def test_generate_all_scan_parallel_reuses_worker_threads(dynamo_client, scan_items):
+    with patch.object(dynamo_client, 'init_table', wraps=dynamo_client.init_table) as init_table_mock:
+        assert len(list(dynamo_client.generate_all_scan({}, total_segments=4))) == 150
+        init_table_count = len(init_table_mock.mock_calls)
+        assert 1 <= init_table_count <= 4
+
+        # a later scan runs on the same pool of threads, which already have their tables
+        assert len(list(dynamo_client.generate_all_scan({}, total_segments=4))) == 150
+        assert len(init_table_mock.mock_calls) == init_table_count
+        assert dynamo_client.scan_executor is dynamo_client.scan_executor
+
+
+def test_generate_all_scan_parallel_stops_when_closed(dynamo_client, scan_items):
+    dynamo_client.scan_queue_size = 1
+    generator = dynamo_client.generate_all_scan({'Limit': 10}, total_segments=4)
+    assert next(generator)
+    generator.close()  # workers blocked on the full queue must exit, else this hangs
+
+
+def test_generate_all_scan_parallel_raises_worker_errors(dynamo_client, scan_items):
+    scan_kwargs = {'FilterExpression': 'not a valid expression ('}
+    with pytest.raises(dynamo_client.exceptions.ClientError):
+        list(dynamo_client.generate_all_scan(scan_kwargs, total_segments=4))
+
+
+def test_generate_all_scan_rate_limited(dynamo_client, scan_items):
+    with patch('app.clients.dynamo.ScanRateLimiter') as rate_limiter_cls:
+        rate_limiter_cls.return_value.wait.return_value = None
+        items = list(dynamo_client.generate_all_scan({}, total_segments=2, max_capacity_per_second=100))
+    assert len(items) == 150
+    assert rate_limiter_cls.mock_calls[0] == call(100)
+    rate_limiter = rate_limiter_cls.return_value
+    assert len(rate_limiter.wait.mock_calls) == len(rate_limiter.consume.mock_calls) >= 2
+
+
+def test_scan_rate_limiter():
+    rate_limiter = ScanRateLimiter(capacity_per_second=10)
+    with patch('app.clients.dynamo.time') as time_mock:
+        time_mock.monotonic.return_value = 100
+        rate_limiter.available_at = 100
+        rate_limiter.wait()
+        assert time_mock.sleep.mock_calls == []
+
+        # consuming 5 units at 10 units/sec means the next request must wait half a second
+        rate_limiter.consume(5)
+        rate_limiter.wait()
+        assert time_mock.sleep.mock_calls == [call(0.5)]
+
+        # debt accumulates
+        time_mock.sleep.reset_mock()
+        rate_limiter.consume(5)
+        rate_limiter.wait()
+        assert time_mock.sleep.mock_calls == [call(1)]
+
+        # idle time is not banked for later bursts
+        time_mock.sleep.reset_mock()
+        time_mock.monotonic.return_value = 200
+        rate_limiter.consume(1)
+        time_mock.monotonic.return_value = 200.05
+        rate_limiter.wait()
+        assert time_mock.sleep.mock_calls == [call(pytest.approx(0.05))]
@@ -1,7 +1,10 @@
+import json
+
 import pytest
 import requests_mock
 
 from app.clients import ElasticSearchClient
+from app.clients.elasticsearch import ElasticSearchBulkException
 
 # the requests_mock parameter is auto-supplied, no need to even import the
 # requests-mock library # https://requests-mock.readthedocs.io/en/latest/pytest.html
@@ -85,3 +88,121 @@ def test_delete_user(elasticsearch_client, monkeypatch):
 
     assert len(m.request_history) == 1
     assert m.request_history[0].method == 'DELETE'
+
+
+def test_buffer_actions(elasticsearch_client, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
+    bulk_url = 'https://real.es.amazonaws.com/_bulk'
+    items = [{'index': {'status': 200}}, {'delete': {'status': 404}}, {'index': {'status': 201}}]
+
+    with requests_mock.mock() as m:
+        m.post(bulk_url, json={'errors': False, 'items': items})
+        with elasticsearch_client.buffer_actions():
+            elasticsearch_client.delete_keyword('pid', 'spock')
+            elasticsearch_client.put_post('pid', ['spock'])
+            elasticsearch_client.delete_user('uid')
+            elasticsearch_client.put_keyword('pid', 'spock')
+            assert len(m.request_history) == 0
+
+    # one request, with the delete of the keyword superseded by its put
+    assert len(m.request_history) == 1
+    assert m.request_history[0].headers['Content-Type'] == 'application/x-ndjson'
+    assert [json.loads(line) for line in m.request_history[0].text.splitlines()] == [
+        {'index': {'_index': 'posts', '_id': 'pid'}},
+        {'postId': 'pid', 'keywords': 'spock'},
+        {'delete': {'_index': 'users', '_id': 'uid'}},
+        {'index': {'_index': 'keywords', '_id': 'pid-spock'}},
+        {'keyword': 'spock'},
+    ]
+
+    # no longer buffering
+    with requests_mock.mock() as m:
+        m.delete(elasticsearch_client.build_user_url('uid'), None)
+        elasticsearch_client.delete_user('uid')
+    assert len(m.request_history) == 1
+
+
+def test_bulk_retries_and_errors(elasticsearch_client, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
+    elasticsearch_client.bulk_retry_delay_seconds = 0
+    bulk_url = 'https://real.es.amazonaws.com/_bulk'
+    actions = [
+        ('users', 'uid1', {'userId': 'uid1'}),
+        ('users', 'uid2', {'userId': 'uid2'}),
+        ('posts', 'pid', None),
+    ]
+    responses = [
+        {'status_code': 503, 'text': 'unavailable'},
+        {
+            'json': {
+                'errors': True,
+                'items': [
+                    {'index': {'status': 429, 'error': {'type': 'es_rejected_execution_exception'}}},
+                    {'index': {'status': 400, 'error': {'type': 'mapper_parsing_exception'}}},
+                    {'delete': {'status': 200}},
+                ],
+            }
+        },
+        {'json': {'errors': False, 'items': [{'index': {'status': 200}}]}},
+    ]
+
+    with requests_mock.mock() as m:
+        m.post(bulk_url, responses)
+        errors = elasticsearch_client.bulk(actions)
+
+    # only the document that failed transiently was retried
+    assert len(m.request_history) == 3
+    assert len(m.request_history[1].text.splitlines()) == 5
+    assert m.request_history[2].text.splitlines() == [
+        json.dumps({'index': {'_index': 'users', '_id': 'uid1'}}),
+        json.dumps({'userId': 'uid1'}),
+    ]
+    assert errors == [
+        {
+            'action': 'index',
+            'index': 'users',
+            'id': 'uid2',
+            'status': 400,
+            'error': {'type': 'mapper_parsing_exception'},
+        }
+    ]
+
+    # gives up eventually, raising rather than dropping the documents
+    elasticsearch_client.bulk_max_attempts = 2
+    with requests_mock.mock() as m:
+        m.post(bulk_url, status_code=429, text='slow down')
+        with pytest.raises(ElasticSearchBulkException) as exc_info:
+            elasticsearch_client.bulk(actions[:1])
+    assert len(m.request_history) == 2
+    assert exc_info.value.errors == [
+        {'action': 'index', 'index': 'users', 'id': 'uid1', 'status': 429, 'error': 'slow down'}
+    ]
+    assert exc_info.value.permanent_errors == []
+
+
+def test_buffer_actions_failed_sources(elasticsearch_client, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
+    elasticsearch_client.bulk_max_attempts = 2
+    elasticsearch_client.bulk_retry_delay_seconds = 0
+    bulk_url = 'https://real.es.amazonaws.com/_bulk'
+    # in order of the last action on each document: uid1, uid3, uid2
+    items = [{'index': {'status': 200}}, {'index': {'status': 400}}, {'index': {'status': 503}}]
+
+    with requests_mock.mock() as m:
+        m.post(bulk_url, [{'json': {'errors': True, 'items': items}}, {'status_code': 503, 'text': 'down'}])
+        with elasticsearch_client.buffer_actions() as action_buffer:
+            with elasticsearch_client.actions_source('1'):
+                elasticsearch_client.put_user('uid1', 'u1', None)
+            with elasticsearch_client.actions_source('2'):
+                elasticsearch_client.put_user('uid2', 'u2', None)
+            with elasticsearch_client.actions_source('3'):
+                elasticsearch_client.put_user('uid3', 'u3', None)
+            with elasticsearch_client.actions_source('4'):
+                elasticsearch_client.put_user('uid2', 'u2b', None)
+
+    # only the sources of the document that failed transiently on every attempt failed
+    assert len(m.request_history) == 2
+    assert action_buffer.failed_sources == {'2', '4'}
@@ -0,0 +1,13 @@
+import json
+
+
+def test_send_and_receive_messages(sqs_client):
+    assert sqs_client.receive_messages() == []
+
+    sqs_client.send_message({'k': 'v1'})
+    sqs_client.send_message({'k': ['v2']})
+    records = sqs_client.receive_messages()
+    assert len(records) == 2
+    assert {record['body'] for record in records} == {json.dumps({'k': 'v1'}), json.dumps({'k': ['v2']})}
+    assert all(record['messageId'] for record in records)
+    assert all(record['receiptHandle'] for record in records)
@@ -0,0 +1,47 @@
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from app.clients import transport
+
+
+def test_get_session_shared():
+    session = transport.get_session()
+    assert isinstance(session, requests.Session)
+    assert transport.get_session() is session
+
+
+def test_session_default_timeout():
+    adapter = transport.build_session(timeout=4.5).get_adapter('https://real.app/')
+    request = requests.Request('GET', 'https://real.app/').prepare()
+    with patch.object(transport.HTTPAdapter, 'send') as send_mock:
+        adapter.send(request)
+        adapter.send(request, timeout=1)
+    assert send_mock.call_args_list[0].kwargs['timeout'] == 4.5
+    assert send_mock.call_args_list[1].kwargs['timeout'] == 1
+
+
+@pytest.fixture
+def signer(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
+    yield transport.AWSRequestSigner('es')
+
+
+def test_signer_reused_until_credentials_change(signer, requests_mock):
+    requests_mock.get('https://real.es.amazonaws.com/', text='ok')
+    requests.get('https://real.es.amazonaws.com/', auth=signer)
+    assert 'Credential=foo/' in requests_mock.request_history[0].headers['Authorization']
+
+    auth = signer.get_auth()
+    assert signer.get_auth() is auth
+
+    # simulate botocore refreshing temporary credentials
+    new_credentials = signer.credentials._replace(access_key='foo2')
+    with patch.object(signer.boto3_session, 'get_credentials') as get_credentials_mock:
+        get_credentials_mock.return_value.get_frozen_credentials.return_value = new_credentials
+        new_auth = signer.get_auth()
+        requests.get('https://real.es.amazonaws.com/', auth=signer)
+    assert new_auth is not auth
+    assert 'Credential=foo2/' in requests_mock.request_history[1].headers['Authorization']
@@ -1,5 +1,6 @@
 import base64
 import uuid
+import zlib
 from os import path
 from unittest import mock
 
@@ -104,12 +105,42 @@ def cognito_client():
         yield cognito_client
 
 
+def emulate_scan_segments(dynamo_client):
+    "Our version of moto ignores Segment and TotalSegments on scans, so emulate them"
+
+    def segment_scans(table):
+        scan = table.scan
+
+        def segmented_scan(Segment=None, TotalSegments=None, **kwargs):
+            resp = scan(**kwargs)
+            if TotalSegments:
+                resp['Items'] = [
+                    item
+                    for item in resp['Items']
+                    if zlib.crc32(str(sorted(item.items())).encode()) % TotalSegments == Segment
+                ]
+            return resp
+
+        table.scan = segmented_scan
+        return table
+
+    # tables used by other threads are initialized on demand
+    init_table = dynamo_client.init_table
+    dynamo_client.init_table = lambda: segment_scans(init_table())
+    segment_scans(dynamo_client.table)
+    return dynamo_client
+
+
 @pytest.fixture
 def dynamo_clients():
     with moto.mock_dynamodb2():
         yield (
-            clients.DynamoClient(table_name='main-table', create_table_schema=main_table_schema),
-            clients.DynamoClient(table_name='feed-table', create_table_schema=feed_table_schema),
+            emulate_scan_segments(
+                clients.DynamoClient(table_name='main-table', create_table_schema=main_table_schema)
+            ),
+            emulate_scan_segments(
+                clients.DynamoClient(table_name='feed-table', create_table_schema=feed_table_schema)
+            ),
         )
 
 
@@ -184,6 +215,12 @@ def s3_placeholder_photos_client(s3_clients):
     yield s3_clients['placeholder-photos']
 
 
+@pytest.fixture
+def sqs_client():
+    with moto.mock_sqs():
+        yield clients.SqsClient(None, create_queue_name='view-events')
+
+
 @pytest.fixture
 def album_manager(dynamo_client, s3_uploads_client, cloudfront_client):
     yield models.AlbumManager(
@@ -237,6 +274,13 @@ def comment_manager(dynamo_client, user_manager, appsync_client):
     )
 
 
+@pytest.fixture
+def fan_out_manager(appsync_client, dynamo_client, dynamo_feed_client):
+    yield models.FanOutManager(
+        {'appsync': appsync_client, 'dynamo': dynamo_client, 'dynamo_feed': dynamo_feed_client}
+    )
+
+
 @pytest.fixture
 def feed_manager(appsync_client, dynamo_client, dynamo_feed_client):
     yield models.FeedManager(
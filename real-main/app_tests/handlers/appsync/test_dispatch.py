@@ -1,3 +1,4 @@
+import contextlib
 import os
 
 import pytest
@@ -5,6 +6,7 @@ import pytest
 # turning off route autodiscovery
 os.environ['APPSYNC_ROUTE_AUTODISCOVERY_PATH'] = ''
 from app.handlers.appsync import dispatch, routes  # noqa: E402 isort:skip
+from app.handlers.appsync.exceptions import ClientException  # noqa: E402 isort:skip
 
 
 @pytest.fixture
@@ -109,3 +111,24 @@ def test_context_passed(setup_one_route, api_key_authed_event):
             },
         },
     }
+
+
+def test_handler_called_within_registered_contexts(setup_one_route, api_key_authed_event):
+    calls = []
+
+    @routes.register_context
+    @contextlib.contextmanager
+    def mycontext():
+        calls.append('enter')
+        try:
+            yield
+        finally:
+            calls.append('exit')
+
+    @routes.register('Type.field')
+    def mocked_handler(caller_user_id, arguments, **kwargs):  # pylint: disable=unused-variable
+        calls.append('handler')
+        raise ClientException('nope')
+
+    assert dispatch(api_key_authed_event, {})['error']['message'] == 'ClientError: nope'
+    assert calls == ['enter', 'handler', 'exit']
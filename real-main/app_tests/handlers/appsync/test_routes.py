@@ -36,3 +36,13 @@ def test_discover():
         'Type.field1': mock_handlers.handler_1,
         'Type.field2': mock_handlers.handler_2,
     }
+
+
+def test_register_context():
+    @routes.register_context
+    def mycontext():
+        pass
+
+    assert routes.contexts == [mycontext]
+    routes.clear()
+    assert routes.contexts == []
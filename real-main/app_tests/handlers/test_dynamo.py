@@ -1,5 +1,7 @@
 from unittest.mock import Mock
 
+import pytest
+
 from app.handlers.dynamo.dispatch import DynamoDispatch
 
 
@@ -94,3 +96,46 @@ def test_dynamo_dispatch_attributes():
     assert dispatch.search('pkpre', 'skpre', 'INSERT', {}, {'k3': 'd'}) == []
     assert dispatch.search('pkpre', 'skpre', 'INSERT', {'k3': ''}, {}) == [f3]
     assert dispatch.search('pkpre', 'skpre', 'INSERT', {'k3': 42}, {}) == [f3]
+
+
+def test_dynamo_dispatch_conflicting_attribute_defaults():
+    dispatch = DynamoDispatch()
+    dispatch.register('pkpre', 'skpre', ['INSERT'], Mock(), {'k1': 0})
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], Mock(), {'k1': None})
+    with pytest.raises(AssertionError):
+        dispatch.register('pkpre', 'skpre', ['INSERT'], Mock(), {'k1': None})
+
+
+def test_dynamo_dispatch_plan():
+    dispatch = DynamoDispatch()
+    f1, f2, f3, f4 = Mock(), Mock(), Mock(), Mock()
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f1, {'k1': 0})
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f2)
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f3, {'k2': None, 'k1': 0})
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f4, {'k3': None})
+
+    plan = dispatch.plan('pkpre', 'skpre', 'MODIFY', {'k1': 1, 'k3': 'a'}, {'k1': 1, 'k3': 'a'})
+    assert plan.changed_attributes == set()
+    assert plan.handlers == [f2]
+
+    plan = dispatch.plan('pkpre', 'skpre', 'MODIFY', {'k1': 1, 'k3': 'a', 'other': 1}, {'k2': 'b', 'other': 2})
+    assert plan.changed_attributes == {'k1', 'k2', 'k3'}
+    assert plan.handlers == [f1, f2, f3, f4]
+
+    plan = dispatch.plan('pkpre', 'nope', 'MODIFY', {'k1': 1}, {})
+    assert plan.changed_attributes == set()
+    assert plan.handlers == []
+
+
+def test_dynamo_dispatch_get_handlers():
+    dispatch = DynamoDispatch()
+    f1, f2, f3 = Mock(), Mock(), Mock()
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f1, {'k1': 0})
+    dispatch.register('pkpre', 'skpre', ['MODIFY'], f2, {'k2': 0})
+    dispatch.register('pkpre', 'skpre', ['MODIFY', 'REMOVE'], f3)
+
+    assert dispatch.get_handlers('pkpre', 'skpre', 'MODIFY', set()) == [f3]
+    assert dispatch.get_handlers('pkpre', 'skpre', 'MODIFY', {'k2'}) == [f2, f3]
+    assert dispatch.get_handlers('pkpre', 'skpre', 'MODIFY', {'k2', 'k1', 'unwatched'}) == [f1, f2, f3]
+    assert dispatch.get_handlers('pkpre', 'skpre', 'REMOVE', {'k1'}) == [f3]
+    assert dispatch.get_handlers('pkpre', 'skpre', 'INSERT', {'k1'}) == []
@@ -0,0 +1,237 @@
+import contextlib
+from decimal import Decimal
+from unittest.mock import Mock, call
+
+import pendulum
+import pytest
+
+from app.handlers.dynamo.dispatch import DynamoDispatch
+from app.handlers.dynamo.stream import DynamoStreamProcessor, DynamoStreamRetryLog, LazyImage
+
+
+def build_record(seq, pk, sk, event_name='INSERT', new_item=None, old_item=None):
+    record = {
+        'eventID': f'eid{seq}',
+        'eventName': event_name,
+        'dynamodb': {
+            'Keys': {'partitionKey': {'S': pk}, 'sortKey': {'S': sk}},
+            'SequenceNumber': str(seq),
+        },
+    }
+    if new_item is not None:
+        record['dynamodb']['NewImage'] = {k: {'S': v} for k, v in new_item.items()}
+    if old_item is not None:
+        record['dynamodb']['OldImage'] = {k: {'S': v} for k, v in old_item.items()}
+    return record
+
+
+@pytest.fixture
+def dispatch():
+    yield DynamoDispatch()
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_process_calls_listeners_with_deserialized_items(dispatch, max_workers):
+    f1, f2 = Mock(), Mock()
+    dispatch.register('post', '-', ['INSERT'], f1)
+    dispatch.register('post', '-', ['MODIFY'], f2)
+    processor = DynamoStreamProcessor(dispatch, max_workers=max_workers)
+
+    records = [
+        build_record(100, 'post/pid1', '-', new_item={'k': 'v1'}),
+        build_record(200, 'post/pid2', '-', event_name='MODIFY', new_item={'k': 'v3'}, old_item={'k': 'v2'}),
+        build_record(300, 'user/uid', 'profile', new_item={'k': 'v'}),
+    ]
+    assert processor.process(records) == []
+    assert f1.mock_calls == [call('pid1', new_item={'k': 'v1'})]
+    assert f2.mock_calls == [call('pid2', new_item={'k': 'v3'}, old_item={'k': 'v2'})]
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_process_maintains_order_per_item(dispatch, max_workers):
+    calls = []
+    dispatch.register('post', '-', ['INSERT', 'MODIFY'], lambda pid, new_item, **kw: calls.append(new_item['k']))
+    processor = DynamoStreamProcessor(dispatch, max_workers=max_workers)
+
+    records = [
+        build_record(seq, 'post/pid', '-', event_name='MODIFY', new_item={'k': str(seq)}) for seq in range(50)
+    ]
+    assert processor.process(records) == []
+    assert calls == [str(seq) for seq in range(50)]
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_process_failure_reports_record_and_skips_later_records_of_same_item(dispatch, max_workers):
+    f1 = Mock(side_effect=[None, Exception('poison'), None])
+    f2 = Mock()
+    dispatch.register('post', '-', ['MODIFY'], f1)
+    dispatch.register('post', '-', ['MODIFY'], f2)
+    f3 = Mock()
+    dispatch.register('user', 'profile', ['MODIFY'], f3)
+    processor = DynamoStreamProcessor(dispatch, max_workers=max_workers)
+
+    records = [
+        build_record(1, 'post/pid', '-', event_name='MODIFY', new_item={'k': 'a'}),
+        build_record(2, 'user/uid', 'profile', event_name='MODIFY', new_item={'k': 'a'}),
+        build_record(3, 'post/pid', '-', event_name='MODIFY', new_item={'k': 'b'}),
+        build_record(4, 'user/uid', 'profile', event_name='MODIFY', new_item={'k': 'b'}),
+        build_record(10, 'post/pid', '-', event_name='MODIFY', new_item={'k': 'c'}),
+    ]
+    assert processor.process(records) == ['3', '10']
+
+    # all listeners still run for the failed record, but the item's later records are skipped
+    assert f1.mock_calls == [call('pid', new_item={'k': 'a'}), call('pid', new_item={'k': 'b'})]
+    assert f2.mock_calls == [call('pid', new_item={'k': 'a'}), call('pid', new_item={'k': 'b'})]
+    # other items are unaffected
+    assert f3.mock_calls == [call('uid', new_item={'k': 'a'}), call('uid', new_item={'k': 'b'})]
+
+
+def test_process_record_context(dispatch):
+    contexts = []
+
+    @contextlib.contextmanager
+    def record_context(seq):
+        contexts.append(('enter', seq))
+        yield
+        contexts.append(('exit', seq))
+
+    dispatch.register('post', '-', ['INSERT'], lambda pid, new_item: contexts.append(('run', pid)))
+    processor = DynamoStreamProcessor(dispatch, max_workers=1, record_context=record_context)
+    records = [build_record(seq, f'post/pid{seq}', '-', new_item={'k': 'v'}) for seq in (1, 2)]
+    assert processor.process(records) == []
+    assert contexts == [
+        ('enter', '1'),
+        ('run', 'pid1'),
+        ('exit', '1'),
+        ('enter', '2'),
+        ('run', 'pid2'),
+        ('exit', '2'),
+    ]
+
+
+def test_process_fan_out_job_records(dispatch):
+    f1 = Mock()
+    dispatch.register('post', '-', ['INSERT'], f1)
+    processor = DynamoStreamProcessor(dispatch)
+    job_item = {'jobId': 'feed:pid', 'jobType': 'FEED_ADD_POST', 'runId': 'rid'}
+    records = [
+        build_record(1, 'fanOutJob/feed:pid', '-', new_item=job_item),
+        build_record(2, 'fanOutJob/feed:pid', '-', event_name='REMOVE', old_item=job_item),
+        build_record(3, 'post/pid', '-', new_item={'k': 'v'}),
+    ]
+    assert processor.process(records) == []
+    assert f1.mock_calls == [call('pid', new_item={'k': 'v'})]
+
+
+def test_process_item_id_with_slash(dispatch):
+    f1 = Mock()
+    dispatch.register('fanOutJob', '-', ['INSERT'], f1)
+    processor = DynamoStreamProcessor(dispatch)
+    records = [build_record(1, 'fanOutJob/feed/pid', '-', new_item={'k': 'v'})]
+    assert processor.process(records) == []
+    assert f1.mock_calls == [call('feed/pid', new_item={'k': 'v'})]
+
+
+def test_process_no_records(dispatch):
+    assert DynamoStreamProcessor(dispatch).process([]) == []
+
+
+def test_lazy_image_deserializes_on_access():
+    image = LazyImage({'num': {'N': '42'}, 'str': {'S': 'yup'}, 'bad': {'NOPE': 'x'}})
+    assert len(image) == 3
+    assert list(image) == ['num', 'str', 'bad']
+    assert image.decoded == {}
+
+    assert image['num'] == Decimal(42)
+    assert image.get('str') == 'yup'
+    assert image.get('missing', 'default') == 'default'
+    assert image.decoded == {'num': Decimal(42), 'str': 'yup'}
+
+
+def test_lazy_image_behaves_as_dict():
+    image = LazyImage({'num': {'N': '42'}, 'str': {'S': 'yup'}})
+    assert image == {'num': Decimal(42), 'str': 'yup'}
+    assert {**image} == {'num': Decimal(42), 'str': 'yup'}
+    assert LazyImage() == {}
+    assert not LazyImage()
+
+    copied = image.copy()
+    assert type(copied) is dict
+    copied['num'] = 1
+    assert image['num'] == Decimal(42)
+
+    image['num'] = 1
+    image['other'] = 'new'
+    del image['str']
+    assert image == {'num': 1, 'other': 'new'}
+
+
+def test_process_only_deserializes_what_listeners_read(dispatch):
+    dispatch.register('post', '-', ['MODIFY'], lambda pid, new_item, old_item: new_item['k'], {'k': None})
+    processor = DynamoStreamProcessor(dispatch)
+
+    # the undecodable attribute is never touched
+    record = build_record(1, 'post/pid', '-', event_name='MODIFY', new_item={'k': 'b'}, old_item={'k': 'a'})
+    record['dynamodb']['NewImage']['bad'] = {'NOPE': 'x'}
+    record['dynamodb']['OldImage']['bad'] = {'NOPE': 'x'}
+    assert processor.process([record]) == []
+
+    # no listeners registered for this sk prefix, so no part of either image is decoded
+    record = build_record(2, 'post/pid', 'nothing', event_name='MODIFY', new_item={'k': 'b'}, old_item={'k': 'a'})
+    record['dynamodb']['NewImage'] = {'bad': {'NOPE': 'x'}}
+    assert processor.process([record]) == []
+
+
+def test_retry_log_no_failures(dynamo_client):
+    retry_log = DynamoStreamRetryLog(dynamo_client)
+    assert retry_log.get_processed_event_ids([]) == set()
+
+    records = [build_record(seq, f'post/pid{seq}', '-') for seq in range(1, 4)]
+    assert retry_log.get_processed_event_ids(records) == set()
+    retry_log.update(records, [], set())
+    assert all(dynamo_client.get_item(retry_log.key(r['eventID'])) is None for r in records)
+
+
+def test_retry_log_redelivery(dynamo_client):
+    retry_log = DynamoStreamRetryLog(dynamo_client)
+
+    # records after the first failure that succeeded are logged under the first failure
+    records = [build_record(seq, f'post/pid{seq % 2}', '-') for seq in range(1, 7)]
+    retry_log.update(records, ['2', '4', '6'], set())
+    assert dynamo_client.get_item(retry_log.key('eid2'))['processedEventIds'] == ['eid3', 'eid5']
+
+    # the redelivered batch starts at the first failure, and may include new records
+    records = [build_record(seq, f'post/pid{seq % 2}', '-') for seq in range(2, 9)]
+    processed_event_ids = retry_log.get_processed_event_ids(records)
+    assert processed_event_ids == {'eid3', 'eid5'}
+
+    # fails again from a later record, previously processed records are carried over
+    retry_log.update(records, ['4', '6'], processed_event_ids)
+    assert dynamo_client.get_item(retry_log.key('eid2')) is None
+    assert dynamo_client.get_item(retry_log.key('eid4'))['processedEventIds'] == ['eid5', 'eid7', 'eid8']
+
+    # redelivered again, this time it all succeeds
+    records = [build_record(seq, f'post/pid{seq % 2}', '-') for seq in range(4, 9)]
+    processed_event_ids = retry_log.get_processed_event_ids(records)
+    assert processed_event_ids == {'eid5', 'eid7', 'eid8'}
+    retry_log.update(records, [], processed_event_ids)
+    assert dynamo_client.get_item(retry_log.key('eid4')) is None
+
+
+def test_retry_log_expires(dynamo_client):
+    retry_log = DynamoStreamRetryLog(dynamo_client)
+    now = pendulum.now('utc')
+    records = [build_record(seq, 'post/pid', '-') for seq in range(1, 4)]
+    retry_log.update(records, ['2'], set(), now=now)
+    item = dynamo_client.get_item(retry_log.key('eid2'))
+    assert item['createdAt'] == now.to_iso8601_string()
+    assert item['ttlExpiresAt'] == int(now.add(hours=24).timestamp())
+
+
+def test_retry_log_nothing_to_skip(dynamo_client):
+    retry_log = DynamoStreamRetryLog(dynamo_client)
+
+    # only the last record failed, so there is nothing to log
+    records = [build_record(seq, f'post/pid{seq}', '-') for seq in range(1, 4)]
+    retry_log.update(records, ['3'], set())
+    assert all(dynamo_client.get_item(retry_log.key(r['eventID'])) is None for r in records)
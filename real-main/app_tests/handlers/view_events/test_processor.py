@@ -0,0 +1,138 @@
+import json
+import logging
+from unittest.mock import Mock, call
+
+import pendulum
+import pytest
+
+from app.handlers.view_events.processor import ViewEventsProcessor, ViewEventsRetryLog
+
+
+def build_record(message_id, item_type, item_ids, user_id, viewed_at, view_type=None, receive_count=1):
+    view_event = {
+        'itemType': item_type,
+        'itemIds': item_ids,
+        'userId': user_id,
+        'viewedAt': viewed_at.to_iso8601_string(),
+    }
+    if view_type:
+        view_event['viewType'] = view_type
+    attributes = {'ApproximateReceiveCount': str(receive_count)}
+    return {'messageId': message_id, 'body': json.dumps(view_event), 'attributes': attributes}
+
+
+@pytest.fixture
+def managers():
+    yield {'post': Mock(), 'screen': Mock()}
+
+
+@pytest.fixture
+def retry_log(dynamo_client):
+    yield ViewEventsRetryLog(dynamo_client)
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_process_aggregates_by_item_type_user_and_view_type(managers, retry_log, max_workers):
+    processor = ViewEventsProcessor(managers, retry_log, max_workers=max_workers)
+    at1 = pendulum.now('utc')
+    at2, at3 = at1.add(seconds=1), at1.add(seconds=2)
+
+    records = [
+        build_record('m1', 'post', ['pid1', 'pid2'], 'uid1', at2, 'FOCUS'),
+        build_record('m2', 'post', ['pid1'], 'uid1', at1, 'FOCUS'),
+        build_record('m3', 'post', ['pid1'], 'uid1', at1, 'THUMBNAIL'),
+        build_record('m4', 'post', ['pid2'], 'uid2', at3, 'FOCUS'),
+        build_record('m5', 'screen', ['s1'], 'uid1', at1),
+        build_record('m6', 'screen', ['s1', 's2'], 'uid1', at3),
+    ]
+    assert processor.process(records) == []
+
+    # aggregates are recorded concurrently, so in no particular order. Each item's views are recorded
+    # as of the first and the last of them
+    post_calls = managers['post'].record_views.mock_calls
+    assert len(post_calls) == 4
+    assert call(['pid1', 'pid1'], 'uid1', viewed_at=at2, first_viewed_at=at1, view_type='FOCUS') in post_calls
+    assert call(['pid2'], 'uid1', viewed_at=at2, first_viewed_at=at2, view_type='FOCUS') in post_calls
+    assert call(['pid1'], 'uid1', viewed_at=at1, first_viewed_at=at1, view_type='THUMBNAIL') in post_calls
+    assert call(['pid2'], 'uid2', viewed_at=at3, first_viewed_at=at3, view_type='FOCUS') in post_calls
+    # screen views have no view type
+    assert managers['screen'].record_views.mock_calls == [
+        call(['s1', 's1'], 'uid1', viewed_at=at3, first_viewed_at=at1),
+        call(['s2'], 'uid1', viewed_at=at3, first_viewed_at=at3),
+    ]
+
+
+def test_process_failure_fails_the_records_of_the_item(managers, retry_log, caplog):
+    processor = ViewEventsProcessor(managers, retry_log)
+    now = pendulum.now('utc')
+    records = [
+        build_record('m1', 'post', ['pid1'], 'uid1', now),
+        build_record('m2', 'post', ['pid1', 'pid2'], 'uid1', now),
+        build_record('m3', 'screen', ['s1'], 'uid1', now),
+    ]
+    managers['post'].record_views.side_effect = [None, Exception('anything bad')]
+    with caplog.at_level(logging.ERROR):
+        assert processor.process(records) == ['m2']
+    assert len(caplog.records) == 1
+    assert 'Failed to record views by user `uid1` of post `pid2`' in caplog.records[0].msg
+    assert 'anything bad' in caplog.records[0].msg
+    expected_calls = [call(['s1'], 'uid1', viewed_at=now, first_viewed_at=now)]
+    assert managers['screen'].record_views.mock_calls == expected_calls
+
+    # the views of the failed record that were recorded are not recorded again when it is redelivered
+    assert retry_log.get_recorded_item_ids([build_record('m2', 'post', [], 'uid1', now, receive_count=2)]) == {
+        'm2': {'pid1'}
+    }
+    managers['post'].record_views.reset_mock(side_effect=True)
+    records = [
+        build_record('m2', 'post', ['pid1', 'pid2'], 'uid1', now, receive_count=2),
+        build_record('m4', 'post', ['pid1'], 'uid1', now),
+    ]
+    assert processor.process(records) == []
+    assert managers['post'].record_views.mock_calls == [
+        call(['pid2'], 'uid1', viewed_at=now, first_viewed_at=now),
+        call(['pid1'], 'uid1', viewed_at=now, first_viewed_at=now),
+    ]
+
+
+def test_retry_log_expires(retry_log):
+    now = pendulum.now('utc')
+    retry_log.update({'m1': {'pid2', 'pid1'}, 'm2': set()}, now=now)
+    item = retry_log.client.get_item(retry_log.key('m1'))
+    assert item['recordedItemIds'] == ['pid1', 'pid2']
+    assert item['ttlExpiresAt'] == int(now.add(hours=24).timestamp())
+    assert retry_log.client.get_item(retry_log.key('m2')) is None
+
+    # only records being redelivered are looked up
+    records = [build_record(mid, 'post', [], 'uid1', now, receive_count=2) for mid in ('m1', 'm2')]
+    assert retry_log.get_recorded_item_ids(records) == {'m1': {'pid1', 'pid2'}}
+    assert retry_log.get_recorded_item_ids([build_record('m1', 'post', [], 'uid1', now)]) == {}
+
+
+def test_process_drops_malformed_records(managers, retry_log, caplog):
+    processor = ViewEventsProcessor(managers, retry_log)
+    now = pendulum.now('utc')
+
+    records = [
+        {'messageId': 'm1', 'body': 'not json'},
+        {'messageId': 'm2', 'body': json.dumps({'itemType': 'post'})},
+        build_record('m3', 'post', ['pid1'], 'uid1', now),
+    ]
+    with caplog.at_level(logging.WARNING):
+        assert processor.process(records) == []
+    assert len(caplog.records) == 2
+    assert all('Dropping malformed view event' in rec.msg for rec in caplog.records)
+    expected_calls = [call(['pid1'], 'uid1', viewed_at=now, first_viewed_at=now)]
+    assert managers['post'].record_views.mock_calls == expected_calls
+
+
+def test_process_fails_records_of_unknown_item_type(managers, retry_log):
+    processor = ViewEventsProcessor(managers, retry_log)
+    now = pendulum.now('utc')
+    records = [
+        build_record('m1', 'chat', ['cid1'], 'uid1', now),
+        build_record('m2', 'post', ['pid1'], 'uid1', now),
+    ]
+    assert processor.process(records) == ['m1']
+    expected_calls = [call(['pid1'], 'uid1', viewed_at=now, first_viewed_at=now)]
+    assert managers['post'].record_views.mock_calls == expected_calls
@@ -5,7 +5,11 @@ import pendulum
 import pytest
 
 from app.mixins.trending.dynamo import TrendingDynamo
-from app.mixins.trending.exceptions import TrendingAlreadyExists, TrendingDNEOrAttributeMismatch
+from app.mixins.trending.exceptions import (
+    TrendingAlreadyExists,
+    TrendingDNEOrAttributeMismatch,
+    TrendingException,
+)
 
 
 @pytest.fixture
@@ -33,10 +37,11 @@ def test_add(trending_dynamo):
     assert item == trending_dynamo.get(item_id)
     assert item.pop('partitionKey').split('/') == ['itype', item_id]
     assert item.pop('sortKey') == 'trending'
-    assert item.pop('schemaVersion') == 0
+    assert item.pop('schemaVersion') == 2
     assert pendulum.parse(item.pop('lastDeflatedAt')) == now
     assert pendulum.parse(item.pop('createdAt')) == now
-    assert item.pop('gsiA4PartitionKey').split('/') == ['itype', 'trending']
+    partition = trending_dynamo.partition(item_id)
+    assert item.pop('gsiA4PartitionKey').split('/') == ['itype', 'trending', str(partition)]
     assert item.pop('gsiA4SortKey') == 42
     assert item == {}
 
@@ -57,6 +62,14 @@ def test_add(trending_dynamo):
     assert before < created_at < after
     assert pendulum.parse(item['lastDeflatedAt']) == created_at
 
+    # add another trending anchored in the past
+    item_id = str(uuid4())
+    anchored_at = now.start_of('week')
+    item = trending_dynamo.add(item_id, Decimal(2), now=now, anchored_at=anchored_at)
+    assert item == trending_dynamo.get(item_id)
+    assert pendulum.parse(item['createdAt']) == now
+    assert pendulum.parse(item['lastDeflatedAt']) == anchored_at
+
 
 def test_add_score_failures(trending_dynamo):
     item_id = str(uuid4())
@@ -216,6 +229,18 @@ def test_delete_success(trending_dynamo):
     assert trending_dynamo.get(item_id) is None
 
 
+def test_batch_get_scores(trending_dynamo, trending_dynamo_itype2):
+    item_id1, item_id2, item_id3 = str(uuid4()), str(uuid4()), str(uuid4())
+    assert trending_dynamo.batch_get_scores([]) == {}
+    trending_dynamo.add(item_id1, Decimal(42))
+    trending_dynamo.add(item_id2, Decimal('0.5'))
+    trending_dynamo_itype2.add(item_id3, Decimal(7))
+    assert trending_dynamo.batch_get_scores([item_id1, item_id2, item_id3]) == {
+        item_id1: Decimal(42),
+        item_id2: Decimal('0.5'),
+    }
+
+
 def test_generate_items(trending_dynamo, trending_dynamo_itype2):
     # add a distraction
     trending_dynamo_itype2.add(str(uuid4()), Decimal(42))
@@ -235,3 +260,48 @@ def test_generate_items(trending_dynamo, trending_dynamo_itype2):
     # test generate three, in correct order
     item3 = trending_dynamo.add(str(uuid4()), Decimal(40))
     assert list(trending_dynamo.generate_items()) == [item3, item1, item2]
+
+
+def test_partition(trending_dynamo):
+    item_id = str(uuid4())
+    assert 0 <= trending_dynamo.partition(item_id) < trending_dynamo.partition_count
+    assert trending_dynamo.partition(item_id) == trending_dynamo.partition(item_id)
+    assert len({trending_dynamo.partition(str(uuid4())) for _ in range(100)}) > 1
+
+
+def test_generate_items_across_partitions(trending_dynamo):
+    items = [trending_dynamo.add(str(uuid4()), Decimal(score)) for score in (5, 1, 9, 3, 7, 2, 8, 4, 6, 10)]
+    assert len({item['gsiA4PartitionKey'] for item in items}) > 1
+    assert list(trending_dynamo.generate_items()) == sorted(items, key=lambda item: item['gsiA4SortKey'])
+
+
+def test_query_items(trending_dynamo, trending_dynamo_itype2):
+    # add a distraction
+    trending_dynamo_itype2.add(str(uuid4()), Decimal(42))
+
+    # none
+    assert trending_dynamo.query_items(10) == {'items': [], 'nextToken': None}
+
+    # all fit in one page, highest score first
+    items = [trending_dynamo.add(str(uuid4()), Decimal(score)) for score in (5, 1, 9, 3, 7, 2, 8, 4, 6, 10)]
+    expected = sorted(items, key=lambda item: item['gsiA4SortKey'], reverse=True)
+    paginated = trending_dynamo.query_items(20)
+    assert paginated['items'] == expected
+    assert paginated['nextToken'] is None
+
+    # paginate through them
+    paginated_items, next_token = [], None
+    for _ in range(10):
+        paginated = trending_dynamo.query_items(3, next_token=next_token)
+        assert len(paginated['items']) <= 3
+        paginated_items.extend(paginated['items'])
+        next_token = paginated['nextToken']
+        if not next_token:
+            break
+    assert next_token is None
+    assert paginated_items == expected
+
+
+def test_query_items_invalid_next_token(trending_dynamo):
+    with pytest.raises(TrendingException, match='Invalid nextToken'):
+        trending_dynamo.query_items(10, next_token='not-a-token')
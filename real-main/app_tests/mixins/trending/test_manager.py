@@ -56,37 +56,43 @@ def test_trending_deflate_item_retry_count(manager):
 
 
 @pytest.mark.parametrize('manager', pytest.lazy_fixture(['user_manager', 'post_manager']))
-def test_trending_deflate_item_already_deflated_today(manager, caplog):
-    # add a trending item
+def test_trending_deflate_item_already_deflated_this_period(manager, caplog):
+    # add a trending item, anchored at the start of the week
+    anchored_at = pendulum.parse('2020-06-08T00:00:00Z')  # a monday
     item_id, item_score = str(uuid4()), Decimal(0.4)
-    item = manager.trending_dynamo.add(item_id, item_score)
+    item = manager.trending_dynamo.add(item_id, item_score, now=anchored_at)
     manager.trending_dynamo.deflate_score = Mock()
 
-    with caplog.at_level(logging.WARNING):
-        deflated = manager.trending_deflate_item(item)
+    # days later in the same week, no need to deflate
+    now = pendulum.parse('2020-06-14T23:00:00Z')
+    with caplog.at_level(logging.DEBUG):
+        deflated = manager.trending_deflate_item(item, now=now)
     assert deflated is False
     assert len(caplog.records) == 1
+    assert caplog.records[0].levelno == logging.DEBUG
     assert manager.item_type in caplog.records[0].msg
     assert item_id in caplog.records[0].msg
-    assert 'already been deflated today' in caplog.records[0].msg
+    assert 'already been deflated this period' in caplog.records[0].msg
     assert manager.trending_dynamo.deflate_score.mock_calls == []
 
 
 @pytest.mark.parametrize('manager', pytest.lazy_fixture(['user_manager', 'post_manager']))
 def test_trending_deflate_item_already_has_score_of_zero(manager, caplog):
     # add a trending item
+    created_at = pendulum.parse('2020-06-05T12:00:00Z')
     item_id, item_score = str(uuid4()), Decimal(0)
-    item = manager.trending_dynamo.add(item_id, item_score)
+    item = manager.trending_dynamo.add(item_id, item_score, now=created_at)
     manager.trending_dynamo.deflate_score = Mock()
 
+    now = pendulum.parse('2020-06-08T18:00:00Z')
     with caplog.at_level(logging.WARNING):
-        deflated = manager.trending_deflate_item(item)
-    assert deflated is False
-    assert len(caplog.records) == 2
+        deflated = manager.trending_deflate_item(item, now=now)
+    assert deflated is True
+    assert len(caplog.records) == 1
     assert manager.item_type in caplog.records[0].msg
     assert item_id in caplog.records[0].msg
     assert 'already has score of zero' in caplog.records[0].msg
-    assert manager.trending_dynamo.deflate_score.mock_calls == []
+    assert len(manager.trending_dynamo.deflate_score.mock_calls) == 1
 
 
 @pytest.mark.parametrize('manager', pytest.lazy_fixture(['user_manager', 'post_manager']))
@@ -104,7 +110,7 @@ def test_trending_deflate_item_score_of_zero_update_deflated_at(manager, caplog)
         deflated = manager.trending_deflate_item(item, now=now)
     assert deflated is True
     item = manager.trending_dynamo.get(item_id)
-    assert pendulum.parse(item['lastDeflatedAt']) == now
+    assert pendulum.parse(item['lastDeflatedAt']) == now.start_of('week')
     assert item['gsiA4SortKey'] == pytest.approx(Decimal(0))
 
 
@@ -124,7 +130,7 @@ def test_trending_deflate_item_no_recursion(manager, caplog):
     assert deflated is True
     assert caplog.records == []
     item = manager.trending_dynamo.get(item_id)
-    assert pendulum.parse(item['lastDeflatedAt']) == now
+    assert pendulum.parse(item['lastDeflatedAt']) == now.start_of('week')
     assert item['gsiA4SortKey'] == pytest.approx(Decimal(0.20))
 
 
@@ -152,7 +158,7 @@ def test_trending_deflate_item_with_recursion(manager, caplog):
 
     # verify it was deflated correctly
     item = manager.trending_dynamo.get(item_id)
-    assert pendulum.parse(item['lastDeflatedAt']) == now
+    assert pendulum.parse(item['lastDeflatedAt']) == now.start_of('week')
     assert item['gsiA4SortKey'] == pytest.approx(Decimal(0.7))
 
 
@@ -247,3 +253,90 @@ def test_trending_delete_tail_race_condition(manager, caplog):
     ]
     assert manager.trending_dynamo.get(item1_id) is None
     assert manager.trending_dynamo.get(item2_id)
+
+
+@pytest.mark.parametrize('manager', pytest.lazy_fixture(['user_manager', 'post_manager']))
+def test_trending_delete_tail_scales_min_score_to_anchor(manager):
+    anchored_at = pendulum.parse('2020-06-08T00:00:00Z')  # a monday
+    now = pendulum.parse('2020-06-11T00:07:00Z')  # three days into the week, scores have inflated by 2 ** 3
+    manager.trending_dynamo.delete = Mock(wraps=manager.trending_dynamo.delete)
+
+    item1_id, item1_score = str(uuid4()), Decimal(3.9)
+    item2_id, item2_score = str(uuid4()), Decimal(4)
+    item3_id, item3_score = str(uuid4()), Decimal(1)
+    manager.trending_dynamo.add(item1_id, item1_score, now=anchored_at)
+    manager.trending_dynamo.add(item2_id, item2_score, now=anchored_at)
+    manager.trending_dynamo.add(item3_id, item3_score, now=now, anchored_at=anchored_at)
+    cnt = manager.trending_delete_tail(1003, now=now)
+    assert cnt == 2
+    assert manager.trending_dynamo.delete.mock_calls == [
+        call(item3_id, expected_score=item3_score),
+        call(item1_id, expected_score=pytest.approx(item1_score)),
+    ]
+    assert manager.trending_dynamo.get(item2_id)
+
+
+@pytest.fixture
+def users(user_manager, cognito_client):
+    users = []
+    for _ in range(3):
+        user_id, username = str(uuid4()), str(uuid4())[:8]
+        cognito_client.create_user_pool_entry(user_id, username, verified_email=f'{username}@real.app')
+        users.append(user_manager.create_cognito_only_user(user_id, username))
+    yield users
+
+
+def test_trending_scores_match_daily_deflation(user_manager, users):
+    """
+    Scores used to be deflated every day so that, at the start of each day, a view at time t
+    contributed 2 ** (t - start_of_today) in days. Verify the scores anchored to the start of the week
+    are equivalent: identical ordering and identical score once scaled back to the start of the day.
+    """
+
+    def daily_deflation_score(views, now):
+        today = now.start_of('day')
+        return sum(multiplier * 2 ** (viewed_at - today).total_days() for viewed_at, multiplier in views)
+
+    views = {user.id: [] for user in users}
+    start = pendulum.parse('2020-06-03T00:00:00Z')  # a wednesday, so the run spans two week boundaries
+    for day in range(14):
+        # the cron runs a few minutes into each day
+        user_manager.trending_deflate(now=start.add(days=day, minutes=7))
+
+        for hour, (user, multiplier) in enumerate(zip(users, (1, 2, 0.5))):
+            if (day + hour) % 3 == 0:
+                continue
+            viewed_at = start.add(days=day, hours=4 * hour + 1)
+            user.trending_increment_score(now=viewed_at, multiplier=multiplier)
+            views[user.id].append((viewed_at, multiplier))
+
+        end_of_day = start.add(days=day, hours=23)
+        expected = {
+            user_id: daily_deflation_score(user_views, end_of_day)
+            for user_id, user_views in views.items()
+            if user_views
+        }
+        items = list(user_manager.trending_dynamo.generate_items())
+        assert [item['partitionKey'].split('/')[1] for item in items] == sorted(expected, key=expected.get)
+        for item in items:
+            anchored_at = pendulum.parse(item['lastDeflatedAt'])
+            assert anchored_at == end_of_day.start_of('week')
+            scale = 2 ** (end_of_day.start_of('day') - anchored_at).days
+            score = item['gsiA4SortKey'] / scale
+            assert score == pytest.approx(Decimal(expected[item['partitionKey'].split('/')[1]]))
+
+
+@pytest.mark.parametrize('manager', pytest.lazy_fixture(['user_manager', 'post_manager']))
+def test_get_trending_page(manager):
+    assert manager.get_trending_page(10) == {'nextToken': None, 'items': []}
+
+    item_id1, item_id2, item_id3 = str(uuid4()), str(uuid4()), str(uuid4())
+    manager.trending_dynamo.add(item_id1, Decimal(2))
+    manager.trending_dynamo.add(item_id2, Decimal(3))
+    manager.trending_dynamo.add(item_id3, Decimal(1))
+    assert manager.get_trending_page(10) == {'nextToken': None, 'items': [item_id2, item_id1, item_id3]}
+
+    paginated = manager.get_trending_page(2)
+    assert paginated['items'] == [item_id2, item_id1]
+    paginated = manager.get_trending_page(2, next_token=paginated['nextToken'])
+    assert paginated['items'] == [item_id3]
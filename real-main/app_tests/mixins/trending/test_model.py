@@ -35,7 +35,7 @@ def test_increment_score_add_new(model):
     now = pendulum.parse('2020-06-08T12:00:00Z')  # halfway through the day
     model.trending_increment_score(now=now)
     assert pendulum.parse(model.trending_item['createdAt']) == now
-    assert pendulum.parse(model.trending_item['lastDeflatedAt']) == now
+    assert pendulum.parse(model.trending_item['lastDeflatedAt']) == now.start_of('week')  # a monday
     assert model.trending_item['gsiA4SortKey'] == pytest.approx(Decimal(2 ** 0.5))
 
 
@@ -44,7 +44,7 @@ def test_increment_score_with_multiplier(model):
     now = pendulum.parse('2020-06-08T12:00:00Z')  # halfway through the day
     model.trending_increment_score(now=now, multiplier=0.5)
     assert pendulum.parse(model.trending_item['createdAt']) == now
-    assert pendulum.parse(model.trending_item['lastDeflatedAt']) == now
+    assert pendulum.parse(model.trending_item['lastDeflatedAt']) == now.start_of('week')  # a monday
     assert model.trending_item['gsiA4SortKey'] == pytest.approx(Decimal(0.5 * 2 ** 0.5))
 
 
@@ -69,6 +69,15 @@ def test_add_and_increment_view(view_dynamo):
     assert view_dynamo.get_view(item_id, user_id) == view
 
 
+def test_add_view_first_viewed_at(view_dynamo):
+    first_viewed_at = pendulum.now('utc')
+    viewed_at = first_viewed_at.add(seconds=5)
+    view = view_dynamo.add_view('iid', 'uid', 2, viewed_at, first_viewed_at=first_viewed_at)
+    assert view['firstViewedAt'] == first_viewed_at.to_iso8601_string()
+    assert view['gsiA1SortKey'] == first_viewed_at.to_iso8601_string()
+    assert view['gsiA2SortKey'] == first_viewed_at.to_iso8601_string()
+    assert view['lastViewedAt'] == viewed_at.to_iso8601_string()
+
 def test_generate_keys_by_item_and_generate_keys_by_user(view_dynamo):
     item_id_1, item_id_2 = str(uuid4()), str(uuid4())
     user_id_1, user_id_2 = str(uuid4()), str(uuid4())
@@ -92,6 +101,34 @@ def test_generate_keys_by_item_and_generate_keys_by_user(view_dynamo):
     assert list(view_dynamo.generate_keys_by_user(user_id_2)) == [vk22]
 
 
+def test_get_views_by_item_ids(view_dynamo):
+    item_id_1, item_id_2, user_id = str(uuid4()), str(uuid4()), str(uuid4())
+    assert view_dynamo.get_views_by_item_ids([], user_id) == {}
+    assert view_dynamo.get_views_by_item_ids([item_id_1, item_id_2], user_id) == {}
+
+    # user views item1, another user views item2
+    view_1 = view_dynamo.add_view(item_id_1, user_id, 1, pendulum.now('utc'))
+    view_dynamo.add_view(item_id_2, str(uuid4()), 1, pendulum.now('utc'))
+    assert view_dynamo.get_views_by_item_ids([item_id_1, item_id_2], user_id) == {item_id_1: view_1}
+
+
+def test_get_views_by_user_ids(view_dynamo):
+    item_id, user_id_1, user_id_2 = str(uuid4()), str(uuid4()), str(uuid4())
+    assert view_dynamo.get_views_by_user_ids(item_id, []) == {}
+    assert view_dynamo.get_views_by_user_ids(item_id, [user_id_1, user_id_2]) == {}
+
+    # user1 views the item, user2 views another item
+    view_1 = view_dynamo.add_view(item_id, user_id_1, 1, pendulum.now('utc'))
+    view_dynamo.add_view(str(uuid4()), user_id_2, 1, pendulum.now('utc'))
+    assert view_dynamo.get_views_by_user_ids(item_id, [user_id_1, user_id_2]) == {user_id_1: view_1}
+
+    # with a projection
+    views = view_dynamo.get_views_by_user_ids(
+        item_id, [user_id_1, user_id_2], projection_expression='partitionKey, sortKey, lastViewedAt'
+    )
+    assert views == {user_id_1: {k: view_1[k] for k in ('partitionKey', 'sortKey', 'lastViewedAt')}}
+
+
 def test_delete_view(view_dynamo):
     # add two views, verify
     item_id1, user_id1 = [str(uuid4()), str(uuid4())]
@@ -138,6 +175,19 @@ def test_generate_keys_by_user_past_30_days(view_dynamo):
     ) == [key3, key4, key1]
 
 
+def test_generate_views_by_user_rest_of_day(view_dynamo):
+    user_id = str(uuid4())
+    since = pendulum.parse('2020-06-30T12:00:00Z')
+    assert list(view_dynamo.generate_views_by_user_rest_of_day(user_id, since)) == []
+
+    view_dynamo.add_view(str(uuid4()), user_id, 1, since.subtract(microseconds=1))
+    item1 = view_dynamo.add_view(str(uuid4()), user_id, 1, since)
+    item2 = view_dynamo.add_view(str(uuid4()), user_id, 2, since.end_of('day'))
+    view_dynamo.add_view(str(uuid4()), user_id, 1, since.add(days=1).start_of('day'))
+    view_dynamo.add_view(str(uuid4()), str(uuid4()), 1, since)
+    assert list(view_dynamo.generate_views_by_user_rest_of_day(user_id, since)) == [item1, item2]
+
+
 def test_set_royalty_fee(view_dynamo):
     item_id1, user_id1 = [str(uuid4()), str(uuid4())]
     item_id2, user_id2 = [str(uuid4()), str(uuid4())]
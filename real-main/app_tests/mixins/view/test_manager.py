@@ -1,8 +1,12 @@
+import json
 from uuid import uuid4
 
+import pendulum
 import pytest
 from mock import patch
 
+from app import models
+from app.mixins.view.enums import ViewType
 from app.models.post.enums import PostType
 
 
@@ -43,6 +47,42 @@ def test_record_views_implemented(manager):
     manager.record_views(['iid1', 'iid2'], 'uid')
 
 
+@pytest.fixture
+def buffered_screen_manager(dynamo_client, sqs_client):
+    yield models.ScreenManager({'dynamo': dynamo_client, 'view_events': sqs_client})
+
+
+def test_report_views_records_views_if_not_buffered(screen_manager, screen, screen2, user):
+    viewed_at = pendulum.now('utc')
+    screen_manager.report_views([screen.id, screen2.id, screen.id], user.id, viewed_at=viewed_at)
+    view = screen_manager.view_dynamo.get_view(screen.id, user.id)
+    assert view['viewCount'] == 2
+    assert view['lastViewedAt'] == viewed_at.to_iso8601_string()
+    assert screen_manager.view_dynamo.get_view(screen2.id, user.id)['viewCount'] == 1
+
+
+def test_report_views_enqueues_view_event_if_buffered(buffered_screen_manager, sqs_client, screen, screen2, user):
+    viewed_at = pendulum.now('utc')
+    buffered_screen_manager.report_views([screen.id, screen2.id, screen.id], user.id, viewed_at=viewed_at)
+    assert buffered_screen_manager.view_dynamo.get_view(screen.id, user.id) is None
+    assert buffered_screen_manager.view_dynamo.get_view(screen2.id, user.id) is None
+
+    records = sqs_client.receive_messages()
+    assert len(records) == 1
+    assert json.loads(records[0]['body']) == {
+        'itemType': 'screen',
+        'itemIds': [screen.id, screen2.id, screen.id],
+        'userId': user.id,
+        'viewedAt': viewed_at.to_iso8601_string(),
+    }
+
+    # view type is included only if specified
+    buffered_screen_manager.report_views([screen.id], user.id, viewed_at=viewed_at, view_type=ViewType.FOCUS)
+    records = sqs_client.receive_messages()
+    assert len(records) == 1
+    assert json.loads(records[0]['body'])['viewType'] == ViewType.FOCUS
+
+
 @pytest.mark.parametrize(
     'manager, model1, model2',
     [
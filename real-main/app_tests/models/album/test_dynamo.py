@@ -354,3 +354,19 @@ def test_increment_rank_count(album_dynamo):
     with patch.object(album_dynamo, 'client') as dynamo_client_mock:
         album_dynamo.increment_rank_count(album_id)
     assert dynamo_client_mock.mock_calls == [call.increment_count(album_dynamo.pk(album_id), 'rankCount')]
+
+
+def test_increment_decrement_post_count_buffered(album_dynamo):
+    album_id = str(uuid4())
+    album_dynamo.add_album(album_id, 'uid', 'name')
+    now1, now2 = pendulum.now('utc'), pendulum.now('utc') + pendulum.duration(seconds=1)
+
+    with album_dynamo.client.buffer_counts():
+        assert album_dynamo.increment_post_count(album_id, now=now1) is None
+        assert album_dynamo.increment_post_count(album_id, now=now1) is None
+        assert album_dynamo.decrement_post_count(album_id, now=now2) is None
+        assert 'postCount' not in album_dynamo.get_album(album_id)
+
+    album_item = album_dynamo.get_album(album_id)
+    assert album_item['postCount'] == 1
+    assert album_item['postsLastUpdatedAt'] == now2.to_iso8601_string()
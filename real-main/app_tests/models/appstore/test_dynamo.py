@@ -170,3 +170,17 @@ def test_generate_transaction_keys_past_30_days(appstore_sub_dynamo):
         key2,
     ]
     assert list(appstore_sub_dynamo.generate_transaction_keys_past_30_days(user_id2, now + 5 * ten_days)) == []
+
+
+def test_generate_transactions_by_user_rest_of_day(appstore_sub_dynamo):
+    user_id = str(uuid4())
+    since = pendulum.parse('2020-06-30T12:00:00Z')
+    assert list(appstore_sub_dynamo.generate_transactions_by_user_rest_of_day(user_id, since)) == []
+
+    args = ['-', '-', '-', '-', '-']
+    appstore_sub_dynamo.add_transaction(str(uuid4()), user_id, *args, now=since.subtract(seconds=1))
+    item1 = appstore_sub_dynamo.add_transaction(str(uuid4()), user_id, *args, now=since)
+    item2 = appstore_sub_dynamo.add_transaction(str(uuid4()), user_id, *args, now=since.end_of('day'))
+    appstore_sub_dynamo.add_transaction(str(uuid4()), user_id, *args, now=since.add(days=1).start_of('day'))
+    appstore_sub_dynamo.add_transaction(str(uuid4()), str(uuid4()), *args, now=since)
+    assert list(appstore_sub_dynamo.generate_transactions_by_user_rest_of_day(user_id, since)) == [item1, item2]
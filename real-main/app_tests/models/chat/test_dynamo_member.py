@@ -87,6 +87,45 @@ def test_update_last_message_activity_at(cm_dynamo, caplog):
     assert cm_dynamo.get(chat_id, user_id) == item
 
 
+def test_update_for_message_added(cm_dynamo, caplog):
+    chat_id, user_id = str(uuid4()), str(uuid4())
+    now = pendulum.now('utc')
+    cm_dynamo.client.transact_write_items([cm_dynamo.transact_add(chat_id, user_id, now)])
+
+    # update just the last message activity at
+    now = pendulum.now('utc')
+    item = cm_dynamo.update_for_message_added(chat_id, user_id, now)
+    assert item['gsiK2SortKey'] == 'chat/' + now.to_iso8601_string()
+    assert 'messagesUnviewedCount' not in item
+
+    # update both
+    now = pendulum.now('utc')
+    item = cm_dynamo.update_for_message_added(chat_id, user_id, now, increment_messages_unviewed_count=True)
+    assert item['gsiK2SortKey'] == 'chat/' + now.to_iso8601_string()
+    assert item['messagesUnviewedCount'] == 1
+    assert cm_dynamo.get(chat_id, user_id) == item
+
+    # a message out of order still increments the count, but doesn't move the activity timestamp
+    before = now.subtract(seconds=10)
+    with caplog.at_level(logging.WARNING):
+        item = cm_dynamo.update_for_message_added(
+            chat_id, user_id, before, increment_messages_unviewed_count=True
+        )
+    assert len(caplog.records) == 1
+    assert all(x in caplog.records[0].msg for x in ['Failed', 'last message activity', chat_id, user_id])
+    assert item['gsiK2SortKey'] == 'chat/' + now.to_iso8601_string()
+    assert item['messagesUnviewedCount'] == 2
+
+    # member that doesn't exist fails softly
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        resp = cm_dynamo.update_for_message_added(chat_id, 'uid-dne', now, increment_messages_unviewed_count=True)
+    assert resp is None
+    assert len(caplog.records) == 2
+    assert 'last message activity' in caplog.records[0].msg
+    assert 'Failed to increment messagesUnviewedCount' in caplog.records[1].msg
+
+
 def test_generate_user_ids_by_chat(cm_dynamo):
     chat_id = 'cid'
 
@@ -87,8 +87,9 @@ def test_on_message_added(chat_manager, chat, user1, user2, caplog, user1_messag
     assert all('Failed' in rec.msg for rec in caplog.records)
     assert all('last message activity' in rec.msg for rec in caplog.records)
     assert all(chat.id in rec.msg for rec in caplog.records)
-    assert user1.id in caplog.records[1].msg
-    assert user2.id in caplog.records[2].msg
+    # members are updated concurrently, so their warnings may be in any order
+    assert any(user1.id in rec.msg for rec in caplog.records[1:])
+    assert any(user2.id in rec.msg for rec in caplog.records[1:])
 
     # verify final state
     chat.refresh_item()
@@ -181,3 +181,14 @@ def test_delete_all_on_post(comment_manager, user, post, post_manager, user2, us
 
     # verify the unrelated comment was untouched
     assert comment_manager.get_comment(comment_other.id)
+
+
+def test_clear_comment_bad_words(comment_manager, user, post):
+    comment_manager.add_comment('cid1', post.id, user.id, 'lore')
+    comment_manager.add_comment('cid2', post.id, user.id, 'ipsum')
+    with patch.object(comment_manager.bad_words_client, 'get_matcher') as get_matcher:
+        with patch.object(comment_manager, 'on_comment_added_detect_bad_words') as detect:
+            assert comment_manager.clear_comment_bad_words() == 2
+    # the bad words file changed, so the cached matcher is not trusted
+    assert get_matcher.call_args_list[0].kwargs == {'revalidate': True}
+    assert sorted(c.args[0] for c in detect.call_args_list) == ['cid1', 'cid2']
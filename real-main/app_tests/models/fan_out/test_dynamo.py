@@ -0,0 +1,110 @@
+import uuid
+
+import pendulum
+import pytest
+
+from app.models.fan_out.dynamo import FanOutJobDynamo
+
+
+@pytest.fixture
+def fan_out_dynamo(dynamo_client):
+    yield FanOutJobDynamo(dynamo_client)
+
+
+@pytest.fixture
+def job_item(fan_out_dynamo):
+    now = pendulum.now('utc')
+    yield fan_out_dynamo.start_job('feed:pid', 'FEED_ADD_POST', {'postId': 'pid'}, 'rid', now.add(minutes=2), now)
+
+
+def test_start_job(fan_out_dynamo):
+    job_id = f'feed:{uuid.uuid4()}'
+    assert fan_out_dynamo.get_job(job_id) is None
+
+    now = pendulum.now('utc')
+    lease_expires_at = now.add(minutes=2)
+    job_item = fan_out_dynamo.start_job(job_id, 'FEED_ADD_POST', {'postId': 'pid'}, 'rid', lease_expires_at, now)
+    assert job_item == {
+        'partitionKey': f'fanOutJob/{job_id}',
+        'sortKey': '-',
+        'schemaVersion': 0,
+        'gsiK1PartitionKey': 'fanOutJob',
+        'gsiK1SortKey': lease_expires_at.to_iso8601_string(),
+        'jobId': job_id,
+        'jobType': 'FEED_ADD_POST',
+        'jobArgs': {'postId': 'pid'},
+        'runId': 'rid',
+        'processedCount': 0,
+        'startedAt': now.to_iso8601_string(),
+    }
+    assert fan_out_dynamo.get_job(job_id) == job_item
+
+    # make some progress, then restart the job
+    fan_out_dynamo.advance_job(job_item, 'uid', 10, lease_expires_at)
+    fan_out_dynamo.defer_job({**job_item, 'processedCount': 10}, now)
+    new_item = fan_out_dynamo.start_job(
+        job_id, 'FEED_DELETE_POST', {'postId': 'pid'}, 'rid2', lease_expires_at, now
+    )
+    assert new_item['jobType'] == 'FEED_DELETE_POST'
+    assert new_item['runId'] == 'rid2'
+    assert new_item['processedCount'] == 0
+    assert 'cursorUserId' not in new_item
+    assert 'isDeferred' not in new_item
+
+
+def test_advance_job(fan_out_dynamo, job_item):
+    lease_expires_at = pendulum.now('utc').add(minutes=4)
+    new_item = fan_out_dynamo.advance_job(job_item, 'uid1', 10, lease_expires_at)
+    assert new_item['cursorUserId'] == 'uid1'
+    assert new_item['processedCount'] == 10
+    assert new_item['gsiK1SortKey'] == lease_expires_at.to_iso8601_string()
+
+    # advancing from stale state fails softly
+    assert fan_out_dynamo.advance_job(job_item, 'uid2', 10, lease_expires_at) is None
+    assert fan_out_dynamo.advance_job({**new_item, 'runId': 'other'}, 'uid2', 10, lease_expires_at) is None
+    assert fan_out_dynamo.get_job(job_item['jobId']) == new_item
+
+    new_item = fan_out_dynamo.advance_job(new_item, 'uid2', 5, lease_expires_at)
+    assert new_item['cursorUserId'] == 'uid2'
+    assert new_item['processedCount'] == 15
+
+
+def test_defer_and_claim_job(fan_out_dynamo, job_item):
+    now = pendulum.now('utc')
+    deferred_item = fan_out_dynamo.defer_job(job_item, now)
+    assert deferred_item['gsiK1SortKey'] == now.to_iso8601_string()
+    assert deferred_item['isDeferred'] is True
+
+    # claim it
+    lease_expires_at = now.add(minutes=2)
+    claimed_item = fan_out_dynamo.claim_job(deferred_item, lease_expires_at)
+    assert claimed_item['gsiK1SortKey'] == lease_expires_at.to_iso8601_string()
+    assert 'isDeferred' not in claimed_item
+
+    # can't claim it a second time based on the same state
+    assert fan_out_dynamo.claim_job(deferred_item, lease_expires_at) is None
+
+
+def test_delete_job(fan_out_dynamo, job_item):
+    # can't delete a job that has been restarted
+    assert fan_out_dynamo.delete_job({**job_item, 'runId': 'other'}) is None
+    assert fan_out_dynamo.get_job(job_item['jobId']) == job_item
+
+    assert fan_out_dynamo.delete_job(job_item) == job_item
+    assert fan_out_dynamo.get_job(job_item['jobId']) is None
+    assert fan_out_dynamo.delete_job(job_item) is None
+
+
+def test_generate_job_ids_with_expired_lease(fan_out_dynamo):
+    now = pendulum.now('utc')
+    assert list(fan_out_dynamo.generate_job_ids_with_expired_lease(now)) == []
+
+    fan_out_dynamo.start_job('feed:pid1', 'FEED_ADD_POST', {}, 'rid1', now.subtract(seconds=1), now)
+    fan_out_dynamo.start_job('feed:pid2', 'FEED_ADD_POST', {}, 'rid2', now.add(seconds=1), now)
+    fan_out_dynamo.start_job('firstStory:uid', 'FIRST_STORY_SET', {}, 'rid3', now, now)
+    assert list(fan_out_dynamo.generate_job_ids_with_expired_lease(now)) == ['feed:pid1', 'firstStory:uid']
+    assert list(fan_out_dynamo.generate_job_ids_with_expired_lease(now.add(seconds=1))) == [
+        'feed:pid1',
+        'firstStory:uid',
+        'feed:pid2',
+    ]
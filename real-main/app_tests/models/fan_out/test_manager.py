@@ -0,0 +1,117 @@
+import json
+import logging
+from unittest.mock import Mock, call, patch
+
+import pendulum
+import pytest
+
+from app.models.fan_out.enums import FanOutJobType
+
+
+class FakeOwner:
+    "Fans out to a fixed list of user ids"
+
+    def __init__(self, user_ids):
+        self.user_ids = sorted(user_ids)
+        self.process_fan_out_chunk = Mock()
+
+    def generate_fan_out_user_ids(self, job_type, job_args, after_user_id=None):
+        return (uid for uid in self.user_ids if after_user_id is None or uid > after_user_id)
+
+
+@pytest.fixture
+def owner(fan_out_manager):
+    owner = FakeOwner([f'uid{i:02}' for i in range(10)])
+    with patch.dict(fan_out_manager.job_type_owners, {FanOutJobType.FEED_ADD_POST: owner}):
+        with patch.object(fan_out_manager, 'chunk_size', 3):
+            yield owner
+
+
+def test_start_job_completes_inline(fan_out_manager, owner, capsys):
+    assert fan_out_manager.start_job('feed:pid', FanOutJobType.FEED_ADD_POST, {'postId': 'pid'}) is True
+    assert owner.process_fan_out_chunk.mock_calls == [
+        call(FanOutJobType.FEED_ADD_POST, {'postId': 'pid'}, ['uid00', 'uid01', 'uid02']),
+        call(FanOutJobType.FEED_ADD_POST, {'postId': 'pid'}, ['uid03', 'uid04', 'uid05']),
+        call(FanOutJobType.FEED_ADD_POST, {'postId': 'pid'}, ['uid06', 'uid07', 'uid08']),
+        call(FanOutJobType.FEED_ADD_POST, {'postId': 'pid'}, ['uid09']),
+    ]
+    assert fan_out_manager.dynamo.get_job('feed:pid') is None
+    metrics = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [m['event'] for m in metrics] == ['PROGRESS', 'PROGRESS', 'PROGRESS', 'COMPLETED']
+    assert sum(m['fanOutUsersProcessed'] for m in metrics) == 10
+    assert all(m['jobType'] == 'FEED_ADD_POST' and m['jobId'] == 'feed:pid' for m in metrics)
+    assert metrics[0]['_aws']['CloudWatchMetrics'] == [
+        {
+            'Namespace': 'real',
+            'Dimensions': [['jobType', 'event']],
+            'Metrics': [{'Name': 'fanOutUsersProcessed', 'Unit': 'Count'}],
+        }
+    ]
+
+
+def test_start_job_no_users(fan_out_manager, owner):
+    owner.user_ids = []
+    assert fan_out_manager.start_job('feed:pid', FanOutJobType.FEED_ADD_POST, {}) is True
+    assert owner.process_fan_out_chunk.mock_calls == []
+    assert fan_out_manager.dynamo.get_job('feed:pid') is None
+
+
+def test_start_job_deferred_then_resumed(fan_out_manager, owner, caplog):
+    with patch.object(fan_out_manager, 'max_inline_chunks', 2):
+        assert fan_out_manager.start_job('feed:pid', FanOutJobType.FEED_ADD_POST, {}) is False
+    assert len(owner.process_fan_out_chunk.mock_calls) == 2
+    job_item = fan_out_manager.dynamo.get_job('feed:pid')
+    assert job_item['cursorUserId'] == 'uid05'
+    assert job_item['processedCount'] == 6
+    assert job_item['isDeferred'] is True
+
+    # the worker picks it up right away, and it isn't considered stalled
+    owner.process_fan_out_chunk.reset_mock()
+    with caplog.at_level(logging.WARNING):
+        assert fan_out_manager.resume_jobs() == 1
+    assert owner.process_fan_out_chunk.mock_calls == [
+        call(FanOutJobType.FEED_ADD_POST, {}, ['uid06', 'uid07', 'uid08']),
+        call(FanOutJobType.FEED_ADD_POST, {}, ['uid09']),
+    ]
+    assert fan_out_manager.dynamo.get_job('feed:pid') is None
+    assert not [r for r in caplog.records if r.levelno >= logging.WARNING]
+    assert fan_out_manager.resume_jobs() == 0
+
+
+def test_interrupted_job_resumed_after_lease_expires(fan_out_manager, owner, caplog):
+    owner.process_fan_out_chunk.side_effect = [None, Exception('Lambda timed out')]
+    with pytest.raises(Exception, match='Lambda timed out'):
+        fan_out_manager.start_job('feed:pid', FanOutJobType.FEED_ADD_POST, {})
+    job_item = fan_out_manager.dynamo.get_job('feed:pid')
+    assert job_item['cursorUserId'] == 'uid02'
+
+    # not resumed until its lease has expired
+    owner.process_fan_out_chunk.reset_mock(side_effect=True)
+    assert fan_out_manager.resume_jobs() == 0
+    assert owner.process_fan_out_chunk.mock_calls == []
+
+    now = pendulum.now('utc') + fan_out_manager.lease_duration
+    with caplog.at_level(logging.WARNING):
+        assert fan_out_manager.resume_jobs(now=now) == 1
+    assert [c.args[2] for c in owner.process_fan_out_chunk.mock_calls] == [
+        ['uid03', 'uid04', 'uid05'],
+        ['uid06', 'uid07', 'uid08'],
+        ['uid09'],
+    ]
+    assert fan_out_manager.dynamo.get_job('feed:pid') is None
+    assert len(caplog.records) == 1
+    assert caplog.records[0].levelname == 'WARNING'
+    assert caplog.records[0].message.startswith('FAN_OUT_JOB_STALLED: job `feed:pid`')
+
+
+def test_restarted_job_supersedes_running_job(fan_out_manager, owner):
+    # the job is restarted while processing its first chunk
+    def restart(job_type, job_args, user_ids):
+        if job_args == {'run': 1}:
+            owner.process_fan_out_chunk.side_effect = None
+            fan_out_manager.start_job('feed:pid', FanOutJobType.FEED_ADD_POST, {'run': 2})
+
+    owner.process_fan_out_chunk.side_effect = restart
+    assert fan_out_manager.start_job('feed:pid', FanOutJobType.FEED_ADD_POST, {'run': 1}) is False
+    assert [c.args[1] for c in owner.process_fan_out_chunk.mock_calls] == [{'run': 1}] + [{'run': 2}] * 4
+    assert fan_out_manager.dynamo.get_job('feed:pid') is None
@@ -3,7 +3,7 @@ from uuid import uuid4
 import pendulum
 import pytest
 
-from app.models.feed.dynamo import FeedDynamo
+from app.models.feed.dynamo.base import FeedDynamo
 
 
 @pytest.fixture
@@ -141,11 +141,11 @@ def test_add_post_to_feeds(feed_dynamo):
     assert sorted([i['postId'] for i in feed_dynamo.generate_items(feed_uids[1])]) == sorted([post_id, post_id_2])
 
 
-def test_delete_by_post(feed_dynamo):
+def test_delete_post_from_feeds(feed_dynamo):
     feed_uids = [str(uuid4()), str(uuid4())]
 
     # delete post from feeds where it doesn't exist - verify no error
-    assert feed_dynamo.delete_by_post(str(uuid4())) == []
+    feed_dynamo.delete_post_from_feeds(feed_uids, str(uuid4()))
 
     # add a post to two feeds
     posted_at = pendulum.now('utc').to_iso8601_string()
@@ -171,14 +171,14 @@ def test_delete_by_post(feed_dynamo):
     assert [i['postId'] for i in feed_dynamo.generate_items(feed_uids[1])] == [post_id]
 
     # delete a post from the feeds
-    assert sorted(feed_dynamo.delete_by_post(post_id)) == sorted(feed_uids)
+    feed_dynamo.delete_post_from_feeds(feed_uids, post_id)
 
     # verify the two feeds look as expected
     assert [i['postId'] for i in feed_dynamo.generate_items(feed_uids[0])] == [post_id_2]
     assert [i['postId'] for i in feed_dynamo.generate_items(feed_uids[1])] == []
 
     # delete the other post from the feeds
-    assert feed_dynamo.delete_by_post(post_id_2) == feed_uids[:1]
+    feed_dynamo.delete_post_from_feeds(feed_uids, post_id_2)
 
     # verify the two feeds look as expected
     assert [i['postId'] for i in feed_dynamo.generate_items(feed_uids[0])] == []
@@ -239,3 +239,45 @@ def test_generate_keys_by_posted_by_user(feed_dynamo):
         {'postId': pid2, 'feedUserId': feed_user_id}
     ]
     assert list(feed_dynamo.generate_keys_by_posted_by_user(feed_user_id, str(uuid4()))) == []
+
+
+def test_generate_items_newest_first(feed_dynamo):
+    feed_user_id, pb_user_id = str(uuid4()), str(uuid4())
+    at1, at2, at3 = [pendulum.now('utc').add(seconds=i).to_iso8601_string() for i in range(3)]
+    post_items = [
+        {'postId': 'pid2', 'postedByUserId': pb_user_id, 'postedAt': at2},
+        {'postId': 'pid1', 'postedByUserId': pb_user_id, 'postedAt': at1},
+        {'postId': 'pid3', 'postedByUserId': pb_user_id, 'postedAt': at3},
+    ]
+    feed_dynamo.add_posts_to_feed(feed_user_id, iter(post_items))
+
+    assert [i['postId'] for i in feed_dynamo.generate_items_newest_first(feed_user_id)] == [
+        'pid3',
+        'pid2',
+        'pid1',
+    ]
+    assert [i['postId'] for i in feed_dynamo.generate_items_newest_first(feed_user_id, page_size=1)] == [
+        'pid3',
+        'pid2',
+        'pid1',
+    ]
+    assert [i['postId'] for i in feed_dynamo.generate_items_newest_first(feed_user_id, max_posted_at=at2)] == [
+        'pid2',
+        'pid1',
+    ]
+    assert list(feed_dynamo.generate_items_newest_first(str(uuid4()))) == []
+
+
+def test_generate_keys_by_post_after_feed_user_id(feed_dynamo):
+    post_id = str(uuid4())
+    post_item = {
+        'postId': post_id,
+        'postedByUserId': str(uuid4()),
+        'postedAt': pendulum.now('utc').to_iso8601_string(),
+    }
+    feed_dynamo.add_post_to_feeds(iter(['uid3', 'uid1', 'uid2']), post_item)
+
+    assert [k['feedUserId'] for k in feed_dynamo.generate_keys_by_post(post_id)] == ['uid1', 'uid2', 'uid3']
+    keys = feed_dynamo.generate_keys_by_post(post_id, after_feed_user_id='uid1')
+    assert [k['feedUserId'] for k in keys] == ['uid2', 'uid3']
+    assert list(feed_dynamo.generate_keys_by_post(post_id, after_feed_user_id='uid3')) == []
@@ -0,0 +1,61 @@
+from uuid import uuid4
+
+import pendulum
+import pytest
+
+from app.models.feed.dynamo.pulled_user import FeedPulledUserDynamo
+
+
+@pytest.fixture
+def pulled_user_dynamo(dynamo_client):
+    yield FeedPulledUserDynamo(dynamo_client)
+
+
+def test_add_get_delete(pulled_user_dynamo):
+    user_id = str(uuid4())
+    assert pulled_user_dynamo.get(user_id) is None
+
+    # add
+    now = pendulum.now('utc')
+    item = pulled_user_dynamo.add(user_id, now=now)
+    assert item == {
+        'partitionKey': f'user/{user_id}',
+        'sortKey': 'feedPulled',
+        'schemaVersion': 0,
+        'userId': user_id,
+        'pulledAt': now.to_iso8601_string(),
+    }
+    assert pulled_user_dynamo.get(user_id) == item
+
+    # adding again is a no-op
+    assert pulled_user_dynamo.add(user_id) == item
+    assert pulled_user_dynamo.get(user_id) == item
+
+    # delete
+    assert pulled_user_dynamo.delete(user_id) == item
+    assert pulled_user_dynamo.get(user_id) is None
+
+
+def test_add_delete_follows(pulled_user_dynamo):
+    follower_user_id_1, follower_user_id_2 = str(uuid4()), str(uuid4())
+    followed_user_id_1, followed_user_id_2 = sorted([str(uuid4()), str(uuid4())])
+    assert list(pulled_user_dynamo.generate_followed_user_ids(follower_user_id_1)) == []
+
+    # add, idempotent
+    pulled_user_dynamo.add_follows([follower_user_id_1, follower_user_id_2], followed_user_id_1)
+    pulled_user_dynamo.add_follows([follower_user_id_1], followed_user_id_1)
+    pulled_user_dynamo.add_follows([follower_user_id_1], followed_user_id_2)
+    assert list(pulled_user_dynamo.generate_followed_user_ids(follower_user_id_1)) == [
+        followed_user_id_1,
+        followed_user_id_2,
+    ]
+    assert list(pulled_user_dynamo.generate_followed_user_ids(follower_user_id_2)) == [followed_user_id_1]
+
+    # the pulled user's own item isn't mistaken for a follow
+    pulled_user_dynamo.add(follower_user_id_1)
+    assert len(list(pulled_user_dynamo.generate_followed_user_ids(follower_user_id_1))) == 2
+
+    # delete
+    pulled_user_dynamo.delete_follow(follower_user_id_1, followed_user_id_1)
+    assert list(pulled_user_dynamo.generate_followed_user_ids(follower_user_id_1)) == [followed_user_id_2]
+    assert list(pulled_user_dynamo.generate_followed_user_ids(follower_user_id_2)) == [followed_user_id_1]
@@ -3,7 +3,8 @@ from uuid import uuid4
 import pendulum
 import pytest
 
-from app.models.post.enums import PostType
+from app.models.feed.exceptions import FeedException
+from app.models.post.enums import PostStatus, PostType
 
 
 @pytest.fixture
@@ -51,7 +52,7 @@ def test_add_post_to_followers_feeds(feed_manager, user_manager):
         'postedByUserId': our_user.id,
         'postedAt': posted_at,
     }
-    assert feed_manager.add_post_to_followers_feeds(our_user.id, post_item) == ['ouid']
+    feed_manager.add_post_to_followers_feeds(our_user.id, post_item)
 
     # check feeds
     assert [i['postId'] for i in feed_manager.dynamo.generate_items(our_user.id)] == [post_id_1]
@@ -69,7 +70,7 @@ def test_add_post_to_followers_feeds(feed_manager, user_manager):
         'postedByUserId': our_user.id,
         'postedAt': posted_at,
     }
-    assert feed_manager.add_post_to_followers_feeds(our_user.id, post_item) == ['ouid', 'tuid']
+    feed_manager.add_post_to_followers_feeds(our_user.id, post_item)
 
     # check feeds
     assert sorted([i['postId'] for i in feed_manager.dynamo.generate_items(our_user.id)]) == sorted(
@@ -77,3 +78,90 @@ def test_add_post_to_followers_feeds(feed_manager, user_manager):
     )
     assert [i['postId'] for i in feed_manager.dynamo.generate_items(their_user.id)] == [post_id_2]
     assert list(feed_manager.dynamo.generate_items(another_user.id)) == []
+
+
+def test_add_users_posts_to_feed_pulled_user(feed_manager, post_manager, user):
+    feed_user_id = str(uuid4())
+    post_manager.add_post(user, str(uuid4()), PostType.TEXT_ONLY, text='t')
+
+    # the user's posts are pulled on read, so they don't get added to the feed
+    feed_manager.pulled_user_dynamo.add(user.id)
+    feed_manager.add_users_posts_to_feed(feed_user_id, user.id)
+    assert list(feed_manager.dynamo.generate_items(feed_user_id)) == []
+
+
+def test_add_post_to_followers_feeds_pulled_user(feed_manager, user_manager):
+    our_user = user_manager.init_user({'userId': 'ouid', 'privacyStatus': 'PUBLIC'})
+    their_user = user_manager.init_user({'userId': 'tuid', 'privacyStatus': 'PUBLIC'})
+    feed_manager.follower_manager.dynamo.add_following(their_user.id, our_user.id, 'FOLLOWING')
+    feed_manager.pulled_user_dynamo.add(our_user.id)
+
+    # the post only goes in our own feed
+    post_item = {
+        'postId': 'pid',
+        'postedByUserId': our_user.id,
+        'postedAt': pendulum.now('utc').to_iso8601_string(),
+    }
+    feed_manager.add_post_to_followers_feeds(our_user.id, post_item)
+    assert [i['postId'] for i in feed_manager.dynamo.generate_items(our_user.id)] == ['pid']
+    assert list(feed_manager.dynamo.generate_items(their_user.id)) == []
+
+
+def test_get_feed(feed_manager, post_manager, user_manager):
+    our_user = user_manager.init_user({'userId': 'ouid', 'privacyStatus': 'PUBLIC'})
+    pushed_user = user_manager.init_user({'userId': 'puid', 'privacyStatus': 'PUBLIC'})
+    pulled_user = user_manager.init_user({'userId': 'luid', 'privacyStatus': 'PUBLIC'})
+    unfollowed_pulled_user = user_manager.init_user({'userId': 'uuid', 'privacyStatus': 'PUBLIC'})
+    feed_manager.follower_manager.dynamo.add_following(our_user.id, pushed_user.id, 'FOLLOWING')
+    feed_manager.follower_manager.dynamo.add_following(our_user.id, pulled_user.id, 'FOLLOWING')
+    feed_manager.pulled_user_dynamo.add(pulled_user.id)
+    feed_manager.pulled_user_dynamo.add(unfollowed_pulled_user.id)
+    feed_manager.pulled_user_dynamo.add_follows([our_user.id], pulled_user.id)
+    # left behind by an unfollow, not trusted without the follow item
+    feed_manager.pulled_user_dynamo.add_follows([our_user.id], unfollowed_pulled_user.id)
+    assert feed_manager.get_feed(our_user.id) == {'items': [], 'nextToken': None}
+
+    # fanned out posts, with two posted at the same time
+    now = pendulum.now('utc')
+    ats = [now.add(seconds=i).to_iso8601_string() for i in range(4)]
+    post_items = [
+        {'postId': 'pid0', 'postedByUserId': pushed_user.id, 'postedAt': ats[0]},
+        {'postId': 'pid2a', 'postedByUserId': pushed_user.id, 'postedAt': ats[2]},
+        {'postId': 'pid2b', 'postedByUserId': pushed_user.id, 'postedAt': ats[2]},
+    ]
+    feed_manager.dynamo.add_posts_to_feed(our_user.id, iter(post_items))
+
+    # posts by pulled users, one of which also made it into our feed before they were pulled
+    for user_id, post_id, seconds in (
+        (pulled_user.id, 'pid1', 1),
+        (pulled_user.id, 'pid3', 3),
+        (unfollowed_pulled_user.id, 'pidX', 2),
+    ):
+        post_item = post_manager.dynamo.add_pending_post(
+            user_id, post_id, 'ptype', posted_at=now.add(seconds=seconds)
+        )
+        post_manager.dynamo.set_post_status(post_item, PostStatus.COMPLETED)
+    feed_manager.dynamo.add_posts_to_feed(our_user.id, iter([post_manager.dynamo.get_post('pid3')]))
+
+    # get it all in one page
+    assert feed_manager.get_feed(our_user.id) == {
+        'items': ['pid3', 'pid2b', 'pid2a', 'pid1', 'pid0'],
+        'nextToken': None,
+    }
+
+    # page through it
+    feed = feed_manager.get_feed(our_user.id, limit=2)
+    assert feed['items'] == ['pid3', 'pid2b']
+    feed = feed_manager.get_feed(our_user.id, limit=2, next_token=feed['nextToken'])
+    assert feed['items'] == ['pid2a', 'pid1']
+    feed = feed_manager.get_feed(our_user.id, limit=2, next_token=feed['nextToken'])
+    assert feed == {'items': ['pid0'], 'nextToken': None}
+
+    # an exactly full last page
+    feed = feed_manager.get_feed(our_user.id, limit=5)
+    assert feed == {'items': ['pid3', 'pid2b', 'pid2a', 'pid1', 'pid0'], 'nextToken': None}
+
+
+def test_get_feed_invalid_next_token(feed_manager):
+    with pytest.raises(FeedException, match='nextToken'):
+        feed_manager.get_feed('uid', next_token='not-a-token')
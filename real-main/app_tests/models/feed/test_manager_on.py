@@ -57,16 +57,14 @@ def test_on_user_follow_status_change_sync_feed_stops_following(feed_manager, fo
 
 def test_on_post_status_change_sync_feed_post_completed(feed_manager, post):
     assert post.item['postStatus'] == PostStatus.COMPLETED
-    user_ids = [str(uuid4()), str(uuid4())]
-    with patch.object(feed_manager, 'add_post_to_followers_feeds', return_value=user_ids) as add_post_mock:
-        with patch.object(feed_manager, 'dynamo') as dynamo_mock:
+    with patch.object(feed_manager, 'add_post_to_followers_feeds') as add_post_mock:
+        with patch.object(feed_manager, 'delete_post_from_feeds') as delete_post_mock:
             with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
                 feed_manager.on_post_status_change_sync_feed(post.id, new_item=post.item)
     assert add_post_mock.mock_calls == [call(post.user_id, post.item)]
-    assert dynamo_mock.mock_calls == []
+    assert delete_post_mock.mock_calls == []
     assert appsync_client_mock.mock_calls == [
-        call.fire_notification(user_ids[0], GqlNotificationType.USER_FEED_CHANGED),
-        call.fire_notification(user_ids[1], GqlNotificationType.USER_FEED_CHANGED),
+        call.fire_notification(post.user_id, GqlNotificationType.USER_FEED_CHANGED),
     ]
 
 
@@ -77,14 +75,78 @@ def test_on_post_status_change_sync_feed_post_completed(feed_manager, post):
 def test_on_post_status_change_sync_feed_post_uncompleted(feed_manager, post, status):
     old_item = {**post.item, 'postStatus': 'COMPLETED'}
     new_item = {**post.item, 'postStatus': status}
-    user_ids = [str(uuid4()), str(uuid4())]
     with patch.object(feed_manager, 'add_post_to_followers_feeds') as add_post_mock:
-        with patch.object(feed_manager, 'dynamo', **{'delete_by_post.return_value': user_ids}) as dynamo_mock:
+        with patch.object(feed_manager, 'delete_post_from_feeds') as delete_post_mock:
             with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
                 feed_manager.on_post_status_change_sync_feed(post.id, new_item=new_item, old_item=old_item)
     assert add_post_mock.mock_calls == []
-    assert dynamo_mock.mock_calls == [call.delete_by_post(post.id)]
+    assert delete_post_mock.mock_calls == [call(post.id)]
+    assert appsync_client_mock.mock_calls == []
+
+
+def test_post_fan_out_to_and_from_feeds(feed_manager, post):
+    # add some followers, in order of user id
+    follower_user_ids = sorted(str(uuid4()) for _ in range(5))
+    for follower_user_id in follower_user_ids:
+        feed_manager.follower_manager.dynamo.add_following(follower_user_id, post.user_id, FollowStatus.FOLLOWING)
+
+    # add the post to feeds, over a few chunks
+    with patch.object(feed_manager.fan_out_manager, 'chunk_size', 2):
+        with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+            feed_manager.add_post_to_followers_feeds(post.user_id, post.item)
+    for user_id in [post.user_id, *follower_user_ids]:
+        assert [i['postId'] for i in feed_manager.dynamo.generate_items(user_id)] == [post.id]
     assert appsync_client_mock.mock_calls == [
-        call.fire_notification(user_ids[0], GqlNotificationType.USER_FEED_CHANGED),
-        call.fire_notification(user_ids[1], GqlNotificationType.USER_FEED_CHANGED),
+        call.fire_notification(user_id, GqlNotificationType.USER_FEED_CHANGED) for user_id in follower_user_ids
     ]
+    assert feed_manager.fan_out_manager.dynamo.get_job(f'feed:{post.id}') is None
+
+    # delete the post from feeds, over a few chunks
+    with patch.object(feed_manager.fan_out_manager, 'chunk_size', 2):
+        with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+            feed_manager.delete_post_from_feeds(post.id)
+    for user_id in [post.user_id, *follower_user_ids]:
+        assert list(feed_manager.dynamo.generate_items(user_id)) == []
+    assert sorted(c.args[0] for c in appsync_client_mock.fire_notification.call_args_list) == sorted(
+        [post.user_id, *follower_user_ids]
+    )
+    assert feed_manager.fan_out_manager.dynamo.get_job(f'feed:{post.id}') is None
+
+
+def test_on_user_follower_count_change_sync_pulled(feed_manager, user1):
+    # add some followers, in order of user id, one of whom has only requested to follow
+    follower_user_ids = sorted(str(uuid4()) for _ in range(5))
+    for follower_user_id in follower_user_ids:
+        feed_manager.follower_manager.dynamo.add_following(follower_user_id, user1.id, FollowStatus.FOLLOWING)
+    feed_manager.follower_manager.dynamo.add_following('requested-uid', user1.id, FollowStatus.REQUESTED)
+
+    feed_manager.on_user_follower_count_change_sync_pulled(user1.id, new_item={'followerCount': 10})
+    assert feed_manager.is_pulled(user1.id) is False
+
+    # crosses the threshold, followers get recorded as following a pulled user over a few chunks
+    new_item = {'followerCount': feed_manager.fan_out_max_follower_count + 1}
+    with patch.object(feed_manager.fan_out_manager, 'chunk_size', 2):
+        feed_manager.on_user_follower_count_change_sync_pulled(user1.id, new_item=new_item)
+    assert feed_manager.is_pulled(user1.id) is True
+    for follower_user_id in follower_user_ids:
+        assert list(feed_manager.pulled_user_dynamo.generate_followed_user_ids(follower_user_id)) == [user1.id]
+    assert list(feed_manager.pulled_user_dynamo.generate_followed_user_ids('requested-uid')) == []
+    assert feed_manager.fan_out_manager.dynamo.get_job(f'feedPulled:{user1.id}') is None
+
+    # idempotent, and users don't go back to having posts fanned out
+    with patch.object(feed_manager.fan_out_manager, 'start_job') as start_job_mock:
+        feed_manager.on_user_follower_count_change_sync_pulled(user1.id, new_item=new_item)
+        feed_manager.on_user_follower_count_change_sync_pulled(user1.id, new_item={'followerCount': 10})
+    assert start_job_mock.mock_calls == []
+    assert feed_manager.is_pulled(user1.id) is True
+
+
+def test_on_user_follow_status_change_sync_feed_pulled_user(feed_manager, follower, user1, user2):
+    feed_manager.pulled_user_dynamo.add(user2.id)
+    with patch.object(feed_manager, 'appsync_client'):
+        feed_manager.on_user_follow_status_change_sync_feed(user2.id, new_item=follower.item)
+    assert list(feed_manager.pulled_user_dynamo.generate_followed_user_ids(user1.id)) == [user2.id]
+
+    with patch.object(feed_manager, 'appsync_client'):
+        feed_manager.on_user_follow_status_change_sync_feed(user2.id, old_item=follower.item)
+    assert list(feed_manager.pulled_user_dynamo.generate_followed_user_ids(user1.id)) == []
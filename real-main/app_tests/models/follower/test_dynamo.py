@@ -151,6 +151,35 @@ def test_generate_followers(follower_dynamo, user1, user2, user3):
     assert keys == [{k: item[k] for k in ('partitionKey', 'sortKey')} for item in items]
 
 
+def test_generate_follower_user_ids_by_id(follower_dynamo):
+    user_id = str(uuid.uuid4())
+    assert list(follower_dynamo.generate_follower_user_ids_by_id(user_id)) == []
+
+    follower_user_ids = sorted(str(uuid.uuid4()) for _ in range(4))
+    follower_dynamo.add_following(follower_user_ids[0], user_id, FollowStatus.FOLLOWING)
+    follower_dynamo.add_following(follower_user_ids[1], user_id, FollowStatus.REQUESTED)
+    follower_dynamo.add_following(follower_user_ids[2], user_id, FollowStatus.FOLLOWING)
+    follower_dynamo.add_following(follower_user_ids[3], user_id, FollowStatus.FOLLOWING)
+    # bait: a firstStory item shares the sort key prefix, and a user we follow
+    follower_dynamo.client.add_item(
+        {'Item': {'partitionKey': f'user/{user_id}', 'sortKey': f'follower/{follower_user_ids[0]}/firstStory'}}
+    )
+    follower_dynamo.add_following(user_id, follower_user_ids[0], FollowStatus.FOLLOWING)
+
+    assert list(follower_dynamo.generate_follower_user_ids_by_id(user_id)) == follower_user_ids
+    gen = follower_dynamo.generate_follower_user_ids_by_id(user_id, follow_status=FollowStatus.FOLLOWING)
+    assert list(gen) == [follower_user_ids[0], follower_user_ids[2], follower_user_ids[3]]
+    gen = follower_dynamo.generate_follower_user_ids_by_id(
+        user_id, follow_status=FollowStatus.FOLLOWING, after_user_id=follower_user_ids[0]
+    )
+    assert list(gen) == [follower_user_ids[2], follower_user_ids[3]]
+    gen = follower_dynamo.generate_follower_user_ids_by_id(user_id, after_user_id=follower_user_ids[1])
+    assert list(gen) == follower_user_ids[2:]
+    assert (
+        list(follower_dynamo.generate_follower_user_ids_by_id(user_id, after_user_id=follower_user_ids[3])) == []
+    )
+
+
 def test_generate_followeds(follower_dynamo, user1, user2, user3):
     our_user = user1
     other1_user = user2
@@ -0,0 +1,64 @@
+import io
+from os import path
+
+import pytest
+
+from app.models.post.cached_image import CachedImage
+from app.models.post.exceptions import PostException
+from app.utils import image_size
+
+fixtures_path = path.join(path.dirname(__file__), '..', '..', 'fixtures')
+
+
+def build_cached_image(filename, size=image_size.NATIVE):
+    with open(path.join(fixtures_path, filename), 'rb') as fh:
+        data = fh.read()
+    return CachedImage('pid', image_size=size, source=lambda: None).set_data(io.BytesIO(data))
+
+
+@pytest.mark.parametrize(
+    'filename, dims',
+    [['grant.jpg', (240, 320)], ['grant-horizontal.jpg', (240, 120)], ['grant-rotated.jpg', (320, 240)]],
+)
+def test_get_dimensions_does_not_decode_jpeg(filename, dims):
+    cached_image = build_cached_image(filename)
+    assert cached_image.get_dimensions() == dims
+    assert cached_image._image is None
+    assert cached_image.readonly_image.size == dims
+
+
+def test_get_dimensions_heic(heic_dims):
+    cached_image = build_cached_image('IMG_0265.HEIC', size=image_size.NATIVE_HEIC)
+    assert cached_image.get_dimensions() == heic_dims
+
+
+def test_get_dimensions_not_jpeg_data():
+    cached_image = CachedImage('pid', image_size=image_size.NATIVE, source=lambda: None)
+    cached_image.set_data(io.BytesIO(b'aintnojpeg'))
+    with pytest.raises(PostException, match='Unable to recognize file type'):
+        cached_image.get_dimensions()
+
+
+@pytest.mark.parametrize(
+    'filename, max_dims, dims',
+    [
+        ['big-blank.jpg', (854, 480), (854, 427)],
+        ['grant-rotated.jpg', (114, 64), (85, 64)],
+        ['grant.jpg', (854, 480), (240, 320)],  # never upscaled
+    ],
+)
+def test_get_proxy_image_jpeg_draft_mode(filename, max_dims, dims):
+    cached_image = build_cached_image(filename)
+    proxy = cached_image.get_proxy_image(max_dims)
+    assert proxy.size == dims
+    assert cached_image._image is None
+
+    # same result from an already-decoded image
+    cached_image.readonly_image
+    assert cached_image.get_proxy_image(max_dims).size == dims
+
+
+def test_get_proxy_image_heic():
+    cached_image = build_cached_image('IMG_0265.HEIC', size=image_size.NATIVE_HEIC)
+    assert cached_image.get_proxy_image(image_size.P480.max_dimensions).size == (640, 480)
+    assert cached_image.readonly_image.size == (4032, 3024)
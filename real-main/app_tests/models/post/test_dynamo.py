@@ -173,6 +173,37 @@ def test_generate_posts_by_user(post_dynamo):
     assert [p['postId'] for p in post_dynamo.generate_posts_by_user(user_id, completed=False)] == [post_id_2]
 
 
+def test_generate_completed_posts_by_user_newest_first(post_dynamo):
+    user_id = 'uid'
+    at1, at2, at3 = [pendulum.now('utc').add(seconds=i) for i in range(3)]
+
+    # add & complete a post by another user as bait
+    post_item = post_dynamo.add_pending_post('other-uid', 'pidX', 'ptype', posted_at=at2, text='lore ipsum')
+    post_dynamo.set_post_status(post_item, PostStatus.COMPLETED)
+    assert list(post_dynamo.generate_completed_posts_by_user_newest_first(user_id)) == []
+
+    # add three posts, complete two of them
+    for post_id, posted_at in (('pid1', at1), ('pid2', at2), ('pid3', at3)):
+        post_item = post_dynamo.add_pending_post(
+            user_id, post_id, 'ptype', posted_at=posted_at, text='lore ipsum'
+        )
+        if post_id != 'pid2':
+            post_dynamo.set_post_status(post_item, PostStatus.COMPLETED)
+
+    gen = post_dynamo.generate_completed_posts_by_user_newest_first(user_id)
+    assert [p['postId'] for p in gen] == ['pid3', 'pid1']
+    gen = post_dynamo.generate_completed_posts_by_user_newest_first(user_id, page_size=1)
+    assert [p['postId'] for p in gen] == ['pid3', 'pid1']
+    gen = post_dynamo.generate_completed_posts_by_user_newest_first(
+        user_id, max_posted_at=at2.to_iso8601_string()
+    )
+    assert [p['postId'] for p in gen] == ['pid1']
+    gen = post_dynamo.generate_completed_posts_by_user_newest_first(
+        user_id, max_posted_at=at3.to_iso8601_string()
+    )
+    assert [p['postId'] for p in gen] == ['pid3', 'pid1']
+
+
 def test_set_post_status(post_dynamo):
     post_id = 'my-post-id'
     user_id = 'my-user-id'
@@ -1,5 +1,6 @@
 import logging
 import uuid
+from decimal import Decimal
 from unittest.mock import call, patch
 
 import pendulum
@@ -47,6 +48,14 @@ def test_get_post_dne(post_manager):
     assert post_manager.get_post('pid-dne') is None
 
 
+def test_get_posts(post_manager, posts):
+    post1, post2 = posts
+    assert post_manager.get_posts([]) == []
+    fetched = post_manager.get_posts([post2.id, 'pid-dne', post1.id, post2.id])
+    assert [post.id if post else None for post in fetched] == [post2.id, None, post1.id, post2.id]
+    assert fetched[0].item == post2.item
+
+
 def test_add_post_errors(post_manager, user):
     # try to add a post without any content (no text or media)
     with pytest.raises(PostException, match='without text'):
@@ -580,6 +589,56 @@ def test_record_views(post_manager, user, user2, posts, caplog):
     assert user2.refresh_item().item['lastPostFocusViewAt']
 
 
+def test_record_views_returns_first_view_flags(post_manager, user, user2, posts):
+    post1, post2 = posts
+    assert post_manager.record_views([], user2.id) == {}
+    assert post_manager.record_views(['pid-dne'], user2.id) == {}
+
+    # first views of both posts
+    assert post_manager.record_views([post1.id, post2.id, post1.id], user2.id) == {post1.id: True, post2.id: True}
+
+    # a repeat view of one post and a first view of the other, by different users
+    assert post_manager.record_views([post1.id], user2.id) == {post1.id: False}
+    assert post_manager.record_views([post2.id, 'pid-dne'], user.id) == {post2.id: True}
+
+
+def test_record_views_counts_views_of_original_post(post_manager, user, user2, posts):
+    post1, post2 = posts
+    post3 = post_manager.add_post(user, 'pid3', PostType.TEXT_ONLY, text='t')
+
+    # make post2 a non-original post whose original is post1
+    post_manager.dynamo.client.update_item(
+        {
+            'Key': post_manager.dynamo.pk(post2.id),
+            'UpdateExpression': 'SET originalPostId = :opid',
+            'ExpressionAttributeValues': {':opid': post1.id},
+        }
+    )
+
+    # viewing post2 records a view of post1 as well, but first-view flags are only reported for the posts viewed
+    assert post_manager.record_views([post2.id, post2.id, post3.id], user2.id) == {post2.id: True, post3.id: True}
+    assert post_manager.view_dynamo.get_view(post1.id, user2.id)['viewCount'] == 2
+    assert post_manager.view_dynamo.get_view(post2.id, user2.id)['viewCount'] == 2
+    assert post_manager.view_dynamo.get_view(post3.id, user2.id)['viewCount'] == 1
+
+    # viewing both in the same call is counted in one write against post1
+    assert post_manager.record_views([post1.id, post2.id], user2.id) == {post1.id: False, post2.id: False}
+    assert post_manager.view_dynamo.get_view(post1.id, user2.id)['viewCount'] == 4
+    assert post_manager.view_dynamo.get_view(post2.id, user2.id)['viewCount'] == 3
+
+
+def test_record_views_skips_non_completed_posts(post_manager, user, user2, posts, caplog):
+    post1, post2 = posts
+    post2.archive()
+    with caplog.at_level(logging.WARNING):
+        assert post_manager.record_views([post1.id, post2.id], user2.id) == {post1.id: True}
+    assert len(caplog.records) == 1
+    assert 'non-COMPLETED post' in caplog.records[0].msg
+    assert post2.id in caplog.records[0].msg
+    assert post_manager.view_dynamo.get_view(post1.id, user2.id)['viewCount'] == 1
+    assert post_manager.view_dynamo.get_view(post2.id, user2.id) is None
+
+
 def test_add_post_with_keywords_attribute(post_manager, user):
     # create a post behind the scenes
     post_id = 'pid'
@@ -617,3 +676,28 @@ def test_find_posts(post_manager, user):
         call.query_posts().__getitem__().__getitem__('hits'),
         call.query_posts().__getitem__().__getitem__().__iter__(),
     ]
+
+
+def test_find_posts_sorted_by_trending_score(post_manager, user):
+    post_manager.trending_dynamo.add('pid1', Decimal(2))
+    post_manager.trending_dynamo.add('pid3', Decimal(5))
+    search_result = {
+        'hits': {
+            'total': {'value': 10},
+            'hits': [
+                {'_source': {'postId': 'pid1'}},
+                {'_source': {'postId': 'pid2'}},
+                {'_source': {'postId': 'pid3'}},
+            ],
+        }
+    }
+    with patch.object(post_manager, 'elasticsearch_client') as elasticsearch_client_mock:
+        elasticsearch_client_mock.query_posts.return_value = search_result
+        with patch.object(
+            post_manager.dynamo.client, 'get_item', side_effect=Exception('Use batch gets')
+        ), patch.object(
+            post_manager.trending_dynamo, 'batch_get_scores', wraps=post_manager.trending_dynamo.batch_get_scores
+        ) as batch_get_scores_mock:
+            paginated = post_manager.find_posts('bird', 3, '0')
+    assert paginated == {'nextToken': '3', 'items': ['pid3', 'pid1', 'pid2']}
+    assert batch_get_scores_mock.mock_calls == [call(['pid1', 'pid2', 'pid3'])]
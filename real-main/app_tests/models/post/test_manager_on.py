@@ -535,19 +535,60 @@ def test_get_royalty_paid_and_posts_viewed_past_30_days(post_manager, user):
     assert post_manager.get_royalty_paid_and_posts_viewed_past_30_days(user.id) == [2 * Decimal('0.99'), 2]
 
 
+def test_get_royalty_stats_past_30_days_matches_scanning(post_manager, user):
+    now = pendulum.now('utc')
+    sub_dynamo = post_manager.appstore_manager.sub_dynamo
+    past = [now - pendulum.duration(days=days) for days in (31, 30, 30, 29, 10, 0)]
+    past[1] -= pendulum.duration(microseconds=1)
+    for idx, at in enumerate(past):
+        post_manager.view_dynamo.add_view(str(uuid4()), user.id, idx + 1, at)
+        sub_dynamo.add_transaction(str(uuid4()), user.id, '-', 0, '-', '-', Decimal('0.99') * (idx + 1), now=at)
+
+    # set royalty fees and sync the stats, as the stream would
+    for key in post_manager.view_dynamo.generate_keys_by_user(user.id):
+        item_id = key['partitionKey'].split('/')[1]
+        view_item = post_manager.view_dynamo.set_royalty_fee(item_id, user.id, Decimal('0.1'))
+        post_manager.user_manager.on_post_view_change_sync_royalty_stats(item_id, new_item=view_item)
+    for key in sub_dynamo.generate_transaction_keys_past_30_days(user.id, now=past[0]):
+        transaction_id = key['partitionKey'].split('/')[1]
+        transaction_item = sub_dynamo.get_transaction(transaction_id)
+        post_manager.user_manager.on_appstore_transaction_add_sync_royalty_stats(transaction_id, transaction_item)
+
+    # verify the stats give the same result as scanning over all the views & transactions
+    royalty_paid, posts_viewed = post_manager.get_royalty_paid_and_posts_viewed_past_30_days(user.id, now=now)
+    real_paid = post_manager.appstore_manager.get_paid_real_past_30_days(user.id, now=now)
+    assert [royalty_paid, posts_viewed, real_paid] == [Decimal('0.4'), 18, Decimal('0.99') * 18]
+    assert post_manager.get_royalty_stats_past_30_days(user.id, now=now) == [royalty_paid, posts_viewed, real_paid]
+
+    # the first day of the window is partial, verify a view & transaction that just fell out of the window
+    later = now + pendulum.duration(microseconds=1)
+    assert post_manager.get_royalty_stats_past_30_days(user.id, now=later) == [
+        Decimal('0.3'),
+        15,
+        Decimal('0.99') * 15,
+    ]
+
+
 def test_on_post_view_calculate_royalty_fee(post_manager, post, user, user2):
     item_id1, item_id2, item_id3 = [str(uuid4()), str(uuid4()), str(uuid4())]
-    post_manager.view_dynamo.add_view(item_id1, user2.id, 1, pendulum.now('utc'))
-    post_manager.view_dynamo.add_view(item_id2, user2.id, 2, pendulum.now('utc'))
-    post_manager.view_dynamo.add_view(post.id, user2.id, 1, pendulum.now('utc'))
-    post_manager.view_dynamo.add_view(item_id3, user2.id, 1, pendulum.now('utc') - pendulum.duration(days=31))
+    view_items = [
+        post_manager.view_dynamo.add_view(item_id1, user2.id, 1, pendulum.now('utc')),
+        post_manager.view_dynamo.add_view(item_id2, user2.id, 2, pendulum.now('utc')),
+        post_manager.view_dynamo.add_view(post.id, user2.id, 1, pendulum.now('utc')),
+        post_manager.view_dynamo.add_view(item_id3, user2.id, 1, pendulum.now('utc').subtract(days=31)),
+    ]
+    for view_item in view_items:
+        item_id = view_item['partitionKey'].split('/')[1]
+        post_manager.user_manager.on_post_view_change_sync_royalty_stats(item_id, new_item=view_item)
+    post_manager.user_manager.royalty_stats_dynamo.add_to_stats(
+        user2.id, pendulum.now('utc').to_date_string(), real_paid=Decimal('0.5')
+    )
 
     item_other_user = {'partitionKey': f'post/{post.id}', 'sortKey': f'view/{user2.id}', 'viewCount': 1}
     user.grant_subscription_bonus()
     user2.grant_subscription_bonus()
 
-    with patch.object(post_manager.appstore_manager, 'get_paid_real_past_30_days', return_value=Decimal('0.5')):
-        post_manager.on_post_view_calculate_royalty_fee(post.id, item_other_user)
-        post_view_item = post_manager.view_dynamo.get_view(post.id, user2.id)
-        assert post_view_item['royaltyFee'] == Decimal('0.09375')
-        assert user.refresh_item().item['wallet'] == Decimal('0.09375')
+    post_manager.on_post_view_calculate_royalty_fee(post.id, item_other_user)
+    post_view_item = post_manager.view_dynamo.get_view(post.id, user2.id)
+    assert post_view_item['royaltyFee'] == Decimal('0.09375')
+    assert user.refresh_item().item['wallet'] == Decimal('0.09375')
@@ -17,7 +17,7 @@ def user(user_manager, cognito_client):
 
 @pytest.fixture
 def post(post_manager, user):
-    now = pendulum.parse('2020-06-09T00:00:00Z')  # exact begining of day for easy trending point math
+    now = pendulum.parse('2020-06-08T00:00:00Z')  # exact begining of week for easy trending point math
     yield post_manager.add_post(user, str(uuid4()), PostType.TEXT_ONLY, text='go go', now=now)
 
 
@@ -83,7 +83,9 @@ def test_on_post_view_change_update_trending_viewed_by_post_owner(post_manager,
 def test_on_post_view_change_update_trending_view_item_inserted_general_success_case(
     post_manager, post, user, user2, view_type
 ):
-    viewed_at = pendulum.parse('2020-06-09T00:00:00Z')  # exact begining of day so trending posts haven't inflated
+    viewed_at = pendulum.parse(
+        '2020-06-08T00:00:00Z'
+    )  # exact begining of week so trending posts haven't inflated
     assert post.refresh_trending_item().trending_score == 1
 
     # simulate calling for an add, verify post gets some trending
@@ -103,7 +105,9 @@ def test_on_post_view_change_update_trending_view_item_inserted_general_success_
 def test_on_post_view_change_update_trending_view_item_modified_by_first_focus_view(
     post_manager, post, user, user2, org_view_type
 ):
-    viewed_at = pendulum.parse('2020-06-09T00:00:00Z')  # exact begining of day so trending posts haven't inflated
+    viewed_at = pendulum.parse(
+        '2020-06-08T00:00:00Z'
+    )  # exact begining of week so trending posts haven't inflated
     assert post.refresh_trending_item().trending_score == 1
 
     # first trigger for adding the view record in the first place, verify adds some trending
@@ -131,7 +135,9 @@ def test_on_post_view_change_update_trending_view_item_modified_by_first_focus_v
 def test_on_post_view_change_update_trending_view_item_modified_by_first_non_focus_view(
     post_manager, post, user, user2, second_view_type
 ):
-    viewed_at = pendulum.parse('2020-06-09T00:00:00Z')  # exact begining of day so trending posts haven't inflated
+    viewed_at = pendulum.parse(
+        '2020-06-08T00:00:00Z'
+    )  # exact begining of week so trending posts haven't inflated
     assert post.refresh_trending_item().trending_score == 1
 
     # first trigger for adding the view record in the first place with a FOCUS view, verify adds some trending
@@ -157,7 +163,9 @@ def test_on_post_view_change_update_trending_view_item_modified_by_first_non_foc
 
 
 def test_on_post_view_change_update_trending_user_updated_only_if_post_updated(post_manager, post, user, user2):
-    viewed_at = pendulum.parse('2020-06-09T00:00:00Z')  # exact begining of day so trending posts haven't inflated
+    viewed_at = pendulum.parse(
+        '2020-06-08T00:00:00Z'
+    )  # exact begining of week so trending posts haven't inflated
     assert post.refresh_trending_item().trending_score == 1
     assert user.refresh_trending_item().trending_score is None
 
@@ -230,7 +230,7 @@ def test_complete_with_set_as_user_photo_handles_exception(post_manager, user, p
 
 
 def test_which_posts_get_free_trending(post_manager, user, image_data_b64, grant_data_b64):
-    now = pendulum.now('utc').start_of('day')  # beginning of day to normalize all the trending values
+    now = pendulum.now('utc').start_of('week')  # beginning of week to normalize all the trending values
     # verify text-only post gets some free trending
     post = post_manager.add_post(user, str(uuid.uuid4()), PostType.TEXT_ONLY, text='t', now=now)
     assert post.type == PostType.TEXT_ONLY
@@ -95,6 +95,9 @@ def test_process_image_upload_success_jpeg(pending_post, s3_uploads_client, gran
     assert post.item['postStatus'] == PostStatus.COMPLETED
     assert post.refresh_item().item['postStatus'] == PostStatus.COMPLETED
 
+    # checksum computed locally matches that computed by S3
+    assert post.item['checksum'] == s3_uploads_client.get_object_checksum(native_path)
+
 
 def test_process_image_upload_success_jpeg_with_crop(pending_post, s3_uploads_client, grant_data):
     post = pending_post
@@ -129,6 +132,9 @@ def test_process_image_upload_success_jpeg_with_crop(pending_post, s3_uploads_cl
     assert post.item['postStatus'] == PostStatus.COMPLETED
     assert post.refresh_item().item['postStatus'] == PostStatus.COMPLETED
 
+    # checksum computed locally matches that computed by S3
+    assert post.item['checksum'] == s3_uploads_client.get_object_checksum(native_path)
+
 
 def test_process_image_upload_success_heic_with_crop(pending_post, s3_uploads_client, heic_data):
     post = pending_post
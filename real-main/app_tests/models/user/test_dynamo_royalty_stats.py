@@ -0,0 +1,60 @@
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+
+from app.models.user.dynamo import UserRoyaltyStatsDynamo
+
+
+@pytest.fixture
+def urs_dynamo(dynamo_client):
+    yield UserRoyaltyStatsDynamo(dynamo_client)
+
+
+def test_add_to_stats(urs_dynamo):
+    user_id = str(uuid4())
+    key = urs_dynamo.key(user_id, '2020-06-30')
+    assert urs_dynamo.client.get_item(key) is None
+
+    # adding nothing is a no-op
+    assert urs_dynamo.add_to_stats(user_id, '2020-06-30') is None
+    assert urs_dynamo.client.get_item(key) is None
+
+    # add some, verify item is created with form we expect
+    item = urs_dynamo.add_to_stats(user_id, '2020-06-30', posts_viewed=1)
+    assert item == {
+        'partitionKey': f'user/{user_id}',
+        'sortKey': 'royaltyStats/2020-06-30',
+        'schemaVersion': 0,
+        'postsViewed': 1,
+    }
+    assert urs_dynamo.client.get_item(key) == item
+
+    # add some more, including negatives
+    item = urs_dynamo.add_to_stats(user_id, '2020-06-30', royalty_paid=Decimal('0.25'), real_paid=Decimal('4.99'))
+    assert item['royaltyPaid'] == Decimal('0.25')
+    assert item['postsViewed'] == 1
+    assert item['realPaid'] == Decimal('4.99')
+    item = urs_dynamo.add_to_stats(user_id, '2020-06-30', royalty_paid=Decimal('-0.25'), posts_viewed=2)
+    assert item['royaltyPaid'] == Decimal('0')
+    assert item['postsViewed'] == 3
+    assert urs_dynamo.client.get_item(key) == item
+
+
+def test_get_totals_and_generate_keys_by_user(urs_dynamo):
+    user_id, other_user_id = str(uuid4()), str(uuid4())
+    assert urs_dynamo.get_totals(user_id, ['2020-06-29', '2020-06-30']) == [Decimal('0'), 0, Decimal('0')]
+    assert list(urs_dynamo.generate_keys_by_user(user_id)) == []
+
+    urs_dynamo.add_to_stats(user_id, '2020-06-28', royalty_paid=Decimal('1'), posts_viewed=1)
+    urs_dynamo.add_to_stats(user_id, '2020-06-29', royalty_paid=Decimal('0.5'), posts_viewed=2)
+    urs_dynamo.add_to_stats(user_id, '2020-06-30', posts_viewed=3, real_paid=Decimal('4.99'))
+    urs_dynamo.add_to_stats(other_user_id, '2020-06-30', posts_viewed=4)
+
+    assert urs_dynamo.get_totals(user_id, ['2020-06-29', '2020-06-30']) == [Decimal('0.5'), 5, Decimal('4.99')]
+    assert urs_dynamo.get_totals(other_user_id, ['2020-06-29', '2020-06-30']) == [Decimal('0'), 4, Decimal('0')]
+    assert list(urs_dynamo.generate_keys_by_user(user_id)) == [
+        urs_dynamo.key(user_id, '2020-06-28'),
+        urs_dynamo.key(user_id, '2020-06-29'),
+        urs_dynamo.key(user_id, '2020-06-30'),
+    ]
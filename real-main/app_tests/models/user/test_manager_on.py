@@ -1,8 +1,10 @@
 import logging
 from decimal import Decimal
+from functools import partial
 from unittest.mock import call, patch
 from uuid import uuid4
 
+import pendulum
 import pytest
 
 from app.models.appstore.enums import AppStoreSubscriptionStatus
@@ -127,6 +129,14 @@ def test_on_user_delete_adds_user_deleted_subitem(user_manager, user):
     assert user_manager.dynamo.client.get_item(key) is not None
 
 
+def test_on_user_delete_deletes_royalty_stats(user_manager, user):
+    user_manager.royalty_stats_dynamo.add_to_stats(user.id, '2020-06-29', posts_viewed=1)
+    user_manager.royalty_stats_dynamo.add_to_stats(user.id, '2020-06-30', posts_viewed=1)
+    assert len(list(user_manager.royalty_stats_dynamo.generate_keys_by_user(user.id))) == 2
+    user_manager.on_user_delete(user.id, old_item=user.item)
+    assert list(user_manager.royalty_stats_dynamo.generate_keys_by_user(user.id)) == []
+
+
 def test_on_user_delete_deletes_trending(user_manager, user):
     # give the user some trending, verify
     user.trending_increment_score()
@@ -472,6 +482,46 @@ def test_on_appstore_transaction_add(user_manager, user):
     assert user.refresh_item().item['paidRealSoFar'] == Decimal('0.99') * 2
 
 
+def test_on_appstore_transaction_add_sync_royalty_stats(user_manager, user):
+    created_at = pendulum.parse('2020-06-30T12:00:00Z')
+    new_item = {'userId': user.id, 'gsiA1SortKey': created_at.to_iso8601_string(), 'price': Decimal('0.99')}
+    user_manager.on_appstore_transaction_add_sync_royalty_stats(str(uuid4()), new_item=new_item)
+    user_manager.on_appstore_transaction_add_sync_royalty_stats(str(uuid4()), new_item=new_item)
+    assert user_manager.royalty_stats_dynamo.get_totals(user.id, ['2020-06-30']) == [0, 0, Decimal('1.98')]
+
+
+def test_on_post_view_change_sync_royalty_stats(user_manager, user):
+    first_viewed_at = pendulum.parse('2020-06-30T12:00:00Z')
+    old_item = {
+        'partitionKey': f'post/{uuid4()}',
+        'sortKey': f'view/{user.id}',
+        'gsiA2SortKey': first_viewed_at.to_iso8601_string(),
+        'viewCount': 1,
+    }
+    post_id = old_item['partitionKey'].split('/')[1]
+    get_totals = partial(user_manager.royalty_stats_dynamo.get_totals, user.id, ['2020-06-30'])
+
+    # the view is added, viewed again and has a royalty fee set
+    user_manager.on_post_view_change_sync_royalty_stats(post_id, new_item=old_item)
+    assert get_totals() == [0, 1, 0]
+    new_item = {**old_item, 'viewCount': 3}
+    user_manager.on_post_view_change_sync_royalty_stats(post_id, new_item=new_item, old_item=old_item)
+    assert get_totals() == [0, 3, 0]
+    old_item, new_item = new_item, {**new_item, 'royaltyFee': Decimal('0.25')}
+    user_manager.on_post_view_change_sync_royalty_stats(post_id, new_item=new_item, old_item=old_item)
+    assert get_totals() == [Decimal('0.25'), 3, 0]
+
+    # the view is deleted
+    user_manager.on_post_view_change_sync_royalty_stats(post_id, old_item=new_item)
+    assert get_totals() == [0, 0, 0]
+
+    # views deleted along with their user are ignored
+    user_manager.on_post_view_change_sync_royalty_stats(post_id, new_item=new_item)
+    user_manager.dynamo.delete_user(user.id)
+    user_manager.on_post_view_change_sync_royalty_stats(post_id, old_item=new_item)
+    assert get_totals() == [Decimal('0.25'), 3, 0]
+
+
 def test_on_user_date_of_birth_change_update_age(user_manager, user):
     assert 'age' not in user.refresh_item().item
 
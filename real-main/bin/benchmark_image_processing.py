@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Time the stages of post image processing against the image fixtures from the test suite.
+
+Runs the real Post.process_image_upload(), with each of its stages wrapped to record wall time and
+peak resident memory. Dynamo and S3 are mocked out with moto, so write & upload timings reflect
+serialization & request overhead, not network. Post verification is mocked out entirely, and the
+post is not completed as that only involves dynamo writes.
+
+Peak memory per stage relies on resetting the process' peak RSS, which is only possible on linux.
+"""
+
+import argparse
+import base64
+import os
+import sys
+import time
+import uuid
+from unittest import mock
+
+import moto
+import pendulum
+
+# https://stackoverflow.com/questions/16981921
+SCRIPT_PATH = os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+ROOT_PATH = os.path.dirname(os.path.dirname(SCRIPT_PATH))
+sys.path.append(ROOT_PATH)
+from app import clients, models  # noqa E402
+from app.models.post.enums import PostType  # noqa E402
+from app_tests.dynamodb.table_schema import main_table_schema  # noqa E402
+
+FIXTURES_PATH = os.path.join(ROOT_PATH, 'app_tests', 'fixtures')
+FIXTURES = {
+    'grant.jpg': 'JPEG',
+    'IMG_0265.HEIC': 'HEIC',
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the stages of post image processing")
+    parser.add_argument('-n', dest='iterations', type=int, default=3, help='iterations per fixture')
+    args = parser.parse_args()
+    return args.iterations
+
+
+def reset_peak_rss():
+    "Reset the peak RSS of the process to its current RSS. Returns False if not supported."
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def get_peak_rss():
+    "Peak RSS of the process in bytes, since the last reset"
+    with open('/proc/self/status') as fh:
+        for line in fh:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+class Timer:
+    def __init__(self):
+        self.timings = {}
+        self.peaks = {}
+        self.open_stages = []  # [stage, peak of the stage so far]
+        self.track_memory = reset_peak_rss()
+
+    def wrap(self, stage, func):
+        "Wrap `func` so each call to it is recorded as a run of `stage`"
+
+        def wrapper(*args, **kwargs):
+            return self(stage, func, *args, **kwargs)
+
+        return wrapper
+
+    def __call__(self, stage, func, *args, **kwargs):
+        if self.track_memory:
+            # the peak is about to be reset, so stages already in progress must record it first
+            peak = get_peak_rss()
+            for open_stage in self.open_stages:
+                open_stage[1] = max(open_stage[1], peak)
+            reset_peak_rss()
+        self.open_stages.append([stage, 0])
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.timings.setdefault(stage, []).append(time.perf_counter() - start)
+            _, peak = self.open_stages.pop()
+            if self.track_memory:
+                peak = max(peak, get_peak_rss())
+                self.peaks[stage] = max(self.peaks.get(stage, 0), peak)
+
+    def report(self, title):
+        print(title)
+        for stage, timings in self.timings.items():
+            peak = f'  peak rss {self.peaks[stage] / 2 ** 20:6.0f}MB' if stage in self.peaks else ''
+            print(f'  {stage:<32} {1000 * min(timings):8.1f}ms (best of {len(timings)}){peak}')
+
+
+def build_post_manager():
+    return models.PostManager(
+        {
+            'appsync': mock.Mock(clients.AppSyncClient),
+            'cloudfront': mock.Mock(clients.CloudFrontClient),
+            'dynamo': clients.DynamoClient(table_name='benchmark-table', create_table_schema=main_table_schema),
+            'elasticsearch': mock.Mock(clients.ElasticSearchClient),
+            'post_verification': mock.Mock(clients.PostVerificationClient, **{'verify_image.return_value': True}),
+            's3_uploads': clients.S3Client('benchmark-bucket', create_bucket=True),
+        }
+    )
+
+
+def add_pending_post(post_manager, image_format):
+    post_id = str(uuid.uuid4())
+    post_item = post_manager.dynamo.add_pending_post(
+        'benchmark-user', post_id, PostType.IMAGE, posted_at=pendulum.now('utc')
+    )
+    post = post_manager.init_post(post_item)
+    post._image_item = post_manager.image_dynamo.set_initial_attributes(post_id, image_format=image_format)
+    return post
+
+
+def benchmark(post_manager, filename, image_format, iterations):
+    with open(os.path.join(FIXTURES_PATH, filename), 'rb') as fh:
+        data = fh.read()
+    image_data = base64.b64encode(data)
+
+    timer = Timer()
+    for _ in range(iterations):
+        post = add_pending_post(post_manager, image_format)
+        post.native_jpeg_cache.flush = timer.wrap('encode & upload native', post.native_jpeg_cache.flush)
+        for stage in ('build_image_thumbnails', 'set_height_and_width', 'set_colors', 'set_checksum'):
+            setattr(post, stage, timer.wrap(stage, getattr(post, stage)))
+        with mock.patch.object(post, 'complete'):
+            timer('process_image_upload', post.process_image_upload, image_data=image_data)
+        width, height = post.image_item['width'], post.image_item['height']
+    timer.report(f'{filename} ({len(data) / 1024:.0f}KB, {width}x{height})')
+
+
+def main():
+    iterations = parse_args()
+    with moto.mock_dynamodb2(), moto.mock_s3():
+        post_manager = build_post_manager()
+        for filename, image_format in FIXTURES.items():
+            benchmark(post_manager, filename, image_format, iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+from decimal import Decimal
+
+import boto3
+import pendulum
+
+DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
+
+logger = logging.getLogger()
+
+
+class Migration:
+    """
+    Re-anchor the scores of all trending items to the start of the current week.
+
+    Scores used to be anchored to the start of the day they were last deflated, and all were deflated daily.
+    Now all scores share an anchor at the start of the week, and are only deflated once a week.
+    """
+
+    version_from = 0
+    version_to = 1
+
+    score_inflation_per_day = 2
+    percision = Decimal(10) ** -9
+
+    def __init__(self, dynamo_client, dynamo_table, now=None):
+        self.dynamo_client = dynamo_client
+        self.dynamo_table = dynamo_table
+        self.anchored_at = (now or pendulum.now('utc')).start_of('week')
+
+    def run(self):
+        for item in self.generate_items_to_migrate():
+            self.migrate_item(item)
+
+    def generate_items_to_migrate(self):
+        "Return a generator of all items that need to be migrated"
+        scan_kwargs = {
+            'FilterExpression': 'sortKey = :sk AND schemaVersion = :sv',
+            'ExpressionAttributeValues': {':sk': 'trending', ':sv': self.version_from},
+        }
+        while True:
+            paginated = self.dynamo_table.scan(**scan_kwargs)
+            for item in paginated['Items']:
+                yield item
+            if 'LastEvaluatedKey' not in paginated:
+                break
+            scan_kwargs['ExclusiveStartKey'] = paginated['LastEvaluatedKey']
+
+    def migrate_item(self, item):
+        key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+        score = item['gsiA4SortKey']
+        last_deflated_at = pendulum.parse(item['lastDeflatedAt']).start_of('day')
+        days = (last_deflated_at - self.anchored_at).days
+        new_score = score * Decimal(self.score_inflation_per_day) ** days
+        query_kwargs = {
+            'Key': key,
+            'UpdateExpression': 'SET gsiA4SortKey = :ns, lastDeflatedAt = :nlda, schemaVersion = :nsv',
+            'ConditionExpression': 'gsiA4SortKey = :os AND lastDeflatedAt = :olda AND schemaVersion = :osv',
+            'ExpressionAttributeValues': {
+                ':ns': new_score.quantize(self.percision).normalize(),
+                ':nlda': self.anchored_at.to_iso8601_string(),
+                ':nsv': self.version_to,
+                ':os': score,
+                ':olda': item['lastDeflatedAt'],
+                ':osv': self.version_from,
+            },
+        }
+        logger.warning(f'Migrating trending `{key}`')
+        try:
+            self.dynamo_table.update_item(**query_kwargs)
+        except self.dynamo_client.exceptions.ConditionalCheckFailedException:
+            logger.warning(f'Trending `{key}` changed during migration, skipping. Run migration again.')
+
+
+def lambda_handler(event, context):
+    assert DYNAMO_TABLE, 'Must set env variable DYNAMO_TABLE to dynamo table name'
+
+    dynamo_table = boto3.resource('dynamodb').Table(DYNAMO_TABLE)
+    dynamo_client = boto3.client('dynamodb')
+
+    migration = Migration(dynamo_client, dynamo_table)
+    migration.run()
+
+    return {'statusCode': 200, 'body': json.dumps('Migration completed successfully')}
+
+
+if __name__ == '__main__':
+    lambda_handler(None, None)
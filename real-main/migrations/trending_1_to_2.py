@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import zlib
+
+import boto3
+
+DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
+
+logger = logging.getLogger()
+
+
+class Migration:
+    """
+    Spread all trending items over the partitions of the GSI-A4 index.
+
+    All trending items of an item type used to share one GSI-A4 partition key, `{itemType}/trending`.
+    Now each item is assigned to one of `partition_count` partitions, `{itemType}/trending/{partition}`.
+    """
+
+    version_from = 1
+    version_to = 2
+
+    partition_count = 8
+
+    def __init__(self, dynamo_client, dynamo_table):
+        self.dynamo_client = dynamo_client
+        self.dynamo_table = dynamo_table
+
+    def run(self):
+        for item in self.generate_items_to_migrate():
+            self.migrate_item(item)
+
+    def generate_items_to_migrate(self):
+        "Return a generator of all items that need to be migrated"
+        scan_kwargs = {
+            'FilterExpression': 'sortKey = :sk AND schemaVersion = :sv',
+            'ExpressionAttributeValues': {':sk': 'trending', ':sv': self.version_from},
+        }
+        while True:
+            paginated = self.dynamo_table.scan(**scan_kwargs)
+            for item in paginated['Items']:
+                yield item
+            if 'LastEvaluatedKey' not in paginated:
+                break
+            scan_kwargs['ExclusiveStartKey'] = paginated['LastEvaluatedKey']
+
+    def migrate_item(self, item):
+        key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+        item_type, item_id = item['partitionKey'].split('/')
+        partition = zlib.crc32(item_id.encode()) % self.partition_count
+        query_kwargs = {
+            'Key': key,
+            'UpdateExpression': 'SET gsiA4PartitionKey = :npk, schemaVersion = :nsv',
+            'ConditionExpression': 'gsiA4PartitionKey = :opk AND schemaVersion = :osv',
+            'ExpressionAttributeValues': {
+                ':npk': f'{item_type}/trending/{partition}',
+                ':nsv': self.version_to,
+                ':opk': f'{item_type}/trending',
+                ':osv': self.version_from,
+            },
+        }
+        logger.warning(f'Migrating trending `{key}`')
+        try:
+            self.dynamo_table.update_item(**query_kwargs)
+        except self.dynamo_client.exceptions.ConditionalCheckFailedException:
+            logger.warning(f'Trending `{key}` changed during migration, skipping. Run migration again.')
+
+
+def lambda_handler(event, context):
+    assert DYNAMO_TABLE, 'Must set env variable DYNAMO_TABLE to dynamo table name'
+
+    dynamo_table = boto3.resource('dynamodb').Table(DYNAMO_TABLE)
+    dynamo_client = boto3.client('dynamodb')
+
+    migration = Migration(dynamo_client, dynamo_table)
+    migration.run()
+
+    return {'statusCode': 200, 'body': json.dumps('Migration completed successfully')}
+
+
+if __name__ == '__main__':
+    lambda_handler(None, None)
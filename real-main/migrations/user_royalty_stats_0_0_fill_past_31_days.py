@@ -0,0 +1,101 @@
+import collections
+import json
+import logging
+import os
+from decimal import Decimal
+
+import boto3
+import pendulum
+
+DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
+
+logger = logging.getLogger()
+
+
+class Migration:
+    """
+    Fill in the daily royalty stats of all users from their post views and transactions of the past 31 days.
+    Totals are overwritten, not added to, so this is safe to re-run. Run after the stream listeners that
+    keep the stats up to date have been deployed.
+    """
+
+    def __init__(self, dynamo_client, dynamo_table, now=None):
+        self.dynamo_client = dynamo_client
+        self.dynamo_table = dynamo_table
+        self.since_date_str = ((now or pendulum.now('utc')) - pendulum.duration(days=31)).to_date_string()
+
+    def run(self):
+        stats = collections.defaultdict(
+            lambda: {'royaltyPaid': Decimal('0'), 'postsViewed': 0, 'realPaid': Decimal('0')}
+        )
+        for item in self.generate_post_views():
+            user_id = item['sortKey'].split('/')[1]
+            user_stats = stats[(user_id, item['gsiA2SortKey'][:10])]
+            user_stats['royaltyPaid'] += item.get('royaltyFee', Decimal('0'))
+            user_stats['postsViewed'] += item.get('viewCount', 0)
+        for item in self.generate_transactions():
+            user_stats = stats[(item['userId'], item['gsiA1SortKey'][:10])]
+            user_stats['realPaid'] += item.get('price', Decimal('0'))
+        for (user_id, date_str), user_stats in stats.items():
+            self.put_stats(user_id, date_str, user_stats)
+
+    def generate_post_views(self):
+        "Return a generator of all post views first viewed in the past 31 days"
+        scan_kwargs = {
+            'FilterExpression': ' AND '.join(
+                [
+                    'begins_with(partitionKey, :pk_prefix)',
+                    'begins_with(sortKey, :sk_prefix)',
+                    'gsiA2SortKey >= :sk',
+                ]
+            ),
+            'ExpressionAttributeValues': {
+                ':pk_prefix': 'post/',
+                ':sk_prefix': 'view/',
+                ':sk': self.since_date_str,
+            },
+        }
+        return self.generate_all_scan(scan_kwargs)
+
+    def generate_transactions(self):
+        "Return a generator of all transactions created in the past 31 days"
+        scan_kwargs = {
+            'FilterExpression': 'begins_with(partitionKey, :pk_prefix) AND gsiA1SortKey >= :sk',
+            'ExpressionAttributeValues': {':pk_prefix': 'transaction/', ':sk': self.since_date_str},
+        }
+        return self.generate_all_scan(scan_kwargs)
+
+    def generate_all_scan(self, scan_kwargs):
+        while True:
+            paginated = self.dynamo_table.scan(**scan_kwargs)
+            for item in paginated['Items']:
+                yield item
+            if 'LastEvaluatedKey' not in paginated:
+                break
+            scan_kwargs['ExclusiveStartKey'] = paginated['LastEvaluatedKey']
+
+    def put_stats(self, user_id, date_str, user_stats):
+        item = {
+            'partitionKey': f'user/{user_id}',
+            'sortKey': f'royaltyStats/{date_str}',
+            'schemaVersion': 0,
+            **user_stats,
+        }
+        self.dynamo_table.put_item(Item=item)
+        logger.warning(f'User `{user_id}`: filled royalty stats for `{date_str}`')
+
+
+def lambda_handler(event, context):
+    assert DYNAMO_TABLE, 'Must set env variable DYNAMO_TABLE to dynamo table name'
+
+    dynamo_table = boto3.resource('dynamodb').Table(DYNAMO_TABLE)
+    dynamo_client = boto3.client('dynamodb')
+
+    migration = Migration(dynamo_client, dynamo_table)
+    migration.run()
+
+    return {'statusCode': 200, 'body': json.dumps('Migration completed successfully')}
+
+
+if __name__ == '__main__':
+    lambda_handler(None, None)
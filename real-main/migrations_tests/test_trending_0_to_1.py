@@ -0,0 +1,141 @@
+import logging
+from decimal import Decimal
+from uuid import uuid4
+
+import pendulum
+import pytest
+
+from migrations.trending_0_to_1 import Migration
+
+PERCISION = Decimal(10) ** -9
+
+
+def build_trending_item(item_type, score, last_deflated_at, schema_version=0):
+    return {
+        'partitionKey': f'{item_type}/{uuid4()}',
+        'sortKey': 'trending',
+        'schemaVersion': schema_version,
+        'gsiA4PartitionKey': f'{item_type}/trending',
+        'gsiA4SortKey': Decimal(score).quantize(PERCISION).normalize(),
+        'lastDeflatedAt': last_deflated_at,
+        'createdAt': '2020-06-01T12:00:00.000000Z',
+    }
+
+
+@pytest.fixture
+def post_trending(dynamo_table):
+    # deflated on a wednesday
+    item = build_trending_item('post', 1.5, '2020-06-10T00:07:00.123456Z')
+    dynamo_table.put_item(Item=item)
+    yield item
+
+
+@pytest.fixture
+def user_trending(dynamo_table):
+    # deflated on the monday, the start of the week
+    item = build_trending_item('user', 5, '2020-06-08T00:07:00.123456Z')
+    dynamo_table.put_item(Item=item)
+    yield item
+
+
+@pytest.fixture
+def old_trending(dynamo_table):
+    # not deflated since the previous week
+    item = build_trending_item('post', 4, '2020-06-05T00:07:00.123456Z')
+    dynamo_table.put_item(Item=item)
+    yield item
+
+
+@pytest.fixture
+def migrated_trending(dynamo_table):
+    item = build_trending_item('post', 3, '2020-06-08T00:00:00.000000Z', schema_version=1)
+    dynamo_table.put_item(Item=item)
+    yield item
+
+
+now = pendulum.parse('2020-06-11T12:00:00Z')  # a thursday
+
+
+def test_nothing_to_migrate(dynamo_client, dynamo_table, caplog, migrated_trending):
+    key = {k: migrated_trending[k] for k in ('partitionKey', 'sortKey')}
+    migration = Migration(dynamo_client, dynamo_table, now=now)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
+    assert dynamo_table.get_item(Key=key)['Item'] == migrated_trending
+
+
+@pytest.mark.parametrize(
+    'item, score',
+    [
+        [pytest.lazy_fixture('post_trending'), 1.5 * 4],
+        [pytest.lazy_fixture('user_trending'), 5],
+        [pytest.lazy_fixture('old_trending'), 4 / 8],
+    ],
+)
+def test_migrate_one(dynamo_client, dynamo_table, caplog, item, score):
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+
+    migration = Migration(dynamo_client, dynamo_table, now=now)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 1
+    assert 'Migrating' in str(caplog.records[0])
+    assert item['partitionKey'] in str(caplog.records[0])
+
+    new_item = dynamo_table.get_item(Key=key)['Item']
+    assert new_item.pop('schemaVersion') == 1
+    assert pendulum.parse(new_item.pop('lastDeflatedAt')) == pendulum.parse('2020-06-08T00:00:00Z')
+    assert new_item.pop('gsiA4SortKey') == pytest.approx(Decimal(score))
+    assert new_item == {
+        k: v for k, v in item.items() if k not in ('schemaVersion', 'lastDeflatedAt', 'gsiA4SortKey')
+    }
+
+
+def test_migrate_race_condition(dynamo_client, dynamo_table, caplog, post_trending):
+    key = {k: post_trending[k] for k in ('partitionKey', 'sortKey')}
+    migration = Migration(dynamo_client, dynamo_table, now=now)
+    items = list(migration.generate_items_to_migrate())
+
+    # score is incremented after the item is read
+    dynamo_table.update_item(
+        Key=key, UpdateExpression='ADD gsiA4SortKey :one', ExpressionAttributeValues={':one': Decimal(1)}
+    )
+    with caplog.at_level(logging.WARNING):
+        migration.migrate_item(items[0])
+    assert len(caplog.records) == 2
+    assert 'Run migration again' in str(caplog.records[1])
+    assert dynamo_table.get_item(Key=key)['Item']['schemaVersion'] == 0
+
+    # a second run picks it up
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 1
+    assert dynamo_table.get_item(Key=key)['Item']['gsiA4SortKey'] == pytest.approx(Decimal(2.5 * 4))
+
+
+def test_migrate_multiple_preserves_order(dynamo_client, dynamo_table, caplog, post_trending, old_trending):
+    # before migration, scores are only comparable once each is deflated to today: 1.5 / 2 vs 4 / 64
+    migration = Migration(dynamo_client, dynamo_table, now=now)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 2
+
+    query_kwargs = {
+        'KeyConditionExpression': 'gsiA4PartitionKey = :pk',
+        'ExpressionAttributeValues': {':pk': 'post/trending'},
+        'IndexName': 'GSI-A4',
+    }
+    items = dynamo_table.query(**query_kwargs)['Items']
+    assert [item['partitionKey'] for item in items] == [
+        old_trending['partitionKey'],
+        post_trending['partitionKey'],
+    ]
+    assert items[0]['lastDeflatedAt'] == items[1]['lastDeflatedAt']
+
+    # migrate again, check no-op
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
@@ -0,0 +1,109 @@
+import logging
+import zlib
+from decimal import Decimal
+from uuid import uuid4
+
+import pendulum
+import pytest
+
+from migrations.trending_1_to_2 import Migration
+
+
+@pytest.fixture
+def post_trending(dynamo_table):
+    item_id = str(uuid4())
+    now_str = pendulum.now('utc').to_iso8601_string()
+    item = {
+        'partitionKey': f'post/{item_id}',
+        'sortKey': 'trending',
+        'schemaVersion': 1,
+        'gsiA4PartitionKey': 'post/trending',
+        'gsiA4SortKey': Decimal('0.166666667'),
+        'lastDeflatedAt': now_str,
+        'createdAt': now_str,
+    }
+    dynamo_table.put_item(Item=item)
+    yield item
+
+
+@pytest.fixture
+def user_trending(dynamo_table):
+    item_id = str(uuid4())
+    now_str = pendulum.now('utc').to_iso8601_string()
+    item = {
+        'partitionKey': f'user/{item_id}',
+        'sortKey': 'trending',
+        'schemaVersion': 1,
+        'gsiA4PartitionKey': 'user/trending',
+        'gsiA4SortKey': Decimal(5),
+        'lastDeflatedAt': now_str,
+        'createdAt': now_str,
+    }
+    dynamo_table.put_item(Item=item)
+    yield item
+
+
+def test_nothing_to_migrate(dynamo_client, dynamo_table, caplog):
+    # add something to the db to ensure it doesn't migrate
+    pk = {'partitionKey': 'unrelated-item', 'sortKey': '-'}
+    dynamo_table.put_item(Item=pk)
+    assert dynamo_table.get_item(Key=pk)['Item'] == pk
+
+    # do the migration, check unrelated item was not affected
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
+    assert dynamo_table.get_item(Key=pk)['Item'] == pk
+
+
+@pytest.mark.parametrize('item', pytest.lazy_fixture(['post_trending', 'user_trending']))
+def test_migrate_one(dynamo_client, dynamo_table, caplog, item):
+    key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+    assert dynamo_table.get_item(Key=key)['Item'] == item
+
+    # do the migration
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 1
+    assert 'Migrating' in str(caplog.records[0])
+    assert item['partitionKey'] in str(caplog.records[0])
+
+    # verify final state
+    item_type, item_id = item['partitionKey'].split('/')
+    partition = zlib.crc32(item_id.encode()) % 8
+    new_item = dynamo_table.get_item(Key=key)['Item']
+    assert new_item.pop('gsiA4PartitionKey') == f'{item_type}/trending/{partition}'
+    assert new_item.pop('schemaVersion') == 2
+    item.pop('gsiA4PartitionKey')
+    item.pop('schemaVersion')
+    assert new_item == item
+
+
+def test_migrate_multiple(dynamo_client, dynamo_table, caplog, post_trending, user_trending):
+    # do the migration, check logging
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 2
+    assert all('Migrating' in str(rec) for rec in caplog.records)
+    assert sum(1 for rec in caplog.records if post_trending['partitionKey'] in str(rec)) == 1
+    assert sum(1 for rec in caplog.records if user_trending['partitionKey'] in str(rec)) == 1
+
+    # check state
+    scan_kwargs = {
+        'FilterExpression': 'sortKey = :sk',
+        'ExpressionAttributeValues': {':sk': 'trending'},
+    }
+    items = list(dynamo_table.scan(**scan_kwargs)['Items'])
+    assert len(items) == 2
+    assert all(item['schemaVersion'] == 2 for item in items)
+    assert all(len(item['gsiA4PartitionKey'].split('/')) == 3 for item in items)
+
+    # migrate again, check logging implies no-op
+    caplog.clear()
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
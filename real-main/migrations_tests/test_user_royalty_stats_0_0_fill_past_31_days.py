@@ -0,0 +1,89 @@
+import logging
+from decimal import Decimal
+from uuid import uuid4
+
+import pendulum
+import pytest
+
+from migrations.user_royalty_stats_0_0_fill_past_31_days import Migration
+
+
+@pytest.fixture
+def now():
+    yield pendulum.parse('2020-06-30T12:00:00Z')
+
+
+def add_post_view(dynamo_table, user_id, first_viewed_at, view_count, royalty_fee=None):
+    item = {
+        'partitionKey': f'post/{uuid4()}',
+        'sortKey': f'view/{user_id}',
+        'gsiA2PartitionKey': f'postView/{user_id}',
+        'gsiA2SortKey': first_viewed_at.to_iso8601_string(),
+        'viewCount': view_count,
+    }
+    if royalty_fee is not None:
+        item['royaltyFee'] = royalty_fee
+    dynamo_table.put_item(Item=item)
+
+
+def add_transaction(dynamo_table, user_id, created_at, price):
+    item = {
+        'partitionKey': f'transaction/{uuid4()}',
+        'sortKey': '-',
+        'userId': user_id,
+        'gsiA1PartitionKey': f'transaction/{user_id}',
+        'gsiA1SortKey': created_at.to_iso8601_string(),
+        'price': price,
+    }
+    dynamo_table.put_item(Item=item)
+
+
+def test_nothing_to_migrate(dynamo_client, dynamo_table, caplog, now):
+    migration = Migration(dynamo_client, dynamo_table, now=now)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
+
+
+def test_migrate(dynamo_client, dynamo_table, caplog, now):
+    user_id_1, user_id_2 = str(uuid4()), str(uuid4())
+    add_post_view(dynamo_table, user_id_1, now, 2, Decimal('0.5'))
+    add_post_view(dynamo_table, user_id_1, now.subtract(hours=1), 1)
+    add_post_view(dynamo_table, user_id_1, now.subtract(days=2), 3, Decimal('0.25'))
+    add_post_view(dynamo_table, user_id_1, now.subtract(days=32), 4, Decimal('1'))  # too old
+    add_transaction(dynamo_table, user_id_1, now.subtract(days=2), Decimal('4.99'))
+    add_transaction(dynamo_table, user_id_2, now.subtract(days=31), Decimal('1.99'))
+    add_transaction(dynamo_table, user_id_2, now.subtract(days=40), Decimal('9.99'))  # too old
+
+    migration = Migration(dynamo_client, dynamo_table, now=now)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 3
+    assert all('filled royalty stats' in rec.msg for rec in caplog.records)
+
+    def get_stats(user_id, date):
+        key = {'partitionKey': f'user/{user_id}', 'sortKey': f'royaltyStats/{date.to_date_string()}'}
+        return dynamo_table.get_item(Key=key).get('Item')
+
+    assert get_stats(user_id_1, now) == {
+        'partitionKey': f'user/{user_id_1}',
+        'sortKey': f'royaltyStats/{now.to_date_string()}',
+        'schemaVersion': 0,
+        'royaltyPaid': Decimal('0.5'),
+        'postsViewed': 3,
+        'realPaid': Decimal('0'),
+    }
+    stats = get_stats(user_id_1, now.subtract(days=2))
+    assert stats['royaltyPaid'] == Decimal('0.25')
+    assert stats['postsViewed'] == 3
+    assert stats['realPaid'] == Decimal('4.99')
+    assert get_stats(user_id_1, now.subtract(days=32)) is None
+    stats = get_stats(user_id_2, now.subtract(days=31))
+    assert stats['royaltyPaid'] == 0
+    assert stats['postsViewed'] == 0
+    assert stats['realPaid'] == Decimal('1.99')
+    assert get_stats(user_id_2, now.subtract(days=40)) is None
+
+    # migration is idempotent
+    migration.run()
+    assert get_stats(user_id_1, now)['postsViewed'] == 3